@@ -1,12 +1,19 @@
 import argparse
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from src.file_manager import FileManager
 from src.downloader import download_from_urls
-from src.transcriber import transcribe_audio
-from src.rewriter import rewrite_text
+from src.transcriber import (
+    ModelRouter, TranscriberPool, get_pool_settings, is_batching_enabled, is_routing_enabled,
+    partition_short_clips, transcribe_audio, transcribe_batch, warm_up_models
+)
+from src.pipeline import DownloadTranscribePipeline, get_pipeline_settings
+from src.rewriter import get_max_in_flight, rewrite_many, rewrite_text
+from src.rewrite_cache import RewriteCache, get_cache_stats as get_rewrite_cache_stats
+from src.transcript_cache import get_cache_stats
 from src.cleaner import clean_directory, clean_temp_files
 
 def main():
@@ -33,13 +40,21 @@ def main():
                        default=str(file_manager.get_path('data_input_urls', 'urls.txt')))
     parser.add_argument('--clean-only', action='store_true', help='僅執行清理作業')
     parser.add_argument('--no-download', action='store_true', help='跳過下載步驟')
+    parser.add_argument('--pipeline', action='store_true', help='下載與轉錄同時進行 (下載完成即轉錄)')
     parser.add_argument('--category', help='指定文章分類 (finance, technology, education, general)')
     parser.add_argument('--prompt-type', help='指定提示類型 (finance, technology, education)')
+    parser.add_argument('--invalidate-rewrite-cache', nargs='?', const='all', metavar='PROMPT_TYPE',
+                       help='清除重寫快取 (可指定提示類型，省略時全部清除)')
     args = parser.parse_args()
 
     try:
         logger.info("🚀 開始處理流程...")
         
+        # 清除重寫快取，讓指定提示類型的逐字稿重新送出
+        if args.invalidate_rewrite_cache:
+            prompt_filter = None if args.invalidate_rewrite_cache == 'all' else args.invalidate_rewrite_cache.lower()
+            RewriteCache(file_manager).invalidate(prompt_filter)
+        
         # 如果只是清理模式
         if args.clean_only:
             logger.info("執行清理模式...")
@@ -48,18 +63,23 @@ def main():
             logger.info("✅ 清理完成!")
             return
         
-        # 步驟 1: 下載 MP3 檔案
-        if not args.no_download:
-            logger.info("步驟 1: 下載所有 MP3 檔案...")
-            success = download_from_urls(args.batch, file_manager)
-            if not success:
-                logger.warning("下載過程中出現問題，但繼續處理現有檔案...")
+        if not args.no_download and (args.pipeline or get_pipeline_settings()['enabled']):
+            # 步驟 1+2: 下載與轉錄重疊進行
+            logger.info("步驟 1+2: 下載並同時轉錄音訊檔案...")
+            run_pipeline(file_manager, args.batch, args.category, args.prompt_type)
         else:
-            logger.info("跳過下載步驟...")
-        
-        # 步驟 2: 處理音訊檔案
-        logger.info("步驟 2: 處理音訊檔案...")
-        process_audio_files(file_manager, args.category, args.prompt_type)
+            # 步驟 1: 下載 MP3 檔案
+            if not args.no_download:
+                logger.info("步驟 1: 下載所有 MP3 檔案...")
+                success = download_from_urls(args.batch, file_manager)
+                if not success:
+                    logger.warning("下載過程中出現問題，但繼續處理現有檔案...")
+            else:
+                logger.info("跳過下載步驟...")
+            
+            # 步驟 2: 處理音訊檔案
+            logger.info("步驟 2: 處理音訊檔案...")
+            process_audio_files(file_manager, args.category, args.prompt_type)
         
         # 步驟 3: 清理暫存檔案，這是新的第三步驟
         logger.info("步驟 4: 清理暫存檔案...")
@@ -79,27 +99,92 @@ def process_audio_files(file_manager, category=None, prompt_type=None):
     logger = logging.getLogger("process_audio")
     
     # 取得所有音訊檔案
-    audio_files = file_manager.list_files('data_input_audio_raw', '*.mp3')
+    audio_files = file_manager.list_audio_files('data_input_audio_raw')
     
     if not audio_files:
         logger.info("沒有找到音訊檔案")
         return
     
-    for audio_file in audio_files:
-        try:
-            logger.info(f"轉錄音訊: {audio_file.name}")
-            
-            # 轉錄音訊
-            txt_path = transcribe_audio(str(audio_file), file_manager)
-            
-            if txt_path:
-                logger.info(f"重寫文字: {Path(txt_path).name}")
+    # 依音訊長度為每個檔案選擇模型
+    model_plan = {}
+    if is_routing_enabled():
+        model_plan = ModelRouter(file_manager=file_manager).plan(audio_files)
+    
+    # 短音訊補齊為 30 秒視窗後批次解碼，其餘檔案照常處理
+    if is_batching_enabled() and len(audio_files) > 1:
+        short_files, audio_files = partition_short_clips(audio_files, file_manager)
+        if short_files:
+            logger.info(f"批次轉錄 {len(short_files)} 個短音訊")
+            txt_paths = transcribe_batch(short_files, file_manager, model_plan=model_plan)
+            rewrite_transcripts(file_manager, txt_paths, category, prompt_type)
+        if not audio_files:
+            return
+    
+    workers, _ = get_pool_settings()
+    if workers > 1 and len(audio_files) > 1:
+        # 多行程轉錄，完成後依提交順序重寫
+        with TranscriberPool(workers=workers, file_manager=file_manager) as pool:
+            logger.info(f"以 {workers} 個 worker 轉錄 {len(audio_files)} 個音訊檔案")
+            txt_paths = pool.transcribe_many(audio_files, model_plan)
+        
+        rewrite_transcripts(file_manager, txt_paths, category, prompt_type)
+        return
+    
+    # 預先載入 Whisper 模型，整批檔案共用同一份權重
+    warm_up_models(set(model_plan.values()) or None)
+    
+    # 重寫請求於背景執行緒送出，與下一個檔案的轉錄同時進行
+    with ThreadPoolExecutor(max_workers=get_max_in_flight(), thread_name_prefix='rewrite') as rewrite_pool:
+        for audio_file in audio_files:
+            try:
+                logger.info(f"轉錄音訊: {audio_file.name}")
                 
-                # 立即重寫新產生的文字檔案
-                rewrite_text(txt_path, file_manager, prompt_type, category)
+                # 轉錄音訊
+                txt_path = transcribe_audio(str(audio_file), file_manager, model_plan.get(str(audio_file)))
                 
-        except Exception as e:
-            logger.error(f"處理音訊檔案失敗 {audio_file}: {e}")
+                if txt_path:
+                    logger.info(f"重寫文字: {Path(txt_path).name}")
+                    
+                    # 立即重寫新產生的文字檔案
+                    submit_rewrite(rewrite_pool, txt_path, file_manager, category, prompt_type)
+                    
+            except Exception as e:
+                logger.error(f"處理音訊檔案失敗 {audio_file}: {e}")
+
+def submit_rewrite(rewrite_pool, txt_path, file_manager, category=None, prompt_type=None):
+    """於背景執行緒重寫文字檔案，rewrite_text 拋出的例外記錄到日誌"""
+    logger = logging.getLogger("process_audio")
+    
+    def log_failure(future):
+        error = future.exception()
+        if error is not None:
+            logger.error(f"重寫文字檔案失敗 {txt_path}: {error}")
+    
+    future = rewrite_pool.submit(rewrite_text, txt_path, file_manager, prompt_type, category)
+    future.add_done_callback(log_failure)
+    return future
+
+def run_pipeline(file_manager, url_file, category=None, prompt_type=None):
+    """下載與轉錄重疊進行，每個轉錄完成的檔案立即重寫"""
+    logger = logging.getLogger("process_audio")
+    
+    with ThreadPoolExecutor(max_workers=get_max_in_flight(), thread_name_prefix='rewrite') as rewrite_pool:
+        def on_transcribed(audio_file, txt_path):
+            logger.info(f"重寫文字: {Path(txt_path).name}")
+            submit_rewrite(rewrite_pool, txt_path, file_manager, category, prompt_type)
+        
+        return DownloadTranscribePipeline(file_manager, on_transcribed).run(url_file)
+
+def rewrite_transcripts(file_manager, txt_paths, category=None, prompt_type=None):
+    """同時重寫已轉錄的文字檔案"""
+    logger = logging.getLogger("process_audio")
+    
+    txt_paths = [txt_path for txt_path in txt_paths if txt_path]
+    try:
+        rewrite_many(txt_paths, file_manager, prompt_type, category)
+    except Exception as e:
+        logger.error(f"批次重寫失敗: {e}")
+
 # 刪除多餘的文字處理步驟 3
 # def process_text_files(file_manager, category=None, prompt_type=None):
 #     """處理現有的文字檔案"""
@@ -150,7 +235,7 @@ def generate_summary_report(file_manager):
     try:
         # 統計各類檔案數量
         stats = {
-            'audio_files': len(file_manager.list_files('data_input_audio_raw', '*.mp3')),
+            'audio_files': len(file_manager.list_audio_files('data_input_audio_raw')),
             'transcript_files': len(file_manager.list_files('data_output_transcripts_raw', '*.txt')),
             'article_files': {
                 'finance': len(file_manager.list_files('data_output_articles_finance', '*.md')),
@@ -158,7 +243,9 @@ def generate_summary_report(file_manager):
                 'education': len(file_manager.list_files('data_output_articles_education', '*.md')),
                 'general': len(file_manager.list_files('data_output_articles_general', '*.md'))
             },
-            'total_articles': 0
+            'total_articles': 0,
+            'transcript_cache': get_cache_stats(),
+            'rewrite_cache': get_rewrite_cache_stats()
         }
         
         stats['total_articles'] = sum(stats['article_files'].values())
@@ -170,6 +257,8 @@ def generate_summary_report(file_manager):
         logger.info(f"📊 處理摘要:")
         logger.info(f"   音訊檔案: {stats['audio_files']}")
         logger.info(f"   轉錄檔案: {stats['transcript_files']}")
+        logger.info(f"   轉錄快取: 命中 {stats['transcript_cache']['hits']} / 未命中 {stats['transcript_cache']['misses']}")
+        logger.info(f"   重寫快取: 命中 {stats['rewrite_cache']['hits']} / 未命中 {stats['rewrite_cache']['misses']}")
         logger.info(f"   文章總數: {stats['total_articles']}")
         logger.info(f"     - 理財: {stats['article_files']['finance']}")
         logger.info(f"     - 科技: {stats['article_files']['technology']}")
@@ -0,0 +1,135 @@
+"""
+解碼音訊快取 - 以 .npy 儲存 16 kHz 單聲道 PCM，並以 mmap 方式載入
+"""
+import configparser
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from .file_manager import FileManager
+
+logger = logging.getLogger("audio_cache")
+
+# 同一快取目錄內的寫入與淘汰互斥
+_CACHE_LOCK = threading.Lock()
+
+
+class AudioCache:
+    """以音訊內容雜湊為 key 的解碼結果快取
+
+    快取檔以 mmap_mode='r' 載入，多個 worker 行程讀取同一檔案時
+    共用作業系統的頁面快取而不各自複製。每次命中會更新檔案修改時間，
+    超過容量上限時依修改時間由舊到新淘汰 (LRU)。
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int, file_manager: Optional[FileManager] = None):
+        """初始化音訊快取
+
+        Args:
+            cache_dir: 快取目錄
+            max_bytes: 容量上限 (位元組)，0 表示不限制
+            file_manager: 檔案管理器 (用於計算檔案雜湊)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.file_manager = file_manager or FileManager()
+
+    @classmethod
+    def from_config(cls, file_manager: Optional[FileManager] = None) -> "AudioCache":
+        """依 config.ini [transcriber] audio_cache_max_mb 建立快取"""
+        file_manager = file_manager or FileManager()
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+        max_mb = config.getfloat('transcriber', 'audio_cache_max_mb', fallback=2048)
+        cache_dir = file_manager.get_path('data_temp_cache') / 'audio'
+        return cls(cache_dir, int(max_mb * 1024 * 1024), file_manager)
+
+    def path_for(self, input_path: str) -> Path:
+        """取得音訊檔案對應的快取檔路徑"""
+        return self.cache_dir / f"{self.file_manager.get_file_hash(Path(input_path))}.npy"
+
+    def load(self, input_path: str, decoder: Callable[[str], np.ndarray]) -> np.ndarray:
+        """載入解碼後的波形，未命中時呼叫 decoder 解碼並寫入快取
+
+        Args:
+            input_path: 音訊檔案路徑
+            decoder: 解碼函數，回傳 float32 波形
+
+        Returns:
+            唯讀的 memory-mapped float32 陣列
+        """
+        cache_path = self.path_for(input_path)
+
+        if cache_path.exists():
+            try:
+                audio = np.load(cache_path, mmap_mode='r')
+                os.utime(cache_path)
+                logger.info(f"音訊快取命中: {Path(input_path).name}")
+                return audio
+            except (ValueError, OSError) as e:
+                logger.warning(f"音訊快取損毀，重新解碼 {cache_path}: {e}")
+                cache_path.unlink(missing_ok=True)
+
+        audio = np.ascontiguousarray(decoder(str(input_path)), dtype=np.float32)
+
+        # 先寫入暫存檔再改名，避免其他行程讀到寫一半的檔案
+        tmp_path = cache_path.with_name(f"{cache_path.stem}.{os.getpid()}.tmp")
+        with _CACHE_LOCK:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, audio)
+            os.replace(tmp_path, cache_path)
+
+        audio = np.load(cache_path, mmap_mode='r')
+        # 剛寫入的檔案即使本身超過上限也保留：呼叫端 (如切段轉錄的 worker)
+        # 會依 audio.filename 重新開啟，於下次寫入新檔時才淘汰
+        self.evict(keep=cache_path)
+        return audio
+
+    def size(self) -> int:
+        """快取目前佔用的位元組數"""
+        return sum(p.stat().st_size for p in self.cache_dir.glob('*.npy'))
+
+    def evict(self, max_bytes: Optional[int] = None, keep: Optional[Path] = None) -> int:
+        """淘汰最久未使用的快取檔直到低於容量上限
+
+        Args:
+            max_bytes: 容量上限；None 時使用建構時的設定
+            keep: 不淘汰的快取檔 (剛寫入、仍在使用中)
+
+        Returns:
+            淘汰的檔案數量
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if max_bytes <= 0:
+            return 0
+
+        with _CACHE_LOCK:
+            entries = []
+            for p in self.cache_dir.glob('*.npy'):
+                try:
+                    stat = p.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, p))
+
+            total = sum(size for _, size, _ in entries)
+            evicted = 0
+            for _, size, p in sorted(entries, key=lambda e: e[0]):
+                if total <= max_bytes:
+                    break
+                if keep is not None and p == Path(keep):
+                    continue
+                try:
+                    p.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += 1
+                logger.info(f"已淘汰音訊快取: {p.name}")
+
+        return evicted
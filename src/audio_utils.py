@@ -0,0 +1,160 @@
+"""
+音訊處理工具 - 解碼、能量分析與靜音切割
+"""
+import configparser
+import logging
+import wave
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from whisper.audio import SAMPLE_RATE, load_audio as _whisper_load_audio
+
+logger = logging.getLogger("audio_utils")
+
+
+def read_pcm_wav(input_path: str) -> Optional[np.ndarray]:
+    """直接讀取 16 kHz 單聲道 16-bit PCM WAV，省去啟動 ffmpeg
+
+    Returns:
+        float32 波形；格式不符時回傳 None 交由 ffmpeg 解碼
+    """
+    if Path(input_path).suffix.lower() != '.wav':
+        return None
+    try:
+        with wave.open(str(input_path), 'rb') as wav:
+            if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (SAMPLE_RATE, 1, 2):
+                return None
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    return np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768.0
+
+
+def decode_audio(input_path: str) -> np.ndarray:
+    """解碼音訊為 16 kHz 單聲道 float32 波形 (已是目標格式的 WAV 直接讀取)"""
+    audio = read_pcm_wav(input_path)
+    if audio is not None:
+        return audio
+    return _whisper_load_audio(str(input_path))
+
+
+def load_audio(input_path: str, file_manager=None, use_cache: Optional[bool] = None) -> np.ndarray:
+    """將音訊解碼為 16 kHz 單聲道 float32 波形
+
+    Args:
+        input_path: 音訊檔案路徑
+        file_manager: 檔案管理器
+        use_cache: 是否使用解碼快取；None 時讀取 config.ini [transcriber] audio_cache
+
+    Returns:
+        波形陣列；使用快取時為唯讀的 memory-mapped 陣列
+    """
+    if use_cache is None:
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+        use_cache = config.getboolean('transcriber', 'audio_cache', fallback=True)
+
+    if not use_cache:
+        return decode_audio(str(input_path))
+
+    from .audio_cache import AudioCache
+    return AudioCache.from_config(file_manager).load(str(input_path), decode_audio)
+
+
+def audio_duration(audio: np.ndarray) -> float:
+    """波形長度 (秒)"""
+    return len(audio) / SAMPLE_RATE
+
+
+def _iter_frames(audio: np.ndarray, frame_length: int, block_frames: int = 8192):
+    """依區塊產生 (音框數, frame_length) 的音框
+
+    完整音框直接取原陣列的視圖 (memory-mapped 快取也不會整段載入或複製)，
+    只有最後不足一框的尾段補零，數小時的音訊也只佔用一個區塊的暫存記憶體。
+    """
+    n_full = len(audio) // frame_length
+    for start in range(0, n_full, block_frames):
+        stop = min(n_full, start + block_frames)
+        yield np.asarray(audio[start * frame_length:stop * frame_length], dtype=np.float32).reshape(-1, frame_length)
+    remainder = len(audio) - n_full * frame_length
+    if remainder:
+        tail = np.zeros((1, frame_length), dtype=np.float32)
+        tail[0, :remainder] = audio[n_full * frame_length:]
+        yield tail
+
+
+def frame_rms(audio: np.ndarray, frame_seconds: float = 0.03) -> np.ndarray:
+    """計算每個不重疊音框的 RMS 能量
+
+    Args:
+        audio: 16 kHz 波形
+        frame_seconds: 音框長度 (秒)
+
+    Returns:
+        每個音框的 RMS 值，長度為 ceil(len(audio) / frame_length)
+    """
+    frame_length = max(1, int(frame_seconds * SAMPLE_RATE))
+    parts = [np.sqrt(np.mean(frames * frames, axis=1)) for frames in _iter_frames(audio, frame_length)]
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+
+def frame_zcr(audio: np.ndarray, frame_seconds: float = 0.03) -> np.ndarray:
+    """計算每個不重疊音框的過零率 (每個樣本的符號變化比例)"""
+    frame_length = max(1, int(frame_seconds * SAMPLE_RATE))
+    parts = []
+    for frames in _iter_frames(audio, frame_length):
+        signs = np.signbit(frames)
+        parts.append(np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_length)
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float64)
+
+
+def find_split_points(audio: np.ndarray, chunk_seconds: float = 600.0,
+                      search_seconds: float = 30.0, frame_seconds: float = 0.03) -> List[int]:
+    """在目標切點附近尋找最安靜的位置作為切割點
+
+    每隔 chunk_seconds 設定一個目標切點，並在前後 search_seconds 範圍內
+    選擇 RMS 能量最低的音框，避免把句子切成兩半。
+
+    Returns:
+        切割點 (樣本索引) 列表，不含起點與終點
+    """
+    frame_length = max(1, int(frame_seconds * SAMPLE_RATE))
+    rms = frame_rms(audio, frame_seconds)
+    chunk_frames = max(1, int(chunk_seconds / frame_seconds))
+    # 搜尋範圍不超過片段長度的四分之一，避免片段長度差異過大
+    search_frames = max(1, int(min(search_seconds, chunk_seconds / 4) / frame_seconds))
+
+    points: List[int] = []
+    target = chunk_frames
+    while target < len(rms) - search_frames:
+        lo = max(target - search_frames, (points[-1] // frame_length + 1) if points else 1)
+        hi = min(target + search_frames, len(rms) - 1)
+        best = lo + int(np.argmin(rms[lo:hi]))
+        points.append(best * frame_length)
+        target = best + chunk_frames
+    return points
+
+
+def split_audio(audio: np.ndarray, chunk_seconds: float = 600.0,
+                overlap_seconds: float = 1.0) -> List[Tuple[int, int, int, int]]:
+    """將長音訊於靜音處切成多段
+
+    Returns:
+        每段的 (擁有區間起點, 擁有區間終點, 實際起點, 實際終點) 樣本索引；
+        實際區間在擁有區間兩側各多保留 overlap_seconds 供縫合時去重
+    """
+    points = [0] + find_split_points(audio, chunk_seconds) + [len(audio)]
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+
+    spans = []
+    for start, end in zip(points[:-1], points[1:]):
+        spans.append((start, end, max(0, start - overlap), min(len(audio), end + overlap)))
+    return spans
+
+
+def save_chunk(audio: np.ndarray, path: Path) -> Path:
+    """將音訊片段存為 .npy 供其他行程讀取"""
+    path = Path(path)
+    np.save(path, np.ascontiguousarray(audio, dtype=np.float32))
+    return path
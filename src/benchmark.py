@@ -0,0 +1,297 @@
+"""
+轉錄效能基準測試 - 比較不同模型、執行緒數與量化設定的即時率 (RTF)
+
+用法:
+    python -m src.benchmark --models tiny base --threads 1 4 --quantize none int8 --profiles fast balanced
+    python -m src.benchmark --audio data/input/audio/raw/a.mp3 --baseline data/output/reports/benchmark_x.json
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import resource
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    from .file_manager import FileManager
+except ImportError:  # 允許以 `python src/benchmark.py` 方式單獨運行
+    import sys as _sys
+    from pathlib import Path as _Path
+    _sys.path.append(str(_Path(__file__).resolve().parent.parent))
+    from src.file_manager import FileManager
+
+
+logger = logging.getLogger("benchmark")
+
+SAMPLE_RATE = 16000
+
+
+def generate_fixture(path: Path, seconds: float, seed: int = 0) -> Path:
+    """產生固定內容的類語音測試音訊 (16 kHz 單聲道 WAV)
+
+    以隨機基頻的諧波疊加、音節長度的振幅包絡與停頓模擬語音的能量分布；
+    相同 seed 產生相同內容，確保不同次測試可比較。
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+
+    # 每 0.25 秒一個音節，約兩成為停頓
+    syllables = int(np.ceil(seconds / 0.25))
+    pitch = np.repeat(rng.uniform(100, 250, syllables), int(0.25 * SAMPLE_RATE))[:n]
+    gate = np.repeat(rng.random(syllables) > 0.2, int(0.25 * SAMPLE_RATE))[:n]
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = np.sin(np.pi * (t % 0.25) / 0.25) * gate
+    audio = 0.2 * voiced * envelope + 0.005 * rng.standard_normal(n)
+
+    pcm = (np.clip(audio, -1, 1) * 32767).astype('<i2')
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(pcm.tobytes())
+    return path
+
+
+def prepare_fixtures(file_manager: FileManager, audio: Optional[List[str]],
+                     durations: List[float]) -> List[str]:
+    """使用指定的音訊檔，或產生固定的合成測試音訊"""
+    if audio:
+        return [str(Path(a)) for a in audio]
+
+    fixture_dir = file_manager.get_path('data_temp_processing') / 'benchmark'
+    fixture_dir.mkdir(parents=True, exist_ok=True)
+    fixtures = []
+    for i, seconds in enumerate(durations):
+        path = fixture_dir / f"fixture_{int(seconds)}s_{i}.wav"
+        if not path.exists():
+            generate_fixture(path, seconds, seed=i)
+        fixtures.append(str(path))
+    return fixtures
+
+
+def _peak_rss_mb() -> float:
+    # Linux 的 ru_maxrss 單位為 KB，macOS 為 bytes
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+
+def _run_config(model_name: str, threads: int, quantize: str, profile: str, fixtures: List[str],
+                base_dir: str) -> Dict:
+    """在獨立行程中執行單一組設定，回傳各階段耗時與資源用量"""
+    import torch
+    from src import audio_utils
+    from src import transcriber
+
+    torch.set_num_threads(threads)
+    file_manager = FileManager(base_dir)
+    dtype = 'int8' if quantize == 'int8' else 'float32'
+
+    start = time.perf_counter()
+    model = transcriber.get_model(model_name, 'cpu', dtype)
+    model_load = time.perf_counter() - start
+    rss_after_load = _peak_rss_mb()
+
+    # 以 forward hook 累計 encoder / decoder 的耗時
+    stage_seconds = {'encoder': 0.0, 'decoder': 0.0}
+    started: Dict[str, float] = {}
+
+    def make_hooks(stage: str):
+        def pre_hook(module, args):
+            started[stage] = time.perf_counter()
+
+        def post_hook(module, args, output):
+            stage_seconds[stage] += time.perf_counter() - started.pop(stage, time.perf_counter())
+        return pre_hook, post_hook
+
+    for stage, module in (('encoder', model.encoder), ('decoder', model.decoder)):
+        pre_hook, post_hook = make_hooks(stage)
+        module.register_forward_pre_hook(pre_hook)
+        module.register_forward_hook(post_hook)
+
+    kwargs = transcriber.get_transcribe_kwargs(dtype, None if profile == 'config' else profile)
+
+    files = []
+    for fixture in fixtures:
+        stage_seconds['encoder'] = stage_seconds['decoder'] = 0.0
+
+        start = time.perf_counter()
+        audio = audio_utils.load_audio(fixture, file_manager, use_cache=False)
+        decode_audio = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = model.transcribe(audio, **kwargs)
+        transcribe_seconds = time.perf_counter() - start
+
+        duration = audio_utils.audio_duration(audio)
+        files.append({
+            'audio': Path(fixture).name,
+            'duration': round(duration, 2),
+            'decode_audio_seconds': round(decode_audio, 3),
+            'transcribe_seconds': round(transcribe_seconds, 3),
+            'encoder_seconds': round(stage_seconds['encoder'], 3),
+            'decoder_seconds': round(stage_seconds['decoder'], 3),
+            'rtf': round(transcribe_seconds / duration, 4) if duration else None,
+            'segments': len(result.get('segments', [])),
+            'fallback_segments': sum(
+                1 for seg in result.get('segments', [])
+                if seg.get('temperature', 0.0) > kwargs.get('temperature', (0.0,))[0]
+            ),
+        })
+
+    total_audio = sum(f['duration'] for f in files)
+    total_transcribe = sum(f['transcribe_seconds'] for f in files)
+    return {
+        'model': model_name,
+        'threads': threads,
+        'quantize': quantize,
+        'profile': profile,
+        'model_load_seconds': round(model_load, 3),
+        'rss_after_load_mb': round(rss_after_load, 1),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'rtf': round(total_transcribe / total_audio, 4) if total_audio else None,
+        'files': files,
+    }
+
+
+def run_benchmark(models: List[str], threads: List[int], quantize: List[str], fixtures: List[str],
+                  file_manager: Optional[FileManager] = None, profiles: Optional[List[str]] = None) -> Dict:
+    """依序執行所有設定組合
+
+    每組設定在全新的 spawn 行程中執行，峰值 RSS 與模型載入時間互不影響。
+    """
+    file_manager = file_manager or FileManager()
+    results = []
+    context = multiprocessing.get_context('spawn')
+
+    for model_name, thread_count, quant, profile in itertools.product(models, threads, quantize, profiles or ['config']):
+        label = f"model={model_name}, threads={thread_count}, quantize={quant}, profile={profile}"
+        logger.info(f"執行基準測試: {label}")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                result = executor.submit(
+                    _run_config, model_name, thread_count, quant, profile, fixtures, str(file_manager.base_dir)
+                ).result()
+            except Exception as e:
+                logger.error(f"基準測試失敗 ({label}): {e}")
+                result = {'model': model_name, 'threads': thread_count, 'quantize': quant,
+                          'profile': profile, 'error': str(e)}
+        results.append(result)
+        if 'rtf' in result:
+            logger.info(f"  RTF={result['rtf']}, 載入 {result['model_load_seconds']}s, 峰值 RSS {result['peak_rss_mb']}MB")
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'fixtures': [Path(f).name for f in fixtures],
+        'results': results,
+    }
+
+
+def compare_with_baseline(report: Dict, baseline: Dict, tolerance: float = 0.1) -> List[str]:
+    """與先前的報告比較，回傳 RTF 退步超過 tolerance 的設定"""
+    def key(r: Dict):
+        return (r.get('model'), r.get('threads'), r.get('quantize'), r.get('profile', 'config'))
+
+    previous = {key(r): r for r in baseline.get('results', []) if r.get('rtf')}
+    regressions = []
+    for result in report['results']:
+        old = previous.get(key(result))
+        if old and result.get('rtf') and result['rtf'] > old['rtf'] * (1 + tolerance):
+            regressions.append(
+                f"{result['model']}/threads={result['threads']}/{result['quantize']}/{result['profile']}: "
+                f"RTF {old['rtf']} -> {result['rtf']}"
+            )
+    return regressions
+
+
+def render_markdown(report: Dict, regressions: Optional[List[str]] = None) -> str:
+    """將報告轉為 Markdown 表格"""
+    lines = [
+        f"# 轉錄基準測試 {report['timestamp']}",
+        "",
+        f"測試音訊: {', '.join(report['fixtures'])}",
+        "",
+        "| 模型 | 執行緒 | 量化 | 設定檔 | RTF | 模型載入 (s) | 峰值 RSS (MB) | 音訊解碼 (s) | encoder (s) | decoder (s) | 回退 segment |",
+        "|---|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for r in report['results']:
+        if 'error' in r:
+            lines.append(f"| {r['model']} | {r['threads']} | {r['quantize']} | {r['profile']} | 失敗: {r['error']} | | | | | | |")
+            continue
+        files = r['files']
+        lines.append(
+            f"| {r['model']} | {r['threads']} | {r['quantize']} | {r['profile']} | {r['rtf']} "
+            f"| {r['model_load_seconds']} | {r['peak_rss_mb']} | {sum(f['decode_audio_seconds'] for f in files):.3f} "
+            f"| {sum(f['encoder_seconds'] for f in files):.3f} | {sum(f['decoder_seconds'] for f in files):.3f} "
+            f"| {sum(f['fallback_segments'] for f in files)} |"
+        )
+
+    if regressions is not None:
+        lines += ["", "## 與基準比較", ""]
+        lines += [f"- ⚠️ {r}" for r in regressions] or ["- 無效能退步"]
+    return "\n".join(lines) + "\n"
+
+
+def save_report(report: Dict, file_manager: FileManager, regressions: Optional[List[str]] = None) -> Path:
+    """將報告以 JSON 與 Markdown 存到 data/output/reports/"""
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    json_path = file_manager.get_path('data_output_reports', f"benchmark_{stamp}.json")
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(report, regressions=regressions), f, ensure_ascii=False, indent=2)
+    file_manager.save_file(render_markdown(report, regressions), 'data_output_reports', f"benchmark_{stamp}.md")
+    logger.info(f"基準測試報告已建立: {json_path}")
+    return json_path
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Project Whisper 轉錄基準測試")
+    parser.add_argument("--models", nargs="+", default=["tiny", "base"], help="要測試的模型")
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 4], help="torch 執行緒數")
+    parser.add_argument("--quantize", nargs="+", choices=["none", "int8"], default=["none"], help="量化設定")
+    parser.add_argument("--profiles", nargs="+", choices=["config", "fast", "balanced", "accurate"],
+                        default=["config"], help="解碼設定檔；config 表示沿用 config.ini")
+    parser.add_argument("--audio", nargs="+", help="測試用音訊檔；省略時產生合成音訊")
+    parser.add_argument("--durations", nargs="+", type=float, default=[10, 60],
+                        help="合成測試音訊的長度 (秒)")
+    parser.add_argument("--baseline", help="先前的 benchmark JSON，用於偵測效能退步")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="可容許的 RTF 退步比例")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        )
+    args = _build_arg_parser().parse_args(argv)
+
+    fm = FileManager()
+    fixtures = prepare_fixtures(fm, args.audio, args.durations)
+    report = run_benchmark(args.models, args.threads, args.quantize, fixtures, fm, args.profiles)
+
+    regressions = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_with_baseline(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            logger.warning(f"效能退步: {regression}")
+
+    save_report(report, fm, regressions)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -17,12 +17,12 @@ from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 try:
-    from .file_manager import FileManager
+    from .file_manager import AUDIO_EXTENSIONS, FileManager
 except ImportError:  # 允許以 `python src/cleaner.py` 方式單獨運行
     import sys as _sys
     from pathlib import Path as _Path
     _sys.path.append(str(_Path(__file__).resolve().parent.parent))
-    from src.file_manager import FileManager
+    from src.file_manager import AUDIO_EXTENSIONS, FileManager
 
 
 # ------------------------------
@@ -107,16 +107,16 @@ def sweep_non_system_files(file_manager: Optional[FileManager] = None, dry_run:
 
     # 新結構清理策略
     policies: List[DirPolicy] = [
-        DirPolicy("data_input_urls", {".txt"}, "URL 清單與紀錄"),
-        DirPolicy("data_input_audio_raw", {".mp3", ".wav", ".m4a", ".flac"}, "原始音訊"),
-        DirPolicy("data_input_audio_processed", {".mp3", ".wav", ".m4a", ".flac"}, "處理後音訊"),
+        DirPolicy("data_input_urls", {".txt", ".sqlite3", ".sqlite3-journal"}, "URL 清單與紀錄"),
+        DirPolicy("data_input_audio_raw", set(AUDIO_EXTENSIONS), "原始音訊"),
+        DirPolicy("data_input_audio_processed", set(AUDIO_EXTENSIONS), "處理後音訊"),
         DirPolicy("data_input_config", {".ini", ".json", ".yaml", ".yml", ".txt"}, "輸入設定"),
         DirPolicy("data_output_transcripts_raw", {".txt"}, "原始轉錄"),
         DirPolicy("data_output_transcripts_cleaned", {".txt"}, "清理後轉錄"),
-        DirPolicy("data_output_articles_finance", {".md"}, "文章-金融"),
-        DirPolicy("data_output_articles_technology", {".md"}, "文章-科技"),
-        DirPolicy("data_output_articles_education", {".md"}, "文章-教育"),
-        DirPolicy("data_output_articles_general", {".md"}, "文章-一般"),
+        DirPolicy("data_output_articles_finance", {".md", ".partial"}, "文章-金融"),
+        DirPolicy("data_output_articles_technology", {".md", ".partial"}, "文章-科技"),
+        DirPolicy("data_output_articles_education", {".md", ".partial"}, "文章-教育"),
+        DirPolicy("data_output_articles_general", {".md", ".partial"}, "文章-一般"),
         DirPolicy("data_output_reports", {".json", ".md", ".txt"}, "報告輸出"),
         DirPolicy("logs", {".log", ".txt"}, "日誌"),
         DirPolicy("config_prompts", {".txt"}, "提示模板"),
@@ -139,7 +139,7 @@ def sweep_non_system_files(file_manager: Optional[FileManager] = None, dry_run:
         kept = 0
         for p in _iter_files([legacy_input]):
             suffix = p.suffix.lower()
-            if suffix in {".mp3", ".wav", ".m4a", ".flac"}:
+            if suffix in AUDIO_EXTENSIONS:
                 if _move_audio_to_new_structure(file_manager, p, dry_run):
                     moved += 1
             elif suffix in {".txt", ".md"}:
@@ -268,7 +268,7 @@ def clean_directory(
 
     規則：
     - 保留 keep_extensions 副檔名（預設 .md/.txt）
-    - 音訊檔 (.mp3/.wav/.m4a/.flac) 會搬移到 data/input/audio/raw
+    - 音訊檔 (AUDIO_EXTENSIONS) 會搬移到 data/input/audio/raw
     - 其餘檔案刪除
     """
     _ensure_logger_configured()
@@ -297,7 +297,7 @@ def clean_directory(
         if suffix in keep_set:
             files_kept += 1
             continue
-        if suffix in {".mp3", ".wav", ".m4a", ".flac"}:
+        if suffix in AUDIO_EXTENSIONS:
             if _move_audio_to_new_structure(file_manager, p, dry_run=False):
                 files_moved += 1
             continue
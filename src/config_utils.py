@@ -0,0 +1,29 @@
+"""
+設定讀取工具 - config.ini 區段名稱大小寫不一 ([REWRITER]/[rewriter]) 時的共用讀取函式
+"""
+import configparser
+from typing import Iterable, Optional
+
+# 重寫相關設定的區段名稱 (舊設定檔使用大寫)
+REWRITER_SECTIONS = ("rewriter", "REWRITER")
+
+
+def get_config_value(config: configparser.ConfigParser, sections: Iterable[str], key: str,
+                     fallback: Optional[str] = None) -> Optional[str]:
+    """依序在多個區段中讀取設定值
+
+    configparser 的 key 不分大小寫，區段名稱則區分，因此依序嘗試各種寫法。
+
+    Args:
+        config: 已讀取的設定
+        sections: 候選區段名稱
+        key: 設定名稱
+        fallback: 所有區段都沒有此設定時的預設值
+
+    Returns:
+        設定值字串；找不到時回傳 fallback
+    """
+    for section in sections:
+        if config.has_option(section, key):
+            return config.get(section, key)
+    return fallback
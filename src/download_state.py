@@ -0,0 +1,228 @@
+"""
+下載狀態儲存 - 以 SQLite 記錄每個 URL 的下載狀態，取代逐行讀取的文字記錄檔
+"""
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from urllib.parse import parse_qs, urlparse
+
+from .file_manager import FileManager
+
+logger = logging.getLogger("download_state")
+
+STATE_FILENAME = 'download_state.sqlite3'
+
+STATUS_DOWNLOADING = 'downloading'
+STATUS_DOWNLOADED = 'downloaded'
+STATUS_FAILED = 'failed'
+STATUS_FAILED_PERMANENT = 'failed_permanent'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    url TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    output_path TEXT,
+    error TEXT,
+    first_seen TEXT NOT NULL,
+    updated TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_downloads_video_id ON downloads (video_id);
+CREATE INDEX IF NOT EXISTS idx_downloads_status ON downloads (status);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_YOUTUBE_HOSTS = {'youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com'}
+
+
+def normalize_video_id(url: str) -> str:
+    """將 URL 正規化為影片 ID
+
+    YouTube 的 watch?v=、youtu.be/、shorts/、embed/、live/ 形式皆對應到
+    同一個 youtube:<id>；其他網址去除 fragment 與結尾斜線後原樣使用。
+
+    Args:
+        url: 影片網址
+
+    Returns:
+        正規化後的影片 ID
+    """
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+    path = parsed.path.rstrip('/')
+
+    if host in _YOUTUBE_HOSTS:
+        video = parse_qs(parsed.query).get('v', [''])[0]
+        if video:
+            return f"youtube:{video}"
+        parts = path.split('/')
+        if len(parts) >= 3 and parts[1] in ('shorts', 'embed', 'live', 'v'):
+            return f"youtube:{parts[2]}"
+    elif host == 'youtu.be' and path:
+        return f"youtube:{path.lstrip('/').split('/')[0]}"
+
+    netloc = host + (f":{parsed.port}" if parsed.port else '')
+    query = f"?{parsed.query}" if parsed.query else ''
+    return f"{parsed.scheme.lower()}://{netloc}{path}{query}"
+
+
+class DownloadStateStore:
+    """URL 下載狀態的持久化儲存
+
+    資料庫位於 data/input/urls/download_state.sqlite3。已下載的影片 ID
+    於建立時一次載入記憶體，批次內的去重檢查為常數時間；
+    所有寫入以同一把鎖序列化，可供下載執行緒池共用。
+    """
+
+    def __init__(self, file_manager: Optional[FileManager] = None, db_path: Optional[Path] = None):
+        """開啟 (必要時建立) 狀態資料庫
+
+        Args:
+            file_manager: 檔案管理器
+            db_path: 資料庫路徑；None 時使用 data/input/urls/download_state.sqlite3
+        """
+        self.file_manager = file_manager or FileManager()
+        self.db_path = Path(db_path) if db_path else self.file_manager.get_path('data_input_urls', STATE_FILENAME)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+
+        self._import_legacy_records()
+        self._downloaded_ids: Set[str] = {
+            row['video_id'] for row in self._conn.execute(
+                "SELECT DISTINCT video_id FROM downloads WHERE status = ?", (STATUS_DOWNLOADED,)
+            )
+        }
+        self._permanent_ids: Set[str] = {
+            row['video_id'] for row in self._conn.execute(
+                "SELECT DISTINCT video_id FROM downloads WHERE status = ?", (STATUS_FAILED_PERMANENT,)
+            )
+        }
+
+    def _import_legacy_records(self):
+        """一次性匯入舊版 downloaded_urls.txt / failed_urls.txt"""
+        if self._conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+            return
+
+        imported = 0
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            for filename, status in (('failed_urls.txt', STATUS_FAILED), ('downloaded_urls.txt', STATUS_DOWNLOADED)):
+                record_file = self.db_path.parent / filename
+                if not record_file.exists():
+                    continue
+                with open(record_file, 'r', encoding='utf-8') as f:
+                    urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+                for url in urls:
+                    # 已下載記錄後寫入，覆蓋同一 URL 的失敗狀態
+                    self._conn.execute(
+                        "INSERT INTO downloads (url, video_id, status, attempts, first_seen, updated) "
+                        "VALUES (?, ?, ?, 1, ?, ?) "
+                        "ON CONFLICT(url) DO UPDATE SET status = excluded.status, updated = excluded.updated",
+                        (url, normalize_video_id(url), status, now, now),
+                    )
+                imported += len(urls)
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)", (now,))
+
+        if imported:
+            logger.info(f"已匯入 {imported} 筆舊版 URL 記錄到 {self.db_path.name}")
+
+    def is_downloaded(self, url: str) -> bool:
+        """URL (或同一影片的其他網址形式) 是否已下載"""
+        return normalize_video_id(url) in self._downloaded_ids
+
+    def is_permanently_failed(self, url: str) -> bool:
+        """URL 是否曾因永久性錯誤 (影片移除、私人等) 下載失敗"""
+        return normalize_video_id(url) in self._permanent_ids
+
+    def get(self, url: str) -> Optional[Dict]:
+        """取得 URL 的狀態記錄"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM downloads WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def mark_started(self, url: str) -> int:
+        """記錄開始下載，回傳累計嘗試次數"""
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO downloads (url, video_id, status, attempts, first_seen, updated) "
+                "VALUES (?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET status = excluded.status, "
+                "attempts = attempts + 1, updated = excluded.updated",
+                (url, normalize_video_id(url), STATUS_DOWNLOADING, now, now),
+            )
+            row = self._conn.execute("SELECT attempts FROM downloads WHERE url = ?", (url,)).fetchone()
+        return row['attempts']
+
+    def mark_downloaded(self, url: str, output_path: str):
+        """記錄下載成功與輸出檔路徑"""
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO downloads (url, video_id, status, attempts, output_path, first_seen, updated) "
+                "VALUES (?, ?, ?, 1, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET status = excluded.status, output_path = excluded.output_path, "
+                "error = NULL, updated = excluded.updated",
+                (url, normalize_video_id(url), STATUS_DOWNLOADED, str(output_path), now, now),
+            )
+            self._downloaded_ids.add(normalize_video_id(url))
+            self._permanent_ids.discard(normalize_video_id(url))
+
+    def mark_failed(self, url: str, error: str, permanent: bool = False):
+        """記錄下載失敗原因
+
+        Args:
+            url: 影片網址
+            error: 錯誤訊息
+            permanent: 是否為重試也不會成功的錯誤；之後的批次會直接跳過
+        """
+        status = STATUS_FAILED_PERMANENT if permanent else STATUS_FAILED
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO downloads (url, video_id, status, attempts, error, first_seen, updated) "
+                "VALUES (?, ?, ?, 1, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET status = excluded.status, error = excluded.error, "
+                "updated = excluded.updated",
+                (url, normalize_video_id(url), status, str(error)[:1000], now, now),
+            )
+            if permanent:
+                self._permanent_ids.add(normalize_video_id(url))
+
+    def failed_records(self) -> List[Dict]:
+        """所有目前為失敗狀態的記錄 (依更新時間排序)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM downloads WHERE status IN (?, ?) ORDER BY updated",
+                (STATUS_FAILED, STATUS_FAILED_PERMANENT),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def status_counts(self) -> Dict[str, int]:
+        """各狀態的 URL 數量"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS count FROM downloads GROUP BY status").fetchall()
+        return {row['status']: row['count'] for row in rows}
+
+    def close(self):
+        """關閉資料庫連線"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
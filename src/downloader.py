@@ -1,60 +1,263 @@
 import yt_dlp
 import os
+import re
+import time
+import random
 import logging
+import threading
+import configparser
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from urllib.parse import urlparse
 from .file_manager import FileManager
+from .download_state import STATUS_FAILED_PERMANENT, DownloadStateStore, normalize_video_id
+from .playlist import PlaylistExpander
 
-def download_audio(url, file_manager=None):
-    """Download single audio file and return local path"""
+# 多執行緒同時寫入 failed_urls.txt 時互斥
+_RECORD_LOCK = threading.Lock()
+
+
+def get_download_settings():
+    """讀取 config.ini [downloader] 的並行設定
+
+    Returns:
+        (總並行數, 每個網域的並行上限)
+    """
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    max_workers = config.getint('downloader', 'max_workers', fallback=4)
+    per_domain = config.getint('downloader', 'per_domain_limit', fallback=2)
+    return max(1, max_workers), max(1, per_domain)
+
+
+AUDIO_FORMATS = ('mp3', 'native', 'wav', 'flac')
+
+# 重試也不會成功的錯誤訊息 (影片已移除、私人、地區限制、不支援的網址等)
+_PERMANENT_ERROR_PATTERNS = re.compile(
+    r'video unavailable|private video|has been removed|account .* terminated|'
+    r'members[- ]only|join this channel|copyright|not available in your country|geo.?restrict|'
+    r'unsupported url|is not a valid url|no video formats found|requested format is not available|'
+    r'http error 40[0145]|http error 410|premieres in|this live event will begin',
+    re.IGNORECASE,
+)
+
+
+def classify_error(error):
+    """判斷下載錯誤為永久性或暫時性
+
+    Returns:
+        'permanent' (不再重試) 或 'transient' (網路中斷、逾時、429/5xx 等，可重試)
+    """
+    original = getattr(error, 'exc_info', None)
+    original = original[1] if original and len(original) > 1 and original[1] is not None else error
+    if isinstance(original, (yt_dlp.utils.UnsupportedError, yt_dlp.utils.GeoRestrictedError)):
+        return 'permanent'
+    if _PERMANENT_ERROR_PATTERNS.search(str(error)):
+        return 'permanent'
+    return 'transient'
+
+
+def get_retry_settings():
+    """讀取 config.ini [downloader] 的重試設定
+
+    Returns:
+        (最多嘗試次數, 初始等待秒數, 最長等待秒數)
+    """
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    max_attempts = config.getint('downloader', 'max_attempts', fallback=4)
+    base_delay = config.getfloat('downloader', 'retry_base_delay', fallback=2.0)
+    max_delay = config.getfloat('downloader', 'retry_max_delay', fallback=60.0)
+    return max(1, max_attempts), base_delay, max_delay
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """第 attempt 次失敗後的等待秒數：指數成長並加入隨機抖動，避免同時重試"""
+    delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def get_audio_format():
+    """讀取 config.ini [downloader] audio_format
+
+    - mp3: 轉為 192 kbps MP3 (相容舊版行為)
+    - native: 保留來源音訊串流，不重新編碼
+    - wav/flac: 以單次 ffmpeg 轉檔直接輸出 16 kHz 單聲道，Whisper 無需再重取樣
+    """
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    audio_format = config.get('downloader', 'audio_format', fallback='mp3').strip().lower()
+    if audio_format not in AUDIO_FORMATS:
+        logging.warning(f"未知的 audio_format: {audio_format}，改用 mp3")
+        return 'mp3'
+    return audio_format
+
+
+def _postprocessor_options(audio_format):
+    """依下載格式產生 yt-dlp 的後處理設定"""
+    if audio_format == 'native':
+        return {}
+    options = {
+        'postprocessors': [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': audio_format,
+            'preferredquality': '192',
+        }],
+    }
+    if audio_format in ('wav', 'flac'):
+        # Whisper 的輸入格式；轉檔與重取樣在同一次 ffmpeg 執行中完成
+        # key 為 '<pp_key 小寫>+ffmpeg'，FFmpegExtractAudioPP.pp_key() 為 'ExtractAudio'
+        options['postprocessor_args'] = {'extractaudio+ffmpeg': ['-ar', '16000', '-ac', '1', '-sample_fmt', 's16']}
+        options['postprocessors'][0].pop('preferredquality')
+    return options
+
+
+def _final_filepath(ydl, info):
+    """取得後處理完成後的實際檔案路徑"""
+    for download in info.get('requested_downloads') or []:
+        if download.get('filepath'):
+            return download['filepath']
+    return info.get('filepath') or ydl.prepare_filename(info)
+
+
+def url_domain(url):
+    """取得 URL 的網域 (忽略 www./m. 前綴，youtu.be 視同 youtube.com)"""
+    host = (urlparse(url).hostname or '').lower()
+    for prefix in ('www.', 'm.', 'music.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    return 'youtube.com' if host == 'youtu.be' else host
+
+
+class DomainLimiter:
+    """限制同一網域同時進行的下載數，避免被來源站台節流"""
+
+    def __init__(self, per_domain_limit):
+        self.per_domain_limit = per_domain_limit
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url):
+        """取得該 URL 網域的 semaphore (已 acquire)"""
+        domain = url_domain(url)
+        with self._lock:
+            semaphore = self._semaphores.setdefault(domain, threading.BoundedSemaphore(self.per_domain_limit))
+        semaphore.acquire()
+        return semaphore
+
+
+def download_audio(url, file_manager=None, state=None, audio_format=None):
+    """Download single audio file and return local path
+
+    Args:
+        url: 影片/音訊網址
+        file_manager: 檔案管理器
+        state: 下載狀態儲存；None 時自行開啟 (批次下載應共用同一個)
+        audio_format: mp3/native/wav/flac；None 時讀取 config.ini
+    """
     if file_manager is None:
         file_manager = FileManager()
-    
-    # 取得下載記錄檔案路徑
-    downloaded_file = file_manager.get_path('data_input_urls', 'downloaded_urls.txt')
-    downloaded_urls = set()
 
-    # 載入已下載的 URLs
-    if downloaded_file.exists():
-        with open(downloaded_file, 'r', encoding='utf-8') as f:
-            downloaded_urls = set(line.strip() for line in f)
+    if state is None:
+        with DownloadStateStore(file_manager) as own_state:
+            return download_audio(url, file_manager, own_state, audio_format)
 
     # 如果已下載則跳過
-    if url in downloaded_urls:
+    if state.is_downloaded(url):
         logging.info(f"跳過已下載的 URL: {url}")
         return None
 
-    # 設定下載選項
-    output_dir = file_manager.get_path('data_input_audio_raw')
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
+    if state.is_permanently_failed(url):
+        logging.info(f"跳過無法下載的 URL: {url}")
+        return None
+
+    max_attempts, base_delay, max_delay = get_retry_settings()
+    for attempt in range(1, max_attempts + 1):
+        state.mark_started(url)
+        try:
+            filename = _download_once(url, file_manager, state, audio_format)
+        except Exception as e:
+            kind = classify_error(e)
+            if kind == 'permanent' or attempt == max_attempts:
+                logging.error(f"下載失敗 ({'永久' if kind == 'permanent' else '重試已達上限'}): {url}: {e}")
+                state.mark_failed(url, e, permanent=(kind == 'permanent'))
+                return None
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            logging.warning(f"下載失敗 (第 {attempt}/{max_attempts} 次)，{delay:.1f} 秒後重試: {url}: {e}")
+            time.sleep(delay)
+            continue
+
+        # 記錄已下載的 URL
+        state.mark_downloaded(url, filename)
+        logging.info(f"成功下載: {filename}")
+        return filename
+
+
+def _download_once(url, file_manager, state, audio_format=None):
+    """執行一次下載並回傳最終檔案路徑
+
+    下載中的 .part 檔存放於 data/temp/downloads/，完成後才移至
+    data/input/audio/raw/。檔名以首次看到該 URL 的時間命名，
+    重試或下次執行時沿用同一個 .part 檔續傳，不重新下載已取得的部分。
+    """
+    record = state.get(url) or {}
+    first_seen = record.get('first_seen') or datetime.now().isoformat()
+    timestamp = datetime.fromisoformat(first_seen).strftime("%Y%m%d_%H%M%S")
+
     ydl_opts = {
         'format': 'bestaudio/best',
-        'outtmpl': f"{output_dir}/{timestamp}_%(title)s.%(ext)s",
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192',
-        }],
+        # yt-dlp 會將相對的 temp 路徑解讀為相對於 home，因此一律使用絕對路徑
+        'paths': {
+            'home': str(file_manager.get_path('data_input_audio_raw').resolve()),
+            'temp': str(file_manager.get_path('data_temp_downloads').resolve()),
+        },
+        'outtmpl': f"{timestamp}_%(title)s.%(ext)s",
+        'continuedl': True,
         'quiet': True,
+        **_postprocessor_options(audio_format or get_audio_format()),
     }
 
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            filename = ydl.prepare_filename(info).replace('.webm', '.mp3').replace('.m4a', '.mp3')
-            
-            # 記錄已下載的 URL
-            with open(downloaded_file, 'a', encoding='utf-8') as f:
-                f.write(url + '\n')
-            
-            logging.info(f"成功下載: {filename}")
-            return filename
-    except Exception as e:
-        logging.error(f"下載失敗: {e}")
-        return None
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=True)
+        return _final_filepath(ydl, info)
+
+def write_failed_urls(state, file_manager):
+    """由下載狀態匯出 failed_urls.txt
+
+    可重試的 URL 在前，可直接作為 --batch 輸入重新執行；
+    永久失敗的 URL 以註解列出原因，不會被再次讀取。
+    """
+    failed_file = file_manager.get_path('data_input_urls', 'failed_urls.txt')
+    transient, permanent = [], []
+    for record in state.failed_records():
+        (permanent if record['status'] == STATUS_FAILED_PERMANENT else transient).append(record)
+
+    lines = [f"# 更新時間: {datetime.now().isoformat(timespec='seconds')}"]
+    lines += [record['url'] for record in transient]
+    if permanent:
+        lines.append("# 以下 URL 無法下載 (不會自動重試)")
+        lines += [f"# {record['url']}  ({(record['error'] or '').splitlines()[0][:200]})" for record in permanent]
+
+    with _RECORD_LOCK:
+        tmp_file = failed_file.with_suffix('.tmp')
+        tmp_file.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        tmp_file.replace(failed_file)
+    return failed_file
+
+
+def download_from_urls(url_file=None, file_manager=None, max_workers=None, per_domain_limit=None,
+                       on_downloaded=None, backpressure=None):
+    """批次下載所有 MP3 檔案
 
-def download_from_urls(url_file=None, file_manager=None):
-    """批次下載所有 MP3 檔案"""
+    以執行緒池同時下載多個 URL；總並行數與每個網域的並行上限
+    讀取 config.ini [downloader]，亦可由參數覆寫。
+
+    Args:
+        on_downloaded: 每個檔案下載完成時呼叫 on_downloaded(檔案路徑) (於下載執行緒中)
+        backpressure: 每次下載前 (取得網域名額後) acquire 的 semaphore；下載失敗或
+            on_downloaded 拋出例外時釋放，成功交出時由接收端在處理完檔案後釋放
+    """
     if file_manager is None:
         file_manager = FileManager()
     
@@ -69,31 +272,97 @@ def download_from_urls(url_file=None, file_manager=None):
     try:
         with open(url_file, 'r', encoding='utf-8') as f:
             urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-        
-        success_count = 0
-        failed_urls = []
-        
+        # 播放清單/頻道以 flat extraction 展開為個別影片
+        urls = PlaylistExpander(file_manager).expand_urls(urls)
+
+        # 同一清單內重複的影片 (含不同網址形式) 只下載一次
+        unique_urls = {}
         for url in urls:
+            unique_urls.setdefault(normalize_video_id(url), url)
+        urls = list(unique_urls.values())
+
+        default_workers, default_per_domain = get_download_settings()
+        audio_format = get_audio_format()
+        max_workers = max_workers or default_workers
+        limiter = DomainLimiter(per_domain_limit or default_per_domain)
+
+        # 下載狀態於批次開始時載入一次，去重檢查為常數時間
+        state = DownloadStateStore(file_manager)
+        pending = [url for url in urls if not state.is_downloaded(url)]
+        skipped_count = len(urls) - len(pending)
+        if skipped_count:
+            logging.info(f"跳過 {skipped_count} 個已下載的 URL")
+        unavailable = [url for url in pending if state.is_permanently_failed(url)]
+        if unavailable:
+            logging.info(f"跳過 {len(unavailable)} 個先前判定無法下載的 URL")
+            pending = [url for url in pending if not state.is_permanently_failed(url)]
+            skipped_count += len(unavailable)
+
+        def fetch(url):
+            # 先取得網域名額再佔用背壓名額，避免持有背壓名額卻排隊等待網域
+            semaphore = limiter.acquire(url)
+            if backpressure is not None:
+                try:
+                    backpressure.acquire()
+                except BaseException:
+                    semaphore.release()
+                    raise
+            handed_off = False
             try:
-                result = download_audio(url, file_manager)
+                try:
+                    result = download_audio(url, file_manager, state, audio_format)
+                finally:
+                    semaphore.release()
+                if result and on_downloaded is not None:
+                    on_downloaded(result)
+                    # 成功交給下游後，背壓名額由下游處理完成時釋放
+                    handed_off = True
+                return result
+            finally:
+                if backpressure is not None and not handed_off:
+                    backpressure.release()
+
+        success_count = 0
+        total_bytes = 0
+        failed_urls = []
+        start_time = time.time()
+
+        with state, ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='download') as executor:
+            futures = {executor.submit(fetch, url): url for url in pending}
+            for done, future in enumerate(as_completed(futures), 1):
+                url = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logging.error(f"下載 URL 失敗 {url}: {e}")
+                    result = None
+
                 if result:
                     success_count += 1
+                    if os.path.exists(result):
+                        total_bytes += os.path.getsize(result)
                 else:
                     failed_urls.append(url)
-            except Exception as e:
-                logging.error(f"下載 URL 失敗 {url}: {e}")
-                failed_urls.append(url)
-        
-        # 記錄失敗的 URLs
-        if failed_urls:
-            failed_file = file_manager.get_path('data_input_urls', 'failed_urls.txt')
-            with open(failed_file, 'w', encoding='utf-8') as f:
-                for url in failed_urls:
-                    f.write(f"{url}\n")
-            logging.warning(f"失敗的 URLs 已記錄到: {failed_file}")
+
+                elapsed = max(time.time() - start_time, 1e-6)
+                logging.info(
+                    f"下載進度 {done}/{len(pending)}: 成功 {success_count}, 失敗 {len(failed_urls)}, "
+                    f"{total_bytes / elapsed / 1024 / 1024:.2f} MB/s"
+                )
+
+            # 依狀態儲存重寫失敗清單 (含先前執行仍未成功者，已成功的自動移除)
+            if failed_urls:
+                failed_file = write_failed_urls(state, file_manager)
+                logging.warning(f"失敗的 URLs 已記錄到: {failed_file}")
         
-        logging.info(f"批次下載完成: {success_count}/{len(urls)} 個 URLs 成功")
-        return success_count > 0
+        elapsed = max(time.time() - start_time, 1e-6)
+        success_rate = success_count / len(pending) * 100 if pending else 100.0
+        logging.info(
+            f"批次下載完成: {success_count}/{len(pending)} 個 URLs 成功 ({success_rate:.1f}%)，"
+            f"跳過 {skipped_count} 個，共 {total_bytes / 1024 / 1024:.1f} MB，"
+            f"耗時 {elapsed:.1f} 秒 ({total_bytes / elapsed / 1024 / 1024:.2f} MB/s)"
+        )
+        return success_count > 0 or not failed_urls
     except Exception as e:
         logging.error(f"批次下載失敗: {str(e)}")
-        return False
\ No newline at end of file
+        return False
@@ -4,11 +4,19 @@
 import os
 import shutil
 import json
+import hashlib
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import logging
 
+# 轉錄流程可處理的音訊副檔名 (下載原始音訊串流時可能為 webm/opus/m4a)
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.flac', '.m4a', '.opus', '.webm', '.ogg', '.aac')
+
+# 檔案雜湊快取: (路徑, 大小, 修改時間) -> sha256
+_FILE_HASH_CACHE: Dict[Tuple[str, int, int], str] = {}
+
+
 class FileManager:
     """統一的檔案管理器"""
     
@@ -47,6 +55,9 @@ class FileManager:
             'data_temp_processing': self.base_dir / 'data' / 'temp' / 'processing',
             'data_temp_cache': self.base_dir / 'data' / 'temp' / 'cache',
             
+            # 持久快取 (不隨暫存清理刪除)
+            'data_cache': self.base_dir / 'data' / 'cache',
+            
             'config_prompts': self.base_dir / 'config' / 'prompts',
             'config_models': self.base_dir / 'config' / 'models',
             
@@ -242,6 +253,17 @@ class FileManager:
         files = list(dir_path.glob(pattern))
         files = [f for f in files if f.is_file()]
         return sorted(files)
+
+    def list_audio_files(self, category: str) -> List[Path]:
+        """列出目錄中所有支援格式的音訊檔案
+
+        Args:
+            category: 目錄類別
+
+        Returns:
+            依檔名排序的音訊檔案路徑列表
+        """
+        return [f for f in self.list_files(category) if f.suffix.lower() in AUDIO_EXTENSIONS]
     
     def clean_temp_files(self, older_than_hours: int = 24) -> int:
         """清理暫存檔案
@@ -255,12 +277,16 @@ class FileManager:
         import time
         
         temp_dirs = ['data_temp_downloads', 'data_temp_processing', 'data_temp_cache']
+        # 解碼音訊快取由 AudioCache.evict() 依容量與最近使用時間管理，不依存在時間刪除
+        audio_cache_dir = self.get_path('data_temp_cache') / 'audio'
         cleaned_count = 0
         cutoff_time = time.time() - (older_than_hours * 3600)
         
         for temp_dir in temp_dirs:
             dir_path = self.get_path(temp_dir)
             for file_path in dir_path.rglob('*'):
+                if file_path.suffix == '.npy' and audio_cache_dir in file_path.parents:
+                    continue
                 if file_path.is_file() and file_path.stat().st_mtime < cutoff_time:
                     try:
                         file_path.unlink()
@@ -269,6 +295,13 @@ class FileManager:
                     except Exception as e:
                         self.logger.error(f"清理檔案失敗 {file_path}: {e}")
         
+        # 解碼音訊快取超過容量上限時，依最近使用時間淘汰
+        try:
+            from .audio_cache import AudioCache
+            cleaned_count += AudioCache.from_config(self).evict()
+        except Exception as e:
+            self.logger.error(f"音訊快取淘汰失敗: {e}")
+        
         self.logger.info(f"暫存檔案清理完成，共清理 {cleaned_count} 個檔案")
         return cleaned_count
     
@@ -297,6 +330,32 @@ class FileManager:
             'name': file_path.stem
         }
     
+    def get_file_hash(self, file_path: Path, chunk_size: int = 1 << 20) -> str:
+        """計算檔案內容的 SHA-256
+
+        同一行程內以 (路徑, 大小, 修改時間) 快取結果，檔案未變動時不重複讀取。
+
+        Args:
+            file_path: 檔案路徑
+            chunk_size: 每次讀取的位元組數
+
+        Returns:
+            十六進位雜湊字串
+        """
+        file_path = Path(file_path)
+        stat = file_path.stat()
+        memo_key = (str(file_path.resolve()), stat.st_size, stat.st_mtime_ns)
+        if memo_key in _FILE_HASH_CACHE:
+            return _FILE_HASH_CACHE[memo_key]
+
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(chunk_size), b''):
+                digest.update(block)
+
+        _FILE_HASH_CACHE[memo_key] = digest.hexdigest()
+        return _FILE_HASH_CACHE[memo_key]
+
     def generate_unique_filename(self, category: str, base_name: str, 
                                 extension: str = "") -> str:
         """產生唯一的檔案名稱
@@ -0,0 +1,479 @@
+"""
+本機 OpenRouter 模擬伺服器 - 離線測試與壓力測試重寫流程，不消耗實際額度
+
+用法:
+    python -m src.mock_openrouter serve --port 8765 --latency-median 2 --rate-429 0.05
+    python -m src.mock_openrouter loadtest --serve --requests 50 --concurrency 8
+
+config.ini 的 [REWRITER] ENDPOINT 指向 http://127.0.0.1:8765/api/v1/chat/completions
+(API_KEY 可為任意值) 即可讓 rewrite_text 改呼叫本機伺服器。
+"""
+from __future__ import annotations
+
+import argparse
+import configparser
+import itertools
+import json
+import logging
+import math
+import random
+import re
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+try:
+    from .file_manager import FileManager
+    from .rate_limiter import parse_rate_limits
+except ImportError:  # 允許以 `python src/mock_openrouter.py` 方式單獨運行
+    import sys as _sys
+    from pathlib import Path as _Path
+    _sys.path.append(str(_Path(__file__).resolve().parent.parent))
+    from src.file_manager import FileManager
+    from src.rate_limiter import parse_rate_limits
+
+
+logger = logging.getLogger("mock_openrouter")
+
+# 未指定 --responses 時的預設回應 (含分類關鍵字，文章會歸入 finance)
+DEFAULT_RESPONSE = """# 模擬重寫文章
+
+## 重點摘要
+- 這是本機模擬伺服器產生的內容，用於測試重寫流程。
+- 市場、投資與股票等關鍵字讓自動分類有結果可判斷。
+
+## 內容
+模擬伺服器依設定的延遲分布回應，並可注入 429 與 5xx 錯誤。
+"""
+
+
+class MockOpenRouter:
+    """模擬 OpenRouter chat/completions 端點的本機 HTTP 伺服器
+
+    回應延遲為對數常態分布 (中位數 latency_median，離散程度 latency_sigma)；
+    可依機率注入 429 (附 Retry-After) 與 500，或以 rpm 模擬每分鐘額度並回傳
+    X-RateLimit-* 標頭。請求帶 stream=true 時以 SSE 逐段送出回應，
+    首個片段前等待取樣的延遲，之後依 tokens_per_sec 送出。
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_median: float = 1.0,
+                 latency_sigma: float = 0.5, rate_429: float = 0.0, rate_500: float = 0.0,
+                 retry_after: float = 1.0, rpm: int = 0, tokens_per_sec: float = 50.0,
+                 responses: Optional[List[str]] = None, model_latency: Optional[Dict[str, float]] = None,
+                 seed: Optional[int] = None):
+        """初始化模擬伺服器 (尚未開始服務)
+
+        Args:
+            host: 綁定位址
+            port: 連接埠；0 表示自動選擇
+            latency_median: 回應延遲中位數 (秒)
+            latency_sigma: 對數常態分布的 sigma；0 表示固定延遲
+            rate_429: 回傳 429 的機率
+            rate_500: 回傳 500 的機率
+            retry_after: 429 回應的 Retry-After 秒數
+            rpm: 每分鐘請求上限；0 表示不限制
+            tokens_per_sec: 串流模式每秒送出的片段數
+            responses: 依序輪流回傳的內容；None 時使用 DEFAULT_RESPONSE
+            model_latency: 個別模型的延遲中位數，如 {'model-a': 5.0}
+            seed: 亂數種子
+        """
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.retry_after = retry_after
+        self.rpm = rpm
+        self.tokens_per_sec = max(tokens_per_sec, 0.1)
+        self.model_latency = model_latency or {}
+        self._responses = itertools.cycle(responses or [DEFAULT_RESPONSE])
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window: List[float] = []
+        self.stats = {'requests': 0, 'ok': 0, 'rate_limited': 0, 'server_errors': 0, 'streamed': 0}
+
+        # 目前開啟中的客戶端連線 (HTTP/1.1 keep-alive)，停止時一併關閉
+        self._connections: set = set()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """chat/completions 端點網址"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v1/chat/completions"
+
+    def start(self) -> "MockOpenRouter":
+        """於背景執行緒開始服務"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-openrouter", daemon=True)
+        self._thread.start()
+        logger.info(f"模擬 OpenRouter 已啟動: {self.url}")
+        return self
+
+    def stop(self):
+        """停止服務並關閉仍保持連線的客戶端"""
+        self._server.shutdown()
+        self._close_connections()
+        self._server.server_close()
+
+    def serve_forever(self):
+        """於目前執行緒服務直到中斷"""
+        logger.info(f"模擬 OpenRouter 已啟動: {self.url}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._close_connections()
+            self._server.server_close()
+
+    def _close_connections(self):
+        """中斷所有 keep-alive 連線，等待下一個請求的處理執行緒隨即結束"""
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def sample_latency(self, model: str) -> float:
+        """依對數常態分布取樣延遲秒數"""
+        median = self.model_latency.get(model, self.latency_median)
+        with self._lock:
+            noise = self._random.gauss(0, 1)
+        return max(0.0, median * math.exp(self.latency_sigma * noise))
+
+    def next_response(self) -> str:
+        with self._lock:
+            return next(self._responses)
+
+    def admit(self) -> Optional[Dict[str, str]]:
+        """決定是否注入錯誤
+
+        Returns:
+            None 表示正常回應；否則為 {'status': 狀態碼, 其餘為回應標頭}
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+            now = time.time()
+            if self.rpm:
+                self._window = [t for t in self._window if now - t < 60]
+                if len(self._window) >= self.rpm:
+                    reset = self._window[0] + 60
+                    return {
+                        'status': '429',
+                        'Retry-After': f"{reset - now:.1f}",
+                        'X-RateLimit-Limit': str(self.rpm),
+                        'X-RateLimit-Remaining': '0',
+                        'X-RateLimit-Reset': str(int(reset * 1000)),
+                    }
+                self._window.append(now)
+            roll = self._random.random()
+        if roll < self.rate_429:
+            return {'status': '429', 'Retry-After': f"{self.retry_after:g}"}
+        if roll < self.rate_429 + self.rate_500:
+            return {'status': '500'}
+        return None
+
+    def rate_limit_headers(self) -> Dict[str, str]:
+        """正常回應附帶的 X-RateLimit-* 標頭 (設定 rpm 時)"""
+        if not self.rpm:
+            return {}
+        with self._lock:
+            remaining = max(0, self.rpm - len(self._window))
+            reset = (self._window[0] if self._window else time.time()) + 60
+        return {
+            'X-RateLimit-Limit': str(self.rpm),
+            'X-RateLimit-Remaining': str(remaining),
+            'X-RateLimit-Reset': str(int(reset * 1000)),
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockOpenRouter/1.0"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def setup(self):
+        super().setup()
+        with self.server.mock._lock:
+            self.server.mock._connections.add(self.connection)
+
+    def finish(self):
+        with self.server.mock._lock:
+            self.server.mock._connections.discard(self.connection)
+        super().finish()
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_POST(self):
+        mock: MockOpenRouter = self.server.mock
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': {'code': 400, 'message': 'invalid JSON'}})
+            return
+        model = request.get('model', 'mock')
+
+        injected = mock.admit()
+        if injected is not None:
+            status = int(injected.pop('status'))
+            mock._count('rate_limited' if status == 429 else 'server_errors')
+            self._send_json(status, {'error': {'code': status, 'message': 'injected by mock'}}, injected)
+            return
+
+        latency = mock.sample_latency(model)
+        content = mock.next_response()
+        completion_tokens = max(1, len(content) // 2)
+        headers = mock.rate_limit_headers()
+
+        if request.get('stream'):
+            mock._count('streamed')
+            self._stream(model, content, latency, completion_tokens, headers)
+        else:
+            time.sleep(latency)
+            self._send_json(200, {
+                'id': f"mock-{time.time_ns()}",
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                             'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': completion_tokens},
+            }, headers)
+        mock._count('ok')
+
+    def _stream(self, model: str, content: str, latency: float, completion_tokens: int, headers: Dict[str, str]):
+        mock: MockOpenRouter = self.server.mock
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+
+        # 與 OpenRouter 相同，生成前先送出保活註解
+        self._send_chunk(b": OPENROUTER PROCESSING\n\n")
+        time.sleep(latency)
+        for piece in re.findall(r"\s*\S{1,3}|\s+", content, flags=re.S):
+            event = {'model': model, 'choices': [{'index': 0, 'delta': {'content': piece}}]}
+            self._send_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+            time.sleep(1 / mock.tokens_per_sec)
+        final = {'model': model, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+                 'usage': {'prompt_tokens': 0, 'completion_tokens': completion_tokens}}
+        self._send_chunk(f"data: {json.dumps(final)}\n\n".encode('utf-8'))
+        self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")
+
+
+def load_responses(path: Optional[str]) -> Optional[List[str]]:
+    """讀取預設回應：單一檔案或目錄下所有 .md/.txt 檔案"""
+    if not path:
+        return None
+    source = Path(path)
+    files = sorted(p for p in source.iterdir() if p.suffix in ('.md', '.txt')) if source.is_dir() else [source]
+    return [p.read_text(encoding='utf-8') for p in files] or None
+
+
+def _percentile(values: List[float], percentile: float) -> Optional[float]:
+    """最近秩法百分位數"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(percentile / 100 * len(ordered)) - 1))
+    return round(ordered[index], 3)
+
+
+def _configured_endpoint() -> str:
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    for section in ('rewriter', 'REWRITER'):
+        if config.has_option(section, 'endpoint'):
+            return config.get(section, 'endpoint')
+    return "https://openrouter.ai/api/v1/chat/completions"
+
+
+def run_load_test(requests: int, concurrency: int, transcript_chars: int = 2000,
+                  prompt_type: Optional[str] = None) -> Dict:
+    """以指定併發數呼叫 rewrite_text 並統計吞吐量與延遲
+
+    逐字稿、文章、重寫快取與模型統計都寫在暫存目錄，不影響正式資料；
+    每份逐字稿內容不同，不會命中重寫快取。
+
+    Args:
+        requests: 重寫次數
+        concurrency: 同時進行的 rewrite_text 呼叫數
+        transcript_chars: 每份合成逐字稿的字數
+        prompt_type: 提示類型；None 時沿用 config.ini
+
+    Returns:
+        統計結果 (成功/失敗數、耗時、吞吐量、p50/p90/p99 延遲)
+    """
+    from .model_stats import get_model_stats
+    from .rewriter import rewrite_text
+
+    with tempfile.TemporaryDirectory(prefix="rewrite_loadtest_") as tmp:
+        file_manager = FileManager(tmp)
+        # 模型統計先綁定到暫存目錄，避免模擬延遲影響正式的模型排序
+        get_model_stats(file_manager)
+
+        sentence = "今天我們來談談市場的變化與投資的觀念，"
+        transcripts = []
+        for index in range(requests):
+            body = (sentence * (transcript_chars // len(sentence) + 1))[:transcript_chars]
+            path = file_manager.get_path('data_output_transcripts_raw', f"loadtest_{index:04d}_transcript.txt")
+            path.write_text(f"第 {index} 份逐字稿。\n{body}\n", encoding='utf-8')
+            transcripts.append(str(path))
+
+        latencies: List[float] = []
+        failures = 0
+        lock = threading.Lock()
+
+        def one(text_file: str):
+            nonlocal failures
+            start = time.monotonic()
+            result = rewrite_text(text_file, file_manager, prompt_type)
+            elapsed = time.monotonic() - start
+            with lock:
+                if result:
+                    latencies.append(elapsed)
+                else:
+                    failures += 1
+
+        start_time = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="loadtest") as executor:
+            list(executor.map(one, transcripts))
+        wall_seconds = time.monotonic() - start_time
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'endpoint': _configured_endpoint(),
+        'requests': requests,
+        'concurrency': concurrency,
+        'succeeded': len(latencies),
+        'failed': failures,
+        'wall_seconds': round(wall_seconds, 3),
+        'throughput_rps': round(len(latencies) / wall_seconds, 3) if wall_seconds else None,
+        'p50': _percentile(latencies, 50),
+        'p90': _percentile(latencies, 90),
+        'p99': _percentile(latencies, 99),
+        'max': round(max(latencies), 3) if latencies else None,
+    }
+
+
+def _add_server_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--host", default="127.0.0.1", help="綁定位址")
+    parser.add_argument("--port", type=int, default=8765, help="連接埠")
+    parser.add_argument("--latency-median", type=float, default=1.0, help="回應延遲中位數 (秒)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="延遲對數常態分布的 sigma (0 = 固定延遲)")
+    parser.add_argument("--model-latency", default="", help="個別模型的延遲中位數，如 'model-a=5, model-b=0.5'")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="注入 429 的機率")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="注入 500 的機率")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="注入 429 時的 Retry-After 秒數")
+    parser.add_argument("--rpm", type=int, default=0, help="模擬每分鐘請求上限 (0 = 不限制)")
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0, help="串流模式每秒送出的片段數")
+    parser.add_argument("--responses", help="預設回應檔案或目錄 (.md/.txt)，依序輪流回傳")
+    parser.add_argument("--seed", type=int, help="亂數種子")
+
+
+def _build_mock(args: argparse.Namespace, host: str, port: int) -> MockOpenRouter:
+    return MockOpenRouter(
+        host=host, port=port, latency_median=args.latency_median, latency_sigma=args.latency_sigma,
+        rate_429=args.rate_429, rate_500=args.rate_500, retry_after=args.retry_after, rpm=args.rpm,
+        tokens_per_sec=args.tokens_per_sec, responses=load_responses(args.responses),
+        model_latency=parse_rate_limits(args.model_latency), seed=args.seed,
+    )
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Project Whisper 本機 OpenRouter 模擬伺服器與壓力測試")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="啟動模擬伺服器")
+    _add_server_arguments(serve)
+
+    loadtest = commands.add_parser("loadtest", help="以指定併發數呼叫 rewrite_text 並統計延遲")
+    _add_server_arguments(loadtest)
+    loadtest.add_argument("--serve", action="store_true",
+                          help="於同一行程啟動模擬伺服器 (位址取自 config.ini ENDPOINT)")
+    loadtest.add_argument("--requests", type=int, default=20, help="重寫次數")
+    loadtest.add_argument("--concurrency", type=int, default=4, help="同時進行的 rewrite_text 呼叫數")
+    loadtest.add_argument("--transcript-chars", type=int, default=2000, help="每份合成逐字稿的字數")
+    loadtest.add_argument("--prompt", help="提示類型")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        )
+    args = _build_arg_parser().parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            _build_mock(args, args.host, args.port).serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    # 壓力測試只允許打本機端點，避免誤用正式額度
+    endpoint = urlparse(_configured_endpoint())
+    if endpoint.hostname not in ("127.0.0.1", "localhost", "::1"):
+        logger.error(f"config.ini ENDPOINT 未指向本機 ({endpoint.geturl()})，為避免消耗實際額度拒絕執行")
+        return 2
+
+    mock = _build_mock(args, endpoint.hostname, endpoint.port or 80).start() if args.serve else None
+    try:
+        report = run_load_test(args.requests, args.concurrency, args.transcript_chars, args.prompt)
+    finally:
+        if mock is not None:
+            mock.stop()
+    if mock is not None:
+        report['server'] = dict(mock.stats)
+
+    logger.info(
+        f"壓力測試完成: 成功 {report['succeeded']}/{report['requests']}，耗時 {report['wall_seconds']} 秒，"
+        f"吞吐量 {report['throughput_rps']} 次/秒，延遲 p50={report['p50']}s p90={report['p90']}s p99={report['p99']}s"
+    )
+    fm = FileManager()
+    report_path = fm.get_path('data_output_reports', f"loadtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    logger.info(f"壓力測試報告已建立: {report_path}")
+    return 0 if report['failed'] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,167 @@
+"""
+重寫模型統計 - 記錄各模型的延遲與成功率並保存於 data/cache/，供模型鏈排序與 hedging 使用
+"""
+import configparser
+import json
+import logging
+import math
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .config_utils import REWRITER_SECTIONS, get_config_value
+from .file_manager import FileManager
+from .rate_limiter import parse_rate_limits
+
+logger = logging.getLogger("model_stats")
+
+STATS_FILENAME = 'rewrite_model_stats.json'
+
+# 每個模型保留最近的樣本數
+_WINDOW = 50
+
+_STORE: Optional["ModelStatsStore"] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_model_chain(config: Optional[configparser.ConfigParser] = None) -> List[str]:
+    """讀取重寫模型鏈 (config.ini [REWRITER] MODELS，依優先順序以逗號分隔)
+
+    未設定 MODELS 時只使用 MODEL 單一模型。
+    """
+    if config is None:
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+    configured = get_config_value(config, REWRITER_SECTIONS, 'models', '')
+    models = [m.strip() for m in configured.split(',') if m.strip()]
+    if not models:
+        models = [get_config_value(config, REWRITER_SECTIONS, 'model', 'deepseek/deepseek-chat-v3-0324:free').strip()]
+    # 去除重複並保留順序
+    return list(dict.fromkeys(models))
+
+
+def get_model_timeouts(config: Optional[configparser.ConfigParser] = None) -> Dict[str, float]:
+    """讀取各模型的請求逾時秒數 (config.ini [REWRITER] MODEL_TIMEOUTS)
+
+    格式與 RATE_LIMITS 相同，如 'deepseek/deepseek-chat-v3-0324:free=90, default=120'。
+    """
+    if config is None:
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+    timeouts = parse_rate_limits(get_config_value(config, REWRITER_SECTIONS, 'model_timeouts', ''))
+    timeouts.setdefault('default', 120.0)
+    return timeouts
+
+
+class ModelStatsStore:
+    """各模型的延遲與成功率統計
+
+    每個模型保留最近 50 次成功請求的延遲與 50 次結果，存放於
+    data/cache/rewrite_model_stats.json，跨執行保留。
+    """
+
+    def __init__(self, file_manager: Optional[FileManager] = None, min_samples: int = 5):
+        """載入 (必要時建立) 統計檔
+
+        Args:
+            file_manager: 檔案管理器
+            min_samples: 計算百分位數與參與排序所需的最少樣本數
+        """
+        self.file_manager = file_manager or FileManager()
+        self.path = self.file_manager.get_path('data_cache', STATS_FILENAME)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.min_samples = max(1, min_samples)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, List]] = {}
+        if self.path.exists():
+            try:
+                self._stats = json.loads(self.path.read_text(encoding='utf-8')).get('models', {})
+            except (ValueError, OSError) as e:
+                logger.warning(f"模型統計檔損毀，重新建立 {self.path}: {e}")
+
+    def _save(self):
+        payload = {'updated': datetime.now().isoformat(), 'models': self._stats}
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
+        tmp_path.replace(self.path)
+
+    def record(self, model: str, seconds: float, ok: bool):
+        """記錄一次請求結果
+
+        Args:
+            model: 模型名稱
+            seconds: 請求耗時 (秒)
+            ok: 是否成功
+        """
+        with self._lock:
+            entry = self._stats.setdefault(model, {'latencies': [], 'outcomes': []})
+            if ok:
+                entry['latencies'] = (entry['latencies'] + [round(seconds, 3)])[-_WINDOW:]
+            entry['outcomes'] = (entry['outcomes'] + [1 if ok else 0])[-_WINDOW:]
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning(f"寫入模型統計失敗: {e}")
+
+    def latency_percentile(self, model: str, percentile: float) -> Optional[float]:
+        """成功請求延遲的百分位數；樣本不足時回傳 None"""
+        with self._lock:
+            latencies = sorted(self._stats.get(model, {}).get('latencies', []))
+        if len(latencies) < self.min_samples:
+            return None
+        index = min(len(latencies) - 1, max(0, math.ceil(percentile / 100 * len(latencies)) - 1))
+        return latencies[index]
+
+    def success_rate(self, model: str) -> Optional[float]:
+        """最近請求的成功率；樣本不足時回傳 None"""
+        with self._lock:
+            outcomes = self._stats.get(model, {}).get('outcomes', [])
+        if len(outcomes) < self.min_samples:
+            return None
+        return sum(outcomes) / len(outcomes)
+
+    def _score(self, model: str) -> Optional[float]:
+        """每次成功的預期耗時 (中位延遲 / 成功率)，越小越優先"""
+        rate = self.success_rate(model)
+        if rate is None:
+            return None
+        median = self.latency_percentile(model, 50)
+        if median is None:
+            # 近期幾乎全部失敗，排到最後
+            return math.inf
+        return median / max(rate, 0.05)
+
+    def order(self, models: List[str]) -> List[str]:
+        """依統計重新排序模型鏈
+
+        只有樣本足夠的模型彼此交換位置；尚無統計的模型維持設定中的順序位置。
+        """
+        scores = {model: self._score(model) for model in models}
+        ranked = iter(sorted((m for m in models if scores[m] is not None), key=lambda m: scores[m]))
+        return [next(ranked) if scores[model] is not None else model for model in models]
+
+    def summary(self) -> Dict[str, Dict]:
+        """各模型的樣本數、成功率與 p50/p90 延遲"""
+        with self._lock:
+            models = list(self._stats)
+        return {
+            model: {
+                'samples': len(self._stats[model].get('outcomes', [])),
+                'success_rate': self.success_rate(model),
+                'p50': self.latency_percentile(model, 50),
+                'p90': self.latency_percentile(model, 90),
+            }
+            for model in models
+        }
+
+
+def get_model_stats(file_manager: Optional[FileManager] = None) -> ModelStatsStore:
+    """取得行程內共用的模型統計 (最少樣本數讀取 config.ini [REWRITER] HEDGE_MIN_SAMPLES)"""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            config = configparser.ConfigParser()
+            config.read('config.ini')
+            min_samples = int(get_config_value(config, REWRITER_SECTIONS, 'hedge_min_samples', '5'))
+            _STORE = ModelStatsStore(file_manager, min_samples=min_samples)
+        return _STORE
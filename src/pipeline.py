@@ -0,0 +1,199 @@
+"""
+下載/轉錄重疊管線 - 下載完成的檔案立即進入有界佇列供轉錄端消化
+"""
+import configparser
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from .downloader import download_from_urls
+from .file_manager import FileManager
+from .transcriber import (
+    ModelRouter, TranscriberPool, get_pool_settings, is_routing_enabled, transcribe_audio, warm_up_models
+)
+
+logger = logging.getLogger("pipeline")
+
+# 下載端結束的標記
+_DONE = object()
+
+
+def get_pipeline_settings(config: Optional[configparser.ConfigParser] = None) -> Dict:
+    """讀取 config.ini [pipeline] 設定
+
+    Returns:
+        {'enabled': 是否預設啟用, 'max_pending': 尚未轉錄完成的檔案數上限}
+    """
+    if config is None:
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+    return {
+        'enabled': config.getboolean('pipeline', 'enabled', fallback=False),
+        'max_pending': max(1, config.getint('pipeline', 'max_pending', fallback=4)),
+    }
+
+
+class DownloadTranscribePipeline:
+    """生產者/消費者模式的下載與轉錄管線
+
+    下載執行緒池為生產者，每個下載完成的檔案放入有界佇列；
+    轉錄端 (單一行程或 TranscriberPool) 為消費者。每個檔案在下載前
+    先取得一個名額，轉錄完成才歸還，因此磁碟上尚未轉錄的檔案
+    (含下載中) 不會超過 max_pending，轉錄落後時下載自動暫停。
+    """
+
+    def __init__(self, file_manager: Optional[FileManager] = None,
+                 on_transcribed: Optional[Callable[[str, str], None]] = None,
+                 max_pending: Optional[int] = None):
+        """初始化管線
+
+        Args:
+            file_manager: 檔案管理器
+            on_transcribed: 轉錄完成後呼叫 on_transcribed(音訊路徑, 轉錄檔路徑)，於主執行緒執行
+            max_pending: 尚未轉錄完成的檔案數上限；None 時讀取 config.ini
+        """
+        self.file_manager = file_manager or FileManager()
+        self.on_transcribed = on_transcribed
+        self.max_pending = max_pending or get_pipeline_settings()['max_pending']
+
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.max_pending)
+        self._router = ModelRouter(file_manager=self.file_manager) if is_routing_enabled() else None
+        self.stats = {'downloaded': 0, 'transcribed': 0, 'failed': 0, 'max_queue_depth': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _enqueue(self, audio_path: str):
+        """下載完成 (或既有檔案) 放入佇列；名額已由呼叫端取得"""
+        self._queue.put(str(audio_path))
+        with self._stats_lock:
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self._queue.qsize())
+
+    def _produce(self, url_file: Optional[str]):
+        """生產者：先送入既有的音訊檔案，再並行下載 URL 清單"""
+        try:
+            for audio_file in self.file_manager.list_audio_files('data_input_audio_raw'):
+                self._slots.acquire()
+                self._enqueue(audio_file)
+
+            def on_downloaded(path: str):
+                self._count('downloaded')
+                self._enqueue(path)
+
+            download_from_urls(url_file, self.file_manager, on_downloaded=on_downloaded, backpressure=self._slots)
+        except Exception as e:
+            logger.error(f"下載端失敗: {e}")
+        finally:
+            self._queue.put(_DONE)
+
+    def _model_for(self, audio_path: str) -> Optional[str]:
+        if self._router is None:
+            return None
+        try:
+            return self._router.route(audio_path)
+        except Exception as e:
+            logger.warning(f"模型路由失敗，使用預設模型 {Path(audio_path).name}: {e}")
+            return None
+
+    def _finish(self, audio_path: str, txt_path: Optional[str]):
+        """單一檔案轉錄結束：歸還名額並交給後續處理"""
+        self._slots.release()
+        if not txt_path:
+            self._count('failed')
+            return
+        self._count('transcribed')
+        if self.on_transcribed is not None:
+            try:
+                self.on_transcribed(audio_path, txt_path)
+            except Exception as e:
+                logger.error(f"處理音訊檔案失敗 {audio_path}: {e}")
+
+    def run(self, url_file: Optional[str] = None) -> Dict:
+        """執行管線直到所有 URL 下載並轉錄完成
+
+        Args:
+            url_file: URL 清單檔案；None 時使用 data/input/urls/urls.txt
+
+        Returns:
+            統計資料 (下載數、轉錄數、失敗數、佇列最大深度、耗時)
+        """
+        start_time = time.time()
+        producer = threading.Thread(target=self._produce, args=(url_file,), name="pipeline-producer", daemon=True)
+
+        workers, _ = get_pool_settings()
+        if workers > 1:
+            self._consume_with_pool(producer, workers)
+        else:
+            warm_up_models()
+            producer.start()
+            self._consume_sequential()
+        producer.join()
+
+        self.stats['seconds'] = round(time.time() - start_time, 1)
+        logger.info(
+            f"管線完成: 下載 {self.stats['downloaded']}，轉錄 {self.stats['transcribed']}，"
+            f"失敗 {self.stats['failed']}，佇列最大深度 {self.stats['max_queue_depth']}/{self.max_pending}，"
+            f"耗時 {self.stats['seconds']} 秒"
+        )
+        return self.stats
+
+    def _consume_sequential(self):
+        """消費者 (單一行程)：於主執行緒依序轉錄"""
+        while True:
+            audio_path = self._queue.get()
+            if audio_path is _DONE:
+                return
+            txt_path = None
+            try:
+                logger.info(f"轉錄音訊: {Path(audio_path).name}")
+                txt_path = transcribe_audio(audio_path, self.file_manager, self._model_for(audio_path))
+            except Exception as e:
+                logger.error(f"轉錄失敗 {audio_path}: {e}")
+            self._finish(audio_path, txt_path)
+
+    def _consume_with_pool(self, producer: threading.Thread, workers: int):
+        """消費者 (多行程)：派送至 TranscriberPool，完成結果回到主執行緒處理"""
+        completed: "queue.Queue" = queue.Queue()
+        in_flight = 0
+        producer_done = False
+
+        def handle_completed(audio_path, future):
+            try:
+                txt_path = future.result()
+            except Exception as e:
+                logger.error(f"轉錄失敗 {audio_path}: {e}")
+                txt_path = None
+            self._finish(audio_path, txt_path)
+
+        with TranscriberPool(workers=workers, file_manager=self.file_manager) as pool:
+            producer.start()
+            while not producer_done or in_flight:
+                # 下載端已結束時只需等待剩餘的轉錄
+                if producer_done:
+                    handle_completed(*completed.get())
+                    in_flight -= 1
+                    continue
+
+                # 先處理已完成的轉錄，再等待新的下載
+                while not completed.empty():
+                    handle_completed(*completed.get())
+                    in_flight -= 1
+
+                try:
+                    audio_path = self._queue.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                if audio_path is _DONE:
+                    producer_done = True
+                    continue
+
+                logger.info(f"轉錄音訊: {Path(audio_path).name}")
+                future = pool.submit(audio_path, self._model_for(audio_path))
+                in_flight += 1
+                future.add_done_callback(lambda f, path=audio_path: completed.put((path, f)))
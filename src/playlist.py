@@ -0,0 +1,167 @@
+"""
+播放清單/頻道展開 - 以 flat extraction 取得影片清單並快取於 data/cache/metadata/
+"""
+import configparser
+import hashlib
+import json
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import yt_dlp
+
+from .file_manager import FileManager
+
+logger = logging.getLogger("playlist")
+
+# YouTube 頻道與播放清單的路徑形式
+_YOUTUBE_COLLECTION_PATH = re.compile(r'^/(@[^/]+|channel/[^/]+|c/[^/]+|user/[^/]+|playlist)(/.*)?$')
+
+# 頻道首頁會展開為 Videos/Shorts/Live 等分頁，最多再往下展開一層
+_MAX_DEPTH = 2
+
+
+def is_collection_url(url: str) -> bool:
+    """是否為需要展開的播放清單或頻道網址
+
+    watch?v=...&list=... 視為單一影片 (與原本行為一致)。
+    """
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+    if not host.endswith('youtube.com'):
+        return False
+    query = parse_qs(parsed.query)
+    if 'v' in query:
+        return False
+    return 'list' in query or bool(_YOUTUBE_COLLECTION_PATH.match(parsed.path))
+
+
+def _entry_url(entry: Dict) -> Optional[str]:
+    """取得 flat entry 的影片網址"""
+    url = entry.get('url') or entry.get('webpage_url')
+    if url and url.startswith(('http://', 'https://')):
+        return url
+    if entry.get('ie_key') == 'Youtube' and entry.get('id'):
+        return f"https://www.youtube.com/watch?v={entry['id']}"
+    return url
+
+
+class PlaylistExpander:
+    """將播放清單/頻道網址展開為個別影片網址
+
+    使用 yt-dlp 的 extract_flat 只讀取清單頁，不逐一解析影片；
+    展開結果以 JSON 快取於 data/cache/metadata/，在 metadata_ttl_hours
+    內重複檢查同一頻道直接讀取快取，不再連線。
+    """
+
+    def __init__(self, file_manager: Optional[FileManager] = None, ttl_hours: Optional[float] = None):
+        """初始化展開器
+
+        Args:
+            file_manager: 檔案管理器
+            ttl_hours: 快取有效時數；None 時讀取 config.ini [downloader] metadata_ttl_hours
+                (預設 1 小時，頻道新上傳的影片最晚一小時後就會被看到)
+        """
+        self.file_manager = file_manager or FileManager()
+        if ttl_hours is None:
+            config = configparser.ConfigParser()
+            config.read('config.ini')
+            ttl_hours = config.getfloat('downloader', 'metadata_ttl_hours', fallback=1)
+        self.ttl_seconds = ttl_hours * 3600
+        self.cache_dir = self.file_manager.get_path('data_cache') / 'metadata'
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _cache_path(self, url: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha256(url.strip().encode('utf-8')).hexdigest()}.json"
+
+    def _load_cached(self, url: str) -> Optional[List[Dict]]:
+        cache_path = self._cache_path(url)
+        if not cache_path.exists():
+            return None
+        if self.ttl_seconds <= 0 or time.time() - cache_path.stat().st_mtime > self.ttl_seconds:
+            return None
+        try:
+            return json.loads(cache_path.read_text(encoding='utf-8'))['entries']
+        except (ValueError, KeyError, OSError) as e:
+            logger.warning(f"清單快取損毀 {cache_path}: {e}")
+            return None
+
+    def _save_cached(self, url: str, entries: List[Dict]):
+        cache_path = self._cache_path(url)
+        payload = {'url': url, 'fetched': time.time(), 'entries': entries}
+        tmp_path = cache_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding='utf-8')
+        tmp_path.replace(cache_path)
+
+    def _extract_flat(self, url: str, depth: int = 0) -> List[Dict]:
+        """以 flat extraction 取得清單內的影片 (必要時展開頻道分頁)"""
+        ydl_opts = {
+            'extract_flat': 'in_playlist',
+            'skip_download': True,
+            'quiet': True,
+            'ignoreerrors': True,
+        }
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False) or {}
+
+        entries: List[Dict] = []
+        for entry in info.get('entries') or []:
+            if not entry:
+                continue
+            entry_url = _entry_url(entry)
+            if not entry_url:
+                continue
+            # 頻道首頁的分頁 (Videos/Shorts/Live) 本身也是清單
+            if is_collection_url(entry_url) or entry.get('_type') == 'playlist':
+                if depth + 1 < _MAX_DEPTH:
+                    entries.extend(self._extract_flat(entry_url, depth + 1))
+                continue
+            entries.append({
+                'url': entry_url,
+                'id': entry.get('id'),
+                'title': entry.get('title'),
+                'duration': entry.get('duration'),
+            })
+        return entries
+
+    def expand(self, url: str) -> List[Dict]:
+        """展開單一播放清單/頻道網址
+
+        Returns:
+            影片資訊列表 (url, id, title, duration)
+        """
+        entries = self._load_cached(url)
+        if entries is not None:
+            logger.info(f"清單快取命中: {url} ({len(entries)} 部影片)")
+            return entries
+
+        start_time = time.time()
+        entries = self._extract_flat(url)
+        # 空結果多半是連線或解析失敗，不寫入快取以免在有效期內誤判為沒有影片
+        if entries:
+            self._save_cached(url, entries)
+        logger.info(f"已展開清單: {url} ({len(entries)} 部影片，{time.time() - start_time:.1f} 秒)")
+        return entries
+
+    def expand_urls(self, urls: Iterable[str]) -> List[str]:
+        """將 URL 清單中的播放清單/頻道展開為個別影片網址，其餘網址維持原順序
+
+        Args:
+            urls: URL 清單
+
+        Returns:
+            展開後的影片網址列表
+        """
+        expanded: List[str] = []
+        for url in urls:
+            if not is_collection_url(url):
+                expanded.append(url)
+                continue
+            try:
+                expanded.extend(entry['url'] for entry in self.expand(url))
+            except Exception as e:
+                logger.error(f"展開清單失敗 {url}: {e}")
+        return expanded
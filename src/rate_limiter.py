@@ -0,0 +1,166 @@
+"""
+API 速率限制 - 依模型共用的 token bucket，並依回應標頭調整
+"""
+import configparser
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+from .config_utils import REWRITER_SECTIONS, get_config_value
+
+logger = logging.getLogger("rate_limiter")
+
+# OpenRouter 免費模型的預設上限 (每分鐘請求數)
+DEFAULT_RPM = 20.0
+
+_LIMITERS: Dict[str, "TokenBucket"] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+class TokenBucket:
+    """執行緒安全的 token bucket
+
+    以每分鐘 rpm 個 token 的速率補充，最多累積 capacity 個。
+    同一模型的所有請求共用一個實例；收到 429 或剩餘額度為 0 時
+    呼叫 pause_until 讓所有等待中的請求一起暫停。
+    """
+
+    def __init__(self, rpm: float, capacity: Optional[float] = None, name: str = ""):
+        """初始化 token bucket
+
+        Args:
+            rpm: 每分鐘可發送的請求數
+            capacity: 最多可累積的 token 數 (允許的瞬間併發)；None 時為 1
+            name: 用於日誌的名稱 (模型名稱)
+        """
+        self.rate = max(rpm, 0.001) / 60.0
+        self.capacity = max(1.0, capacity or 1.0)
+        self.name = name
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """取得一個 token，必要時阻塞等待
+
+        Returns:
+            實際等待的秒數
+        """
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - start
+                else:
+                    wait = (1 - self._tokens) / self.rate
+                self._cond.wait(wait)
+
+    def release(self):
+        """歸還一個取得後未使用的 token (請求被取消或未送出)"""
+        with self._cond:
+            self._tokens = min(self.capacity, self._tokens + 1)
+            self._cond.notify_all()
+
+    def pause_until(self, resume_at: float):
+        """在 resume_at (time.monotonic) 之前暫停發送，並清空已累積的 token"""
+        with self._cond:
+            if resume_at > self._paused_until:
+                self._paused_until = resume_at
+                self._tokens = 0.0
+                self._updated = max(self._updated, resume_at)
+                logger.warning(f"速率限制 {self.name}: 暫停 {resume_at - time.monotonic():.1f} 秒")
+            self._cond.notify_all()
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """依 X-RateLimit-Remaining / X-RateLimit-Reset 標頭調整
+
+        剩餘額度為 0 時暫停到重設時間，避免下一個請求必定收到 429。
+        """
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            if float(remaining) > 0:
+                return
+            reset_seconds = parse_reset(reset)
+        except ValueError:
+            return
+        if reset_seconds > 0:
+            self.pause_until(time.monotonic() + reset_seconds)
+
+
+def parse_reset(value: str) -> float:
+    """將 X-RateLimit-Reset 轉為距今秒數
+
+    OpenRouter 以毫秒 epoch 表示，其他服務可能使用秒 epoch 或剩餘秒數。
+    """
+    reset = float(value)
+    now = time.time()
+    if reset > 1e12:  # 毫秒 epoch
+        return max(0.0, reset / 1000.0 - now)
+    if reset > 1e9:  # 秒 epoch
+        return max(0.0, reset - now)
+    return max(0.0, reset)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 標頭 (秒數或 HTTP 日期)，無法解析時回傳 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_rate_limits(value: str) -> Dict[str, float]:
+    """解析 'model=rpm, model=rpm' 格式的設定
+
+    模型名稱可能含有 ':' (如 deepseek/deepseek-chat-v3-0324:free)，
+    因此以最後一個 '=' 分隔名稱與數值。
+    """
+    limits: Dict[str, float] = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item or "=" not in item:
+            continue
+        model, rpm = item.rsplit("=", 1)
+        limits[model.strip()] = float(rpm)
+    return limits
+
+
+def get_limiter(model: str, config: Optional[configparser.ConfigParser] = None) -> TokenBucket:
+    """取得模型共用的 token bucket
+
+    速率讀取 config.ini [REWRITER] RATE_LIMITS (如
+    'deepseek/deepseek-chat-v3-0324:free=20, default=60')；
+    瞬間併發上限與 MAX_IN_FLIGHT 一致。
+    """
+    with _LIMITERS_LOCK:
+        if model not in _LIMITERS:
+            if config is None:
+                config = configparser.ConfigParser()
+                config.read("config.ini")
+            limits = parse_rate_limits(get_config_value(config, REWRITER_SECTIONS, "rate_limits", ""))
+            rpm = limits.get(model, limits.get("default", DEFAULT_RPM))
+            capacity = float(get_config_value(config, REWRITER_SECTIONS, "max_in_flight", "2"))
+            _LIMITERS[model] = TokenBucket(rpm, capacity, name=model)
+            logger.info(f"速率限制 {model}: 每分鐘 {rpm:g} 次請求")
+        return _LIMITERS[model]
@@ -0,0 +1,147 @@
+"""
+重寫結果快取 - 以 (端點, 模型, 系統提示雜湊, 逐字稿雜湊) 為 key，避免重複呼叫 OpenRouter
+"""
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from .file_manager import FileManager
+
+logger = logging.getLogger("rewrite_cache")
+
+# 本次執行的命中統計 (供 generate_summary_report 使用)
+_STATS: Dict[str, int] = {'hits': 0, 'misses': 0}
+_STATS_LOCK = threading.Lock()
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """取得本次執行的命中/未命中次數"""
+    with _STATS_LOCK:
+        return dict(_STATS)
+
+
+def _record(key: str):
+    with _STATS_LOCK:
+        _STATS[key] += 1
+
+
+def sha256_text(text: str) -> str:
+    """文字內容的 SHA-256"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class RewriteCache:
+    """內容定址的重寫結果快取
+
+    每筆記錄以單一 JSON 檔存放於 data/cache/rewrites/，保存重寫後的
+    Markdown 全文與輸出路徑。系統提示或逐字稿任何變動都會產生不同的 key。
+    """
+
+    def __init__(self, file_manager: Optional[FileManager] = None):
+        """初始化重寫快取
+
+        Args:
+            file_manager: 檔案管理器
+        """
+        self.file_manager = file_manager or FileManager()
+        self.cache_dir = self.file_manager.get_path('data_cache') / 'rewrites'
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(endpoint: str, model: str, system_prompt: str, transcript: str) -> str:
+        """產生快取 key
+
+        Args:
+            endpoint: API 端點
+            model: 模型名稱
+            system_prompt: 已解析的系統提示全文
+            transcript: 逐字稿全文
+
+        Returns:
+            十六進位 key 字串
+        """
+        payload = json.dumps(
+            {
+                'endpoint': endpoint,
+                'model': model,
+                'prompt': sha256_text(system_prompt),
+                'transcript': sha256_text(transcript),
+            },
+            sort_keys=True,
+        )
+        return sha256_text(payload)
+
+    def get(self, endpoint: str, model: str, system_prompt: str, transcript: str) -> Optional[Dict]:
+        """查詢快取
+
+        Returns:
+            快取記錄 (含 content、category、article_path)；未命中時回傳 None
+        """
+        entry_path = self.cache_dir / f"{self.make_key(endpoint, model, system_prompt, transcript)}.json"
+
+        if entry_path.exists():
+            try:
+                entry = json.loads(entry_path.read_text(encoding='utf-8'))
+                if entry.get('content'):
+                    _record('hits')
+                    return entry
+            except (ValueError, OSError) as e:
+                logger.warning(f"重寫快取記錄損毀 {entry_path}: {e}")
+            entry_path.unlink(missing_ok=True)
+
+        _record('misses')
+        return None
+
+    def put(self, endpoint: str, model: str, system_prompt: str, transcript: str, content: str,
+            prompt_type: str, category: str, article_path: str, source_path: Optional[str] = None) -> Path:
+        """寫入快取記錄
+
+        Returns:
+            記錄檔路徑
+        """
+        key = self.make_key(endpoint, model, system_prompt, transcript)
+        entry = {
+            'endpoint': endpoint,
+            'model': model,
+            'prompt_type': prompt_type,
+            'prompt_sha256': sha256_text(system_prompt),
+            'transcript_sha256': sha256_text(transcript),
+            'source_path': source_path,
+            'category': category,
+            'article_path': str(Path(article_path).resolve()),
+            'content': content,
+            'created': datetime.now().isoformat(),
+        }
+        entry_path = self.cache_dir / f"{key}.json"
+        tmp_path = entry_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=False, indent=2), encoding='utf-8')
+        tmp_path.replace(entry_path)
+        return entry_path
+
+    def invalidate(self, prompt_type: Optional[str] = None) -> int:
+        """刪除快取記錄
+
+        Args:
+            prompt_type: 只刪除此提示類型的記錄；None 時全部刪除
+
+        Returns:
+            刪除的記錄數
+        """
+        removed = 0
+        for entry_path in self.cache_dir.glob('*.json'):
+            if prompt_type is not None:
+                try:
+                    entry = json.loads(entry_path.read_text(encoding='utf-8'))
+                except (ValueError, OSError):
+                    entry = {}
+                if entry and entry.get('prompt_type') != prompt_type:
+                    continue
+            entry_path.unlink(missing_ok=True)
+            removed += 1
+
+        logger.info(f"已清除 {removed} 筆重寫快取" + (f" (prompt={prompt_type})" if prompt_type else ""))
+        return removed
@@ -1,23 +1,28 @@
 import requests
 import configparser
+import json
 import logging
+import random
+import os
+import re
+import tempfile
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, List, Optional
 
+from requests.adapters import HTTPAdapter
+
+from .config_utils import REWRITER_SECTIONS, get_config_value
+from .model_stats import get_model_chain, get_model_stats, get_model_timeouts
 from .prompt import PROMPTS
+from .rate_limiter import get_limiter, parse_retry_after
+from .rewrite_cache import RewriteCache
 from .file_manager import FileManager
 
 
-def _get_config_value(config: configparser.ConfigParser, sections, key: str, fallback=None):
-    """Helper to read config with flexible section casing and lowercased keys."""
-    for section in sections:
-        if config.has_option(section, key):
-            return config.get(section, key)
-    return fallback
-
-
 def _load_prompt_text(prompt_type: str, prompts_dir: Path) -> str:
     """Load prompt text from in-code PROMPTS or config/prompts fallback."""
     if prompt_type in PROMPTS:
@@ -43,7 +48,167 @@ def _load_prompt_text(prompt_type: str, prompts_dir: Path) -> str:
     return "你是一位專業內容編輯，請將使用者提供的逐字稿重寫成結構化、清晰的 Markdown 文章。"
 
 
-def _call_openrouter(api_key: str, endpoint: str, model: str, system_prompt: str, user_content: str, timeout: int = 120) -> str:
+# 所有重寫請求共用同一個 Session，重複使用 TCP/TLS 連線
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
+# 所有重寫 HTTP 請求 (批次、分段與 hedging) 共用的同時請求上限
+_IN_FLIGHT: Optional[threading.BoundedSemaphore] = None
+
+# 可重試的 HTTP 狀態碼
+_RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+# 讀取回應本文時可重試的錯誤
+_READ_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+# 多執行緒同時儲存文章時，避免產生相同檔名
+_SAVE_LOCK = threading.Lock()
+
+
+def get_max_in_flight(config: Optional[configparser.ConfigParser] = None) -> int:
+    """讀取同時進行的重寫請求數 (config.ini [REWRITER] MAX_IN_FLIGHT)"""
+    if config is None:
+        config = configparser.ConfigParser()
+        config.read("config.ini")
+    value = get_config_value(config, REWRITER_SECTIONS, "max_in_flight", "2")
+    return max(1, int(value))
+
+
+def _get_in_flight() -> threading.BoundedSemaphore:
+    """取得限制同時 HTTP 請求數的 semaphore (大小為 MAX_IN_FLIGHT)
+
+    rewrite_many、分段重寫與 hedging 各自有執行緒池，實際送出請求時
+    一律經過這個 semaphore，總並行數不會超過 MAX_IN_FLIGHT。
+    """
+    global _IN_FLIGHT
+    with _SESSION_LOCK:
+        if _IN_FLIGHT is None:
+            _IN_FLIGHT = threading.BoundedSemaphore(get_max_in_flight())
+        return _IN_FLIGHT
+
+
+def _get_session() -> requests.Session:
+    """取得共用的 HTTP Session；連線池大小與同時請求數一致"""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            pool_size = get_max_in_flight()
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(pool_size, 4))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _SESSION = session
+        return _SESSION
+
+
+# 預設的使用者指示 (整份逐字稿一次重寫)
+_REWRITE_INSTRUCTION = (
+    "請根據上述系統身份與工作流程，將以下逐字稿重寫為結構化、條理清晰、適合年輕讀者閱讀的 Markdown 文章。\n\n"
+    "逐字稿：\n\n"
+)
+
+# 分段模式：每段只整理重點筆記，使用精簡的系統提示以節省輸入 token
+_CHUNK_SYSTEM_PROMPT = "你是一位細心的內容整理助理，負責把長篇逐字稿的片段整理成完整、忠實的重點筆記。"
+_CHUNK_INSTRUCTION = (
+    "以下是一份長篇逐字稿的第 {index}/{total} 段。請將這一段整理為 Markdown 重點筆記，"
+    "依原本順序保留所有觀點、數據、例子與結論，不要加入前言或總結，也不要補充逐字稿以外的內容。\n\n"
+    "逐字稿片段：\n\n"
+)
+# 筆記總長仍超過預算時，將相鄰筆記再濃縮一輪
+_CONDENSE_INSTRUCTION = (
+    "以下是一份長篇逐字稿分段筆記的第 {index}/{total} 部分。請將這些筆記濃縮為一份 Markdown 重點筆記，"
+    "依原本順序保留所有關鍵觀點、數據與結論，去除重複內容，不要加入前言或總結。\n\n"
+    "分段筆記：\n\n"
+)
+# 合併階段：以原本的系統提示將各段筆記整合為一篇文章
+_MERGE_INSTRUCTION = (
+    "以下是同一份逐字稿依序分段整理的重點筆記。請根據上述系統身份與工作流程，"
+    "將這些筆記整合為一篇結構化、條理清晰、適合年輕讀者閱讀的 Markdown 文章，"
+    "去除段落間的重複內容並保持前後連貫。\n\n"
+    "分段筆記：\n\n"
+)
+
+# 切分句子的標點 (中英文)
+_SENTENCE_END = re.compile(r"(?<=[。！？；!?;])|(?<=\.)(?=\s)")
+_CJK_CHAR = re.compile(r"[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+class _Cancelled(Exception):
+    """請求已被取消 (hedging 時其他模型已先完成)"""
+
+
+class _Cancellation:
+    """取消單一模型請求的控制物件
+
+    _complete 在某個模型勝出後對其餘請求呼叫 cancel()：尚未送出的請求不再送出，
+    退避等待立即結束，讀取中的回應則中斷連線，讓讀取中的執行緒立即返回。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._response: Optional[requests.Response] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, seconds: float) -> bool:
+        """等待 seconds 秒；期間被取消時提早返回 True"""
+        return self._event.wait(seconds)
+
+    def attach(self, response: requests.Response):
+        """登記讀取中的回應；已取消時拋出 _Cancelled"""
+        with self._lock:
+            if self._event.is_set():
+                raise _Cancelled()
+            self._response = response
+
+    def detach(self):
+        with self._lock:
+            self._response = None
+
+    def cancel(self):
+        with self._lock:
+            self._event.set()
+            response, self._response = self._response, None
+        if response is not None:
+            try:
+                # 由其他執行緒關閉讀取端，阻塞中的讀取會立即返回 (urllib3 >= 2.3)
+                response.raw.shutdown()
+            except (AttributeError, ValueError, RuntimeError, OSError):
+                pass
+
+
+def _call_openrouter(
+    api_key: str,
+    endpoint: str,
+    model: str,
+    system_prompt: str,
+    user_content: str,
+    timeout: float = 120,
+    instruction: str = _REWRITE_INSTRUCTION,
+    stream_to: Optional[Path] = None,
+    max_retries: Optional[int] = None,
+    cancel: Optional[_Cancellation] = None,
+) -> str:
+    """對單一模型送出請求，遇到 429/5xx/連線錯誤時重試
+
+    timeout 為整體期限 (含速率等待、重試與讀取回應)，串流與非串流模式相同；
+    串流模式另以 STREAM_IDLE_TIMEOUT 限制兩個事件之間的閒置時間。
+
+    Args:
+        timeout: 整體逾時秒數
+        stream_to: 串流內容即時寫入的暫存檔；None 時不使用串流
+        max_retries: 最多重試次數；None 時讀取 config.ini [REWRITER] MAX_RETRIES
+        cancel: 取消控制物件 (由 _complete 用於取消落後的 hedging 請求)
+
+    Returns:
+        回應內容
+
+    Raises:
+        requests.Timeout: 超過整體期限
+    """
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
@@ -52,20 +217,402 @@ def _call_openrouter(api_key: str, endpoint: str, model: str, system_prompt: str
         "model": model,
         "messages": [
             {"role": "system", "content": system_prompt},
-            {
-                "role": "user",
-                "content": (
-                    "請根據上述系統身份與工作流程，將以下逐字稿重寫為結構化、條理清晰、適合年輕讀者閱讀的 Markdown 文章。\n\n"
-                    "逐字稿：\n\n" + user_content
-                ),
-            },
+            {"role": "user", "content": instruction + user_content},
         ],
     }
 
-    response = requests.post(endpoint, json=payload, headers=headers, timeout=timeout)
-    response.raise_for_status()
-    data = response.json()
-    return data["choices"][0]["message"]["content"]
+    config = configparser.ConfigParser()
+    config.read("config.ini")
+    if max_retries is None:
+        max_retries = int(get_config_value(config, REWRITER_SECTIONS, "max_retries", "4"))
+    idle_timeout = float(get_config_value(config, REWRITER_SECTIONS, "stream_idle_timeout", "60"))
+    if stream_to is not None:
+        payload["stream"] = True
+    cancel = cancel or _Cancellation()
+    deadline = time.monotonic() + timeout
+    limiter = get_limiter(model, config)
+    logger = logging.getLogger("rewriter")
+    in_flight = _get_in_flight()
+
+    for attempt in range(max_retries + 1):
+        # 同一模型的所有執行緒共用速率額度
+        waited = limiter.acquire()
+        if waited > 1:
+            logger.info(f"速率限制等待 {waited:.1f} 秒 (model={model})")
+
+        # 只在送出與讀取回應期間佔用名額，退避等待時釋放
+        with in_flight:
+            remaining = deadline - time.monotonic()
+            if cancel.cancelled or remaining <= 0:
+                # 請求未送出，歸還 token
+                limiter.release()
+                if cancel.cancelled:
+                    raise _Cancelled()
+                raise requests.Timeout(f"模型 {model} 超過逾時 {timeout:g} 秒")
+
+            # 回應一律以 stream=True 讀取，讀取本文時也檢查整體期限
+            request_timeout = (min(10.0, remaining), min(idle_timeout, remaining)) if stream_to else remaining
+            delay = 0.0
+            try:
+                response = _get_session().post(
+                    endpoint, json=payload, headers=headers, timeout=request_timeout, stream=True
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if cancel.cancelled:
+                    raise _Cancelled() from e
+                if attempt == max_retries:
+                    raise
+                delay = _backoff_delay(attempt)
+                logger.warning(f"OpenRouter 連線失敗，{delay:.1f} 秒後重試 ({attempt + 1}/{max_retries}): {e}")
+                response = None
+
+            if response is not None:
+                try:
+                    cancel.attach(response)
+                    limiter.update_from_headers(response.headers)
+                    if response.status_code in _RETRY_STATUS and attempt < max_retries:
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        delay = retry_after if retry_after is not None else _backoff_delay(attempt)
+                        logger.warning(
+                            f"OpenRouter 回應 {response.status_code}，{delay:.1f} 秒後重試 ({attempt + 1}/{max_retries})"
+                        )
+                        if response.status_code == 429:
+                            # 暫停整個模型的額度，其他執行緒也一併等待
+                            limiter.pause_until(time.monotonic() + delay)
+                            delay = 0.0
+                    else:
+                        response.raise_for_status()
+                        try:
+                            if stream_to is None:
+                                return _read_json(response, deadline)["choices"][0]["message"]["content"]
+                            return _read_event_stream(response, stream_to, model, deadline)
+                        except Exception as e:
+                            if cancel.cancelled:
+                                raise _Cancelled() from e
+                            if attempt == max_retries or not isinstance(e, _READ_ERRORS) or time.monotonic() >= deadline:
+                                raise
+                            delay = _backoff_delay(attempt)
+                            logger.warning(f"回應讀取中斷，{delay:.1f} 秒後重試 ({attempt + 1}/{max_retries}): {e}")
+                finally:
+                    cancel.detach()
+                    response.close()
+
+        if delay > 0:
+            if time.monotonic() + delay >= deadline:
+                raise requests.Timeout(f"模型 {model} 重試等待將超過逾時 {timeout:g} 秒")
+            if cancel.wait(delay):
+                raise _Cancelled()
+
+
+def _complete(
+    api_key: str,
+    endpoint: str,
+    models: List[str],
+    system_prompt: str,
+    user_content: str,
+    instruction: str = _REWRITE_INSTRUCTION,
+    stream_to: Optional[Path] = None,
+) -> str:
+    """依模型鏈完成一次請求 (備援與 hedging)
+
+    模型鏈先依歷史統計排序。目前最新的請求超過該模型的延遲百分位數
+    (HEDGE_PERCENTILE) 仍未回應時，同時對下一個模型送出重複請求；
+    任一模型失敗時立即改用下一個模型。鏈中還有下一個模型時，每個模型
+    最多重試一次。最先成功的回應勝出，其餘仍在進行的請求立即取消。
+    串流模式不送出重複請求。每個模型的逾時 (MODEL_TIMEOUTS) 為整體期限。
+
+    Returns:
+        回應內容
+
+    Raises:
+        RuntimeError: 模型鏈中所有模型皆失敗
+    """
+    logger = logging.getLogger("rewriter")
+    config = configparser.ConfigParser()
+    config.read("config.ini")
+    timeouts = get_model_timeouts(config)
+    hedge_percentile = float(get_config_value(config, REWRITER_SECTIONS, "hedge_percentile", "90"))
+    max_retries = int(get_config_value(config, REWRITER_SECTIONS, "max_retries", "4"))
+    stats = get_model_stats()
+    chain = stats.order(models)
+    if chain != models:
+        logger.info(f"依歷史統計調整模型順序: {', '.join(chain)}")
+    # 還有備援模型時不在同一個模型上反覆重試
+    hop_retries = min(max_retries, 1) if len(chain) > 1 else max_retries
+
+    def attempt(model: str, cancel: _Cancellation) -> str:
+        start = time.monotonic()
+        try:
+            content = _call_openrouter(
+                api_key, endpoint, model, system_prompt, user_content,
+                timeout=timeouts.get(model, timeouts["default"]), instruction=instruction, stream_to=stream_to,
+                max_retries=hop_retries, cancel=cancel,
+            )
+        except _Cancelled:
+            raise
+        except Exception:
+            stats.record(model, time.monotonic() - start, ok=False)
+            raise
+        stats.record(model, time.monotonic() - start, ok=True)
+        return content
+
+    executor = ThreadPoolExecutor(max_workers=len(chain), thread_name_prefix="rewrite-model")
+    pending = {}
+    cancels = {}
+    errors: List[str] = []
+    next_index = 0
+
+    def launch() -> Optional[float]:
+        """送出鏈中下一個模型的請求，回傳觸發 hedging 的等待秒數"""
+        nonlocal next_index
+        model = chain[next_index]
+        next_index += 1
+        cancel = _Cancellation()
+        future = executor.submit(attempt, model, cancel)
+        pending[future] = model
+        cancels[future] = cancel
+        if stream_to is not None or hedge_percentile <= 0:
+            return None
+        return stats.latency_percentile(model, hedge_percentile)
+
+    try:
+        hedge_after = launch()
+        while pending:
+            can_launch = next_index < len(chain)
+            done, _ = wait(pending, timeout=hedge_after if can_launch else None, return_when=FIRST_COMPLETED)
+            if not done:
+                logger.info(
+                    f"{chain[next_index - 1]} 超過 p{hedge_percentile:g} 延遲 {hedge_after:.1f} 秒，"
+                    f"同時改送 {chain[next_index]}"
+                )
+                hedge_after = launch()
+                continue
+
+            for future in done:
+                model = pending.pop(future)
+                try:
+                    content = future.result()
+                except Exception as e:
+                    errors.append(f"{model}: {e}")
+                    logger.warning(f"模型 {model} 請求失敗: {e}")
+                    continue
+                if model != chain[0]:
+                    logger.info(f"由備援模型 {model} 完成請求")
+                return content
+
+            # 有模型失敗：立即改用下一個模型
+            if next_index < len(chain):
+                logger.info(f"改用下一個模型 {chain[next_index]}")
+                hedge_after = launch()
+    finally:
+        # 取消落後的請求：中斷連線並歸還速率額度，不阻塞呼叫端
+        for future in pending:
+            cancels[future].cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    raise RuntimeError("所有模型皆請求失敗: " + "; ".join(errors))
+
+
+def _read_json(response: requests.Response, deadline: float) -> dict:
+    """讀取非串流回應的 JSON 本文，超過 deadline (time.monotonic) 時拋出 requests.Timeout"""
+    body = bytearray()
+    for chunk in response.iter_content(chunk_size=65536):
+        body += chunk
+        if time.monotonic() > deadline:
+            raise requests.Timeout("讀取回應超過逾時")
+    return json.loads(body)
+
+
+def _read_event_stream(
+    response: requests.Response, partial_path: Path, model: str, deadline: Optional[float] = None
+) -> str:
+    """讀取 SSE 串流，每個片段到達時立即附加到 partial_path
+
+    Args:
+        response: 以 stream=True 發送的回應
+        partial_path: 暫存檔路徑 (每次嘗試重新寫入)
+        model: 模型名稱 (用於日誌)
+        deadline: 整體期限 (time.monotonic)；超過時拋出 requests.Timeout
+
+    Returns:
+        完整的回應內容
+    """
+    logger = logging.getLogger("rewriter")
+    start = time.monotonic()
+    first_token_at = None
+    completion_tokens = None
+    pieces: List[str] = []
+
+    # SSE 一律為 UTF-8；text/event-stream 未標示 charset 時 requests 會誤判為 ISO-8859-1
+    response.encoding = "utf-8"
+    with open(partial_path, "w", encoding="utf-8") as f:
+        # chunk_size=None：依伺服器送出的區塊即時處理，不等待緩衝填滿
+        for line in response.iter_lines(chunk_size=None, decode_unicode=True, delimiter="\n"):
+            if deadline is not None and time.monotonic() > deadline:
+                raise requests.Timeout(f"串流超過逾時 (model={model})")
+            line = line.rstrip("\r")
+            # 空行分隔事件；':' 開頭為註解 (OpenRouter 處理中的保活訊息)
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            event = json.loads(data)
+            if event.get("error"):
+                raise RuntimeError(f"串流回傳錯誤: {event['error']}")
+            usage = event.get("usage") or {}
+            completion_tokens = usage.get("completion_tokens") or completion_tokens
+            for choice in event.get("choices") or []:
+                delta = (choice.get("delta") or {}).get("content")
+                if not delta:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.monotonic()
+                pieces.append(delta)
+                f.write(delta)
+                f.flush()
+
+    content = "".join(pieces)
+    if first_token_at is None:
+        raise RuntimeError("串流未回傳任何內容")
+
+    generation_seconds = max(time.monotonic() - first_token_at, 1e-3)
+    tokens = completion_tokens or estimate_tokens(content)
+    logger.info(
+        f"串流完成 (model={model}): 首個 token {first_token_at - start:.2f} 秒，"
+        f"{tokens} tokens，{tokens / generation_seconds:.1f} tokens/秒"
+    )
+    return content
+
+
+def _backoff_delay(attempt: int, base: float = 2.0, cap: float = 60.0) -> float:
+    """第 attempt 次重試前的等待秒數 (指數退避加隨機抖動)"""
+    delay = min(cap, base * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def estimate_tokens(text: str) -> int:
+    """粗估文字的 token 數
+
+    中日韓文字約 1 字 1 token，其餘文字約 4 個字元 1 token。
+    """
+    cjk = len(_CJK_CHAR.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def get_chunk_tokens(config: Optional[configparser.ConfigParser] = None) -> int:
+    """讀取分段重寫的 token 預算 (config.ini [REWRITER] CHUNK_TOKENS)
+
+    預算為單一請求的輸入上限 (系統提示 + 指示 + 內容)，應依模型的
+    上下文長度扣除輸出所需空間設定。預設 0 表示停用，一律整份重寫。
+    """
+    if config is None:
+        config = configparser.ConfigParser()
+        config.read("config.ini")
+    value = get_config_value(config, REWRITER_SECTIONS, "chunk_tokens", "0")
+    return max(0, int(value or 0))
+
+
+def _content_budget(chunk_tokens: int, system_prompt: str, instruction: str) -> int:
+    """扣除系統提示與指示後，單一請求可放入的內容 token 數"""
+    return max(1, chunk_tokens - estimate_tokens(system_prompt) - estimate_tokens(instruction))
+
+
+def split_transcript(text: str, max_tokens: int) -> List[str]:
+    """依段落/句子邊界將逐字稿切為不超過 max_tokens 的片段
+
+    Whisper 逐字稿每行為一個片段，優先在行尾切分；單行過長時
+    再依句末標點切分，仍過長的句子才直接依字數截斷。
+
+    Args:
+        text: 逐字稿全文
+        max_tokens: 每段的 token 預算
+
+    Returns:
+        片段列表 (依原本順序)
+    """
+    units: List[str] = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if estimate_tokens(line) <= max_tokens:
+            units.append(line)
+            continue
+        for sentence in _SENTENCE_END.split(line):
+            sentence = sentence.strip()
+            while sentence and estimate_tokens(sentence) > max_tokens:
+                # 沒有標點的超長句子：以 token 預算估算可容納的字數
+                cut = max(1, len(sentence) * max_tokens // estimate_tokens(sentence))
+                units.append(sentence[:cut])
+                sentence = sentence[cut:].strip()
+            if sentence:
+                units.append(sentence)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit) + 1
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _rewrite_chunked(
+    api_key: str, endpoint: str, models: List[str], system_prompt: str, transcript: str, chunk_tokens: int,
+    stream_to: Optional[Path] = None,
+) -> str:
+    """分段重寫 (map-reduce)
+
+    逐字稿切段後同時整理各段重點筆記，再以原本的系統提示將筆記合併為
+    一篇文章。筆記加上原本的系統提示仍超過預算時，先將相鄰筆記再次濃縮後才合併。
+    各段的 token 預算皆已扣除該請求的系統提示與指示。
+    啟用串流時只有最後的合併請求以串流寫入 stream_to。
+    """
+    logger = logging.getLogger("rewriter")
+    instruction = _CHUNK_INSTRUCTION
+    part_budget = _content_budget(chunk_tokens, _CHUNK_SYSTEM_PROMPT, instruction)
+    merge_budget = _content_budget(chunk_tokens, system_prompt, _MERGE_INSTRUCTION)
+    parts = split_transcript(transcript, part_budget)
+    max_in_flight = get_max_in_flight()
+
+    round_no = 1
+    while True:
+        total = len(parts)
+        logger.info(f"分段重寫第 {round_no} 輪: {total} 段 (每段上限約 {part_budget} tokens，同時 {max_in_flight} 個請求)")
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=min(max_in_flight, total), thread_name_prefix="rewrite-chunk") as executor:
+            futures = [
+                executor.submit(
+                    _complete, api_key, endpoint, models, _CHUNK_SYSTEM_PROMPT, part,
+                    instruction=instruction.format(index=index, total=total),
+                )
+                for index, part in enumerate(parts, 1)
+            ]
+            notes = [future.result() for future in futures]
+        logger.info(f"分段重寫第 {round_no} 輪完成，耗時 {time.time() - start_time:.1f} 秒")
+
+        merged_notes = "\n\n---\n\n".join(notes)
+        if len(notes) == 1 or estimate_tokens(merged_notes) <= merge_budget:
+            break
+        # 筆記仍過長：以筆記為輸入再濃縮一輪
+        instruction = _CONDENSE_INSTRUCTION
+        part_budget = _content_budget(chunk_tokens, _CHUNK_SYSTEM_PROMPT, instruction)
+        parts = split_transcript(merged_notes, part_budget)
+        if len(parts) >= total:
+            break
+        round_no += 1
+
+    logger.info(f"合併 {len(notes)} 段筆記為完整文章")
+    return _complete(
+        api_key, endpoint, models, system_prompt, merged_notes, instruction=_MERGE_INSTRUCTION, stream_to=stream_to
+    )
 
 
 def _limit_filename_base(base: str, max_len: int = 15) -> str:
@@ -104,24 +651,28 @@ def rewrite_text(
     config = configparser.ConfigParser()
     config.read("config.ini")
 
-    api_key = _get_config_value(config, ["openrouter", "OPENROUTER"], "api_key")
+    api_key = get_config_value(config, ["openrouter", "OPENROUTER"], "api_key")
     if not api_key:
         logger.error("OpenRouter API 金鑰未設定 (config.ini [OPENROUTER] API_KEY)")
         return None
 
-    endpoint = _get_config_value(
-        config, ["rewriter", "REWRITER"], "endpoint", "https://openrouter.ai/api/v1/chat/completions"
+    endpoint = get_config_value(
+        config, REWRITER_SECTIONS, "endpoint", "https://openrouter.ai/api/v1/chat/completions"
     )
-    model = _get_config_value(
-        config, ["rewriter", "REWRITER"], "model", "deepseek/deepseek-chat-v3-0324:free"
+    models = get_model_chain(config)
+    # 快取 key 以設定的模型鏈為準；只設定單一模型時與先前的記錄相容
+    model = ",".join(models)
+    default_prompt_type = get_config_value(
+        config, REWRITER_SECTIONS, "prompt", "finance"
     )
-    default_prompt_type = _get_config_value(
-        config, ["rewriter", "REWRITER"], "prompt", "finance"
-    )
-    auto_categorize = _get_config_value(
-        config, ["rewriter", "REWRITER"], "auto_categorize_output", "true"
+    auto_categorize = get_config_value(
+        config, REWRITER_SECTIONS, "auto_categorize_output", "true"
     )
     auto_categorize = str(auto_categorize).strip().lower() in {"1", "true", "yes", "y"}
+    use_cache = get_config_value(config, REWRITER_SECTIONS, "rewrite_cache", "true")
+    use_cache = str(use_cache).strip().lower() in {"1", "true", "yes", "y"}
+    stream = get_config_value(config, REWRITER_SECTIONS, "stream", "false")
+    stream = str(stream).strip().lower() in {"1", "true", "yes", "y"}
 
     effective_prompt_type = (prompt_type or default_prompt_type or "general").strip().lower()
 
@@ -136,20 +687,62 @@ def rewrite_text(
     prompts_dir = file_manager.get_path("config_prompts")
     system_prompt = _load_prompt_text(effective_prompt_type, prompts_dir)
 
+    # 相同端點/模型/系統提示/逐字稿直接沿用先前的重寫結果
+    cache = RewriteCache(file_manager) if use_cache else None
+    cached = cache.get(endpoint, model, system_prompt, transcript_text) if cache else None
+    if cached:
+        article_path = Path(cached.get("article_path") or "")
+        if article_path.is_file() and category in (None, cached.get("category")):
+            logger.info(f"重寫快取命中: {text_path.name} -> {article_path.name}")
+            return str(article_path)
+        logger.info(f"重寫快取命中: {text_path.name}，重新輸出文章")
+
+    # Build filename: {timestamp}_{basename15}_{prompt}.md
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    base_name = text_path.stem
+    # Strip common suffix like _transcript
+    if base_name.endswith("_transcript"):
+        base_name = base_name[: -len("_transcript")]
+    base_name = _limit_filename_base(base_name)
+    safe_prompt = effective_prompt_type.replace("/", "-")
+    file_base = f"{timestamp}_{base_name}_{safe_prompt}"
+
     # Call OpenRouter to rewrite
-    try:
-        logger.info(
-            f"呼叫 OpenRouter 重寫內容 (model={model}, prompt={effective_prompt_type})"
-        )
-        rewritten_content = _call_openrouter(api_key, endpoint, model, system_prompt, transcript_text)
-        # Cooldown to avoid rate limits
-        time.sleep(10)
-    except Exception as e:
-        logger.error(f"OpenRouter 重寫失敗: {e}")
-        return None
+    partial_path = None
+    if cached:
+        rewritten_content = cached["content"]
+    else:
+        try:
+            logger.info(
+                f"呼叫 OpenRouter 重寫內容 (model={model}, prompt={effective_prompt_type})"
+            )
+            if stream:
+                # 串流內容先寫入文章目錄的 .partial 暫存檔，完成後再更名；
+                # 暫存檔名由 mkstemp 保證唯一，同時重寫相同時間戳記的逐字稿也不會互相覆寫
+                article_dir = file_manager.get_path(f"data_output_articles_{category or 'general'}")
+                article_dir.mkdir(parents=True, exist_ok=True)
+                fd, partial_name = tempfile.mkstemp(dir=article_dir, prefix=f"{file_base}_", suffix=".md.partial")
+                os.close(fd)
+                partial_path = Path(partial_name)
+            # 請求 (含系統提示) 超過預算時改用分段重寫，避免單一請求過長而逾時或被截斷
+            chunk_tokens = get_chunk_tokens(config)
+            request_tokens = estimate_tokens(system_prompt + _REWRITE_INSTRUCTION + transcript_text)
+            if chunk_tokens and request_tokens > chunk_tokens:
+                rewritten_content = _rewrite_chunked(
+                    api_key, endpoint, models, system_prompt, transcript_text, chunk_tokens, partial_path
+                )
+            else:
+                rewritten_content = _complete(
+                    api_key, endpoint, models, system_prompt, transcript_text, stream_to=partial_path
+                )
+        except Exception as e:
+            logger.error(f"OpenRouter 重寫失敗: {e}")
+            if partial_path is not None and partial_path.exists():
+                logger.info(f"已保留部分重寫內容: {partial_path}")
+            return None
 
     # Decide category
-    final_category = category
+    final_category = category or (cached or {}).get("category")
     if not final_category and auto_categorize:
         try:
             final_category = file_manager.categorize_content_by_keywords(rewritten_content)
@@ -158,23 +751,65 @@ def rewrite_text(
     if not final_category:
         final_category = "general"
 
-    # Build filename: {timestamp}_{basename15}_{prompt}.md
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    base_name = text_path.stem
-    # Strip common suffix like _transcript
-    if base_name.endswith("_transcript"):
-        base_name = base_name[: -len("_transcript")]
-    base_name = _limit_filename_base(base_name)
-    safe_prompt = effective_prompt_type.replace("/", "-")
-    filename = f"{timestamp}_{base_name}_{safe_prompt}.md"
+    target_dir = f"data_output_articles_{final_category}"
 
     # Save to category directory
     try:
-        saved_path = file_manager.save_file(
-            rewritten_content, f"data_output_articles_{final_category}", filename
-        )
+        with _SAVE_LOCK:
+            filename = file_manager.generate_unique_filename(target_dir, file_base, ".md")
+            if partial_path is not None:
+                # 串流已完整寫入暫存檔，以原子更名取代重新寫入
+                saved_path = partial_path.replace(file_manager.get_path(target_dir, filename))
+            else:
+                saved_path = file_manager.save_file(rewritten_content, target_dir, filename)
         logger.info(f"重寫完成並已儲存: {saved_path}")
-        return str(saved_path)
     except Exception as e:
         logger.error(f"儲存重寫結果失敗: {e}")
         return None
+
+    if cache:
+        try:
+            cache.put(
+                endpoint, model, system_prompt, transcript_text, rewritten_content,
+                effective_prompt_type, final_category, str(saved_path), str(text_path),
+            )
+        except OSError as e:
+            logger.warning(f"寫入重寫快取失敗: {e}")
+    return str(saved_path)
+
+
+def rewrite_many(
+    text_files: Iterable[str],
+    file_manager: Optional[FileManager] = None,
+    prompt_type: Optional[str] = None,
+    category: Optional[str] = None,
+    max_in_flight: Optional[int] = None,
+) -> List[Optional[str]]:
+    """同時重寫多個文字檔案
+
+    Args:
+        text_files: 文字檔案路徑
+        file_manager: 檔案管理器實例
+        prompt_type: 提示類型
+        category: 文章分類；None 時可自動分類
+        max_in_flight: 同時進行的請求數；None 時讀取 config.ini [REWRITER] MAX_IN_FLIGHT
+
+    Returns:
+        與輸入順序一致的 Markdown 檔案路徑列表；失敗者為 None
+    """
+    text_files = [str(f) for f in text_files]
+    if not text_files:
+        return []
+    if file_manager is None:
+        file_manager = FileManager()
+    max_in_flight = max_in_flight or get_max_in_flight()
+
+    logger = logging.getLogger("rewriter")
+    logger.info(f"批次重寫 {len(text_files)} 個文字檔案 (同時 {max_in_flight} 個請求)")
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="rewrite") as executor:
+        futures = [
+            executor.submit(rewrite_text, text_file, file_manager, prompt_type, category)
+            for text_file in text_files
+        ]
+        return [future.result() for future in futures]
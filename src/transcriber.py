@@ -5,10 +5,547 @@ import sys
 import configparser
 import os
 import subprocess
+import json
 import logging
+import warnings
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from bisect import bisect_left, bisect_right
 from datetime import datetime
 from pathlib import Path
-from .file_manager import FileManager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from .file_manager import AUDIO_EXTENSIONS, FileManager
+from . import audio_utils, transcript_cache
+from .transcript_cache import TranscriptCache
+
+# ------------------------------
+# 模型快取 (每個行程只載入一次)
+# ------------------------------
+# key: (model_name, device, dtype)
+_MODEL_CACHE: Dict[Tuple[str, str, str], "whisper.Whisper"] = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+
+# 解碼快取以唯讀 mmap 提供波形，torch.from_numpy 的不可寫警告可忽略
+warnings.filterwarnings("ignore", message="The given NumPy array is not writable")
+
+# 是否在工作池的 worker 行程內 (worker 內不再巢狀建立工作池)
+_IN_POOL_WORKER = False
+
+
+def _quantize_setting() -> Optional[str]:
+    """讀取 [transcriber] quantize 設定 (目前支援 int8)"""
+    value = _read_config().get('transcriber', 'quantize', fallback='').strip().lower()
+    return value if value in {'int8'} else None
+
+
+def _default_device() -> str:
+    # int8 動態量化僅支援 CPU 推論
+    if _quantize_setting() == 'int8':
+        return "cpu"
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _default_dtype(device: str) -> str:
+    if device.startswith("cuda"):
+        return "float16"
+    return _quantize_setting() or "float32"
+
+
+def _quantize_int8(model):
+    """對模型的線性層套用 int8 動態量化 (僅 CPU)
+
+    whisper 自訂的 Linear 會在 forward 中轉換權重型別，torch 的動態量化
+    無法辨識，先替換為等效的 nn.Linear 再量化。
+    """
+    def replace_linear(module: torch.nn.Module):
+        for name, child in module.named_children():
+            if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+                plain = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+                plain.weight = child.weight
+                if child.bias is not None:
+                    plain.bias = child.bias
+                setattr(module, name, plain)
+            else:
+                replace_linear(child)
+
+    model = model.cpu().float().eval()
+    replace_linear(model)
+    with warnings.catch_warnings():
+        # quantize_dynamic 已標示為 deprecated，但仍是 CPU 上最簡便的 int8 推論方式
+        warnings.simplefilter("ignore")
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load_whisper_model(model_name: str, device: str):
+    """從磁碟載入 Whisper 模型，必要時自動下載"""
+    logger = logging.getLogger("transcriber")
+    try:
+        return whisper.load_model(model_name, device=device)
+    except RuntimeError as e:
+        if "Model" in str(e) and "not found" in str(e):
+            logger.info(f"模型 {model_name} 未找到，正在下載...")
+            # 自動下載模型
+            subprocess.run(["whisper", "--model", model_name], check=True)
+            return whisper.load_model(model_name, device=device)
+        logger.error(f"模型載入失敗: {e}")
+        raise e
+
+
+def _read_config() -> configparser.ConfigParser:
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    return config
+
+
+def get_model(model_name: str, device: Optional[str] = None, dtype: Optional[str] = None):
+    """取得快取中的 Whisper 模型，未快取時才從磁碟載入
+
+    Args:
+        model_name: 模型名稱 (tiny, base, small, medium, large)
+        device: 運算裝置 (cpu, cuda)；None 時自動選擇
+        dtype: 推論精度 (float32, float16, int8)；None 時依裝置與 quantize 設定決定
+
+    Returns:
+        Whisper 模型實例
+    """
+    device = device or _default_device()
+    dtype = dtype or _default_dtype(device)
+    key = (model_name, device, dtype)
+
+    with _MODEL_CACHE_LOCK:
+        model = _MODEL_CACHE.get(key)
+        if model is None:
+            logger = logging.getLogger("transcriber")
+            logger.info(f"載入 Whisper 模型: {model_name} (device={device}, dtype={dtype})")
+            if dtype == "int8":
+                if device != "cpu":
+                    raise ValueError("int8 量化模型僅支援 CPU")
+                model = _quantize_int8(_load_whisper_model(model_name, "cpu"))
+            else:
+                model = _load_whisper_model(model_name, device)
+            _MODEL_CACHE[key] = model
+        return model
+
+
+def warm_up_models(model_names: Optional[Iterable[str]] = None, device: Optional[str] = None,
+                   dtype: Optional[str] = None) -> List[Tuple[str, str, str]]:
+    """預先載入模型，讓第一個檔案不必等待模型載入
+
+    Args:
+        model_names: 要載入的模型；None 時使用 config.ini 的 model_name
+
+    Returns:
+        已載入的快取 key 列表
+    """
+    if model_names is None:
+        model_names = [_read_config().get('transcriber', 'model_name', fallback='base')]
+    device = device or _default_device()
+    dtype = dtype or _default_dtype(device)
+    keys = []
+    for name in model_names:
+        get_model(name, device, dtype)
+        keys.append((name, device, dtype))
+    return keys
+
+
+def evict_model(model_name: Optional[str] = None, device: Optional[str] = None,
+                dtype: Optional[str] = None) -> int:
+    """從快取移除模型並釋放記憶體
+
+    未指定的欄位視為萬用字元；全部省略時清空整個快取。
+
+    Returns:
+        移除的模型數量
+    """
+    with _MODEL_CACHE_LOCK:
+        keys = [
+            key for key in _MODEL_CACHE
+            if (model_name is None or key[0] == model_name)
+            and (device is None or key[1] == device)
+            and (dtype is None or key[2] == dtype)
+        ]
+        for key in keys:
+            del _MODEL_CACHE[key]
+
+    if keys:
+        import gc
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        logging.getLogger("transcriber").info(f"已釋放 {len(keys)} 個快取模型")
+    return len(keys)
+
+
+def cached_models() -> List[Tuple[str, str, str]]:
+    """列出目前快取中的模型 key"""
+    with _MODEL_CACHE_LOCK:
+        return list(_MODEL_CACHE.keys())
+
+
+# ------------------------------
+# 語音活動偵測 (VAD) 前處理
+# ------------------------------
+def detect_speech_regions(audio: np.ndarray, frame_seconds: float = 0.03, margin_db: float = 12.0,
+                          floor_db: float = -50.0, max_zcr: float = 0.35, min_zcr_std: float = 0.0,
+                          min_speech_seconds: float = 0.3, min_silence_seconds: float = 0.8,
+                          pad_seconds: float = 0.2) -> List[Tuple[int, int]]:
+    """以能量與過零率偵測語音區段
+
+    能量門檻取背景噪音 (第 10 百分位能量) 加上 margin_db，且不低於 floor_db；
+    過零率高於 max_zcr 的音框視為噪音。min_zcr_std > 0 時，另以 1 秒視窗內
+    過零率的標準差排除變化平穩的音樂段落 (語音的清/濁音交替使過零率起伏較大)。
+
+    Returns:
+        語音區段的 (起始樣本, 結束樣本) 列表
+    """
+    sr = audio_utils.SAMPLE_RATE
+    frame_length = max(1, int(frame_seconds * sr))
+    rms = audio_utils.frame_rms(audio, frame_seconds)
+    zcr = audio_utils.frame_zcr(audio, frame_seconds)
+    if len(rms) == 0:
+        return []
+
+    energy_db = 20 * np.log10(rms + 1e-10)
+    threshold = max(float(np.percentile(energy_db, 10)) + margin_db, floor_db)
+    speech = (energy_db > threshold) & (zcr < max_zcr)
+
+    if min_zcr_std > 0:
+        window = max(1, int(1.0 / frame_seconds))
+        kernel = np.ones(window) / window
+        mean = np.convolve(zcr, kernel, mode='same')
+        var = np.convolve(zcr * zcr, kernel, mode='same') - mean * mean
+        speech &= np.sqrt(np.clip(var, 0, None)) >= min_zcr_std
+
+    # 取得連續語音音框的起訖
+    padded = np.concatenate(([False], speech, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    regions = list(zip(edges[::2], edges[1::2]))
+
+    # 合併間隔過短的區段，再移除過短的區段
+    min_gap = int(min_silence_seconds / frame_seconds)
+    merged: List[List[int]] = []
+    for start, end in regions:
+        if merged and start - merged[-1][1] < min_gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    min_len = int(min_speech_seconds / frame_seconds)
+    pad = int(pad_seconds * sr)
+
+    result: List[Tuple[int, int]] = []
+    for start, end in merged:
+        if end - start < min_len:
+            continue
+        start_sample = max(0, int(start) * frame_length - pad)
+        end_sample = min(len(audio), int(end) * frame_length + pad)
+        if result and start_sample <= result[-1][1]:
+            result[-1] = (result[-1][0], end_sample)
+        else:
+            result.append((start_sample, end_sample))
+    return result
+
+
+def _apply_vad(audio: np.ndarray, regions: List[Tuple[int, int]]) -> Tuple[np.ndarray, List[Tuple[float, float]]]:
+    """只保留語音區段並串接
+
+    Returns:
+        (串接後的波形, 時間對照表 [(串接後起點秒, 原始起點秒), ...])
+    """
+    sr = audio_utils.SAMPLE_RATE
+    timeline = []
+    position = 0
+    for start, end in regions:
+        timeline.append((position / sr, float(start) / sr))
+        position += int(end - start)
+    if not regions:
+        return np.zeros(0, dtype=np.float32), timeline
+    return np.concatenate([audio[start:end] for start, end in regions]), timeline
+
+
+def _remap_timestamps(result: dict, timeline: List[Tuple[float, float]]) -> dict:
+    """將串接後波形上的時間戳記換算回原始時間軸
+
+    起點落在區段邊界時歸入後一個區段；終點落在邊界時歸入前一個區段
+    (該區段在此結束)，避免片段橫跨被移除的靜音。
+    """
+    if not timeline:
+        return result
+    starts = [t[0] for t in timeline]
+
+    def remap(t: float, is_end: bool = False) -> float:
+        index = bisect_left(starts, t) if is_end else bisect_right(starts, t)
+        i = max(0, index - 1)
+        return round(float(timeline[i][1] + (t - timeline[i][0])), 3)
+
+    for seg in result.get("segments", []):
+        seg["start"] = remap(seg["start"])
+        seg["end"] = remap(seg["end"], is_end=True)
+        for word in seg.get("words", []):
+            word["start"] = remap(word["start"])
+            word["end"] = remap(word["end"], is_end=True)
+    return result
+
+
+def _get_vad_settings(config: configparser.ConfigParser) -> dict:
+    return {
+        'margin_db': config.getfloat('transcriber', 'vad_margin_db', fallback=12.0),
+        'floor_db': config.getfloat('transcriber', 'vad_floor_db', fallback=-50.0),
+        'max_zcr': config.getfloat('transcriber', 'vad_max_zcr', fallback=0.35),
+        'min_zcr_std': config.getfloat('transcriber', 'vad_min_zcr_std', fallback=0.0),
+        'min_silence_seconds': config.getfloat('transcriber', 'vad_min_silence_seconds', fallback=0.8),
+    }
+
+
+# whisper.transcribe 預設的溫度回退階梯
+WHISPER_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+
+# 解碼速度設定檔；未設定 profile 時沿用 whisper 預設值
+DECODE_PROFILES: Dict[str, dict] = {
+    # 貪婪解碼、不回退、不以前文為條件，速度最快
+    'fast': {
+        'temperature': (0.0,),
+        'beam_size': None,
+        'best_of': None,
+        'condition_on_previous_text': False,
+        'compression_ratio_threshold': 2.4,
+        'logprob_threshold': -1.0,
+        'no_speech_threshold': 0.6,
+    },
+    # 貪婪解碼，回退溫度縮減為兩階
+    'balanced': {
+        'temperature': (0.0, 0.4, 0.8),
+        'beam_size': None,
+        'best_of': 3,
+        'condition_on_previous_text': True,
+        'compression_ratio_threshold': 2.4,
+        'logprob_threshold': -1.0,
+        'no_speech_threshold': 0.6,
+    },
+    # beam search 與完整回退序列
+    'accurate': {
+        'temperature': WHISPER_TEMPERATURES,
+        'beam_size': 5,
+        'best_of': 5,
+        'condition_on_previous_text': True,
+        'compression_ratio_threshold': 2.4,
+        'logprob_threshold': -1.0,
+        'no_speech_threshold': 0.6,
+    },
+}
+
+
+def _get_profile_options(config: configparser.ConfigParser) -> dict:
+    """依 [transcriber] profile 與個別覆寫值組合 whisper 解碼參數"""
+    profile = config.get('transcriber', 'profile', fallback='').strip().lower()
+    if profile and profile not in DECODE_PROFILES:
+        logging.getLogger("transcriber").warning(f"未知的解碼設定檔: {profile}，使用 whisper 預設值")
+    options = dict(DECODE_PROFILES.get(profile, {}))
+
+    # 個別覆寫 (留空表示沿用設定檔)
+    def override(key: str) -> str:
+        return config.get('transcriber', key, fallback='').strip()
+
+    if override('temperatures'):
+        options['temperature'] = tuple(float(t) for t in override('temperatures').split(',') if t.strip())
+    if override('beam_size'):
+        options['beam_size'] = int(override('beam_size')) or None
+    if override('compression_ratio_threshold'):
+        options['compression_ratio_threshold'] = float(override('compression_ratio_threshold'))
+    if override('condition_on_previous_text'):
+        options['condition_on_previous_text'] = config.getboolean('transcriber', 'condition_on_previous_text')
+
+    # 固定語言可省去每個檔案的語言偵測
+    language = config.get('transcriber', 'language', fallback='').strip()
+    if language:
+        options['language'] = language
+
+    # 值為 None 的鍵沿用 whisper 預設
+    return {k: v for k, v in options.items() if v is not None}
+
+
+def _get_decode_options(config: configparser.ConfigParser, dtype: str) -> dict:
+    """整理會影響轉錄結果的解碼選項 (同時作為轉錄快取 key 的一部分)"""
+    options = {
+        'dtype': dtype,
+        'fp16': dtype == "float16",
+    }
+    options.update(_get_profile_options(config))
+    if config.getboolean('transcriber', 'vad', fallback=False):
+        options['vad'] = _get_vad_settings(config)
+    return options
+
+
+def _log_decode_stats(result: dict, decode_options: dict, name: str):
+    """記錄溫度回退造成的重新解碼次數
+
+    whisper 對壓縮比或平均 logprob 不合格的 30 秒視窗會以更高溫度重新解碼，
+    segment 的 temperature 高於第一階溫度即代表該視窗發生過回退。
+    """
+    # 未由 profile 指定時 whisper 使用預設的溫度階梯
+    temperatures = decode_options.get('temperature', WHISPER_TEMPERATURES)
+    if isinstance(temperatures, (int, float)):
+        temperatures = (temperatures,)
+    base = temperatures[0] if temperatures else 0.0
+
+    fallbacks = 0
+    redecodes = 0
+    previous_seek = None
+    for seg in result.get("segments", []):
+        seek = seg.get("seek")
+        if seek == previous_seek:
+            continue
+        previous_seek = seek
+        temperature = seg.get("temperature", base)
+        if temperature > base:
+            fallbacks += 1
+            # 每次回退代表多解碼一次，溫度階數即為重新解碼次數
+            redecodes += sum(1 for t in temperatures if base < t <= temperature)
+
+    result["fallbacks"] = fallbacks
+    logging.getLogger("transcriber").info(
+        f"解碼回退: {name} 有 {fallbacks} 個視窗以較高溫度重新解碼 (共 {redecodes} 次額外解碼)"
+    )
+
+
+def get_transcribe_kwargs(dtype: Optional[str] = None, profile: Optional[str] = None) -> dict:
+    """依 config.ini 取得 model.transcribe 的參數 (供基準測試等外部工具使用)
+
+    Args:
+        dtype: 推論精度；None 時依裝置與 quantize 設定決定
+        profile: 覆寫 [transcriber] profile 設定
+    """
+    config = _read_config()
+    if profile is not None:
+        if not config.has_section('transcriber'):
+            config.add_section('transcriber')
+        config.set('transcriber', 'profile', profile)
+    dtype = dtype or _default_dtype(_default_device())
+    return _whisper_kwargs(_get_decode_options(config, dtype))
+
+
+def _whisper_kwargs(decode_options: dict) -> dict:
+    """取出可直接傳給 model.transcribe 的參數"""
+    return {k: v for k, v in decode_options.items() if k not in ('dtype', 'vad', 'batched')}
+
+
+def _transcribe_with_checkpoint(model, audio, checkpoint_base: Path, decode_options: dict,
+                                block_seconds: float = 120.0) -> dict:
+    """分段轉錄並逐段寫入部分結果，中斷後可從檢查點續跑
+
+    音訊於靜音處切成約 block_seconds 的區塊依序轉錄；每完成一個區塊即將
+    segment 以 JSON Lines 附加到 {checkpoint_base}.partial.jsonl，並更新
+    {checkpoint_base}.checkpoint.json 記錄已完成的樣本位置。重新執行時
+    從檢查點位置繼續，並以前一區塊結尾文字作為 initial_prompt 延續上下文。
+
+    Returns:
+        與 model.transcribe 相同格式的結果
+    """
+    logger = logging.getLogger("transcriber")
+    sr = audio_utils.SAMPLE_RATE
+    partial_path = checkpoint_base.with_name(checkpoint_base.name + ".partial.jsonl")
+    checkpoint_path = checkpoint_base.with_name(checkpoint_base.name + ".checkpoint.json")
+
+    segments: List[dict] = []
+    offset = 0
+    language = None
+    if checkpoint_path.exists() and partial_path.exists():
+        try:
+            checkpoint = json.loads(checkpoint_path.read_text(encoding='utf-8'))
+            with open(partial_path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+            # 只採用檢查點確認過的 segment，忽略寫入檢查點前中斷的部分
+            segments = [json.loads(line) for line in lines[:checkpoint['segments']]]
+            offset = int(checkpoint['offset'])
+            language = checkpoint.get('language')
+            logger.info(f"從檢查點續跑: {offset / sr:.1f} 秒 (已完成 {len(segments)} 個 segment)")
+        except (ValueError, KeyError, OSError) as e:
+            logger.warning(f"檢查點損毀，重新開始轉錄: {e}")
+            segments, offset, language = [], 0, None
+
+    # 重寫部分結果檔，確保內容與檢查點一致
+    with open(partial_path, 'w', encoding='utf-8') as f:
+        for seg in segments:
+            f.write(json.dumps(seg, ensure_ascii=False) + "\n")
+
+    points = [offset + p for p in audio_utils.find_split_points(audio[offset:], block_seconds)]
+    bounds = [offset] + points + [len(audio)]
+    kwargs = _whisper_kwargs(decode_options)
+
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if end <= start:
+            continue
+        prompt = None
+        if kwargs.get('condition_on_previous_text', True):
+            prompt = "".join(seg["text"] for seg in segments[-5:]).strip() or None
+        result = model.transcribe(audio[start:end], initial_prompt=prompt, **kwargs)
+        language = language or result.get("language")
+
+        block_segments = []
+        for seg in result.get("segments", []):
+            seg = dict(seg)
+            seg["id"] = len(segments) + len(block_segments)
+            seg["start"] = round(seg["start"] + start / sr, 3)
+            seg["end"] = round(seg["end"] + start / sr, 3)
+            block_segments.append(seg)
+
+        with open(partial_path, 'a', encoding='utf-8') as f:
+            for seg in block_segments:
+                f.write(json.dumps(seg, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        segments.extend(block_segments)
+
+        tmp_path = checkpoint_path.with_suffix('.tmp')
+        tmp_path.write_text(
+            json.dumps({'offset': end, 'segments': len(segments), 'language': language}),
+            encoding='utf-8',
+        )
+        tmp_path.replace(checkpoint_path)
+        logger.info(f"轉錄進度: {end / sr:.1f} / {len(audio) / sr:.1f} 秒")
+
+    return {
+        "text": "".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "language": language,
+    }
+
+
+def _clear_checkpoint(checkpoint_base: Path):
+    for suffix in (".partial.jsonl", ".checkpoint.json"):
+        checkpoint_base.with_name(checkpoint_base.name + suffix).unlink(missing_ok=True)
+
+
+def _write_transcript(result: dict, input_path: Path, file_manager: FileManager) -> Path:
+    """以 whisper writer 輸出 txt，並依命名規範重新命名"""
+    # 產生輸出檔案名稱
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    base_name = input_path.stem
+    # 限制文件名長度，只保留前面15個字
+    base_name = base_name[:15] if len(base_name) > 15 else base_name
+    # 同一秒內寫出多個檔案時 (批次/工作池) 避免檔名衝突
+    txt_filename = file_manager.generate_unique_filename(
+        'data_output_transcripts_raw', f"{timestamp}_{base_name}_transcript", ".txt"
+    )
+
+    # 保存結果到新的檔案結構
+    output_path = file_manager.get_output_transcript_path(txt_filename, cleaned=False)
+
+    # 使用 whisper 的 writer 保存
+    output_dir = output_path.parent
+    txt_writer = get_writer("txt", str(output_dir))
+    txt_writer(result, str(input_path))
+
+    # 重新命名檔案以符合我們的命名規範
+    original_name = output_dir / f"{input_path.stem}.txt"
+    if original_name.exists():
+        original_name.rename(output_path)
+
+    return output_path
+
 
 def transcribe_audio(input_path: str, file_manager=None, model_name: str = None):
     """轉錄音訊檔案為文字"""
@@ -19,12 +556,7 @@ def transcribe_audio(input_path: str, file_manager=None, model_name: str = None)
         file_manager = FileManager()
     
     # 讀取配置檔案
-    config = configparser.ConfigParser()
-    config.read('config.ini')
-    
-    # 使用配置預設值
-    if model_name is None:
-        model_name = config.get('transcriber', 'model_name', fallback='base')
+    config = _read_config()
     
     # 檢查 ROCm 可用性
     if not torch.cuda.is_available():
@@ -38,47 +570,737 @@ def transcribe_audio(input_path: str, file_manager=None, model_name: str = None)
         logger.error(f"輸入檔案不存在: {input_path}")
         return None
     
-    try:
-        # 嘗試載入模型
-        model = whisper.load_model(model_name)
-    except RuntimeError as e:
-        if "Model" in str(e) and "not found" in str(e):
-            logger.info(f"模型 {model_name} 未找到，正在下載...")
-            # 自動下載模型
-            subprocess.run(["whisper", "--model", model_name], check=True)
-            model = whisper.load_model(model_name)
+    # 使用配置預設值，或依音訊長度路由
+    if model_name is None:
+        if is_routing_enabled(config):
+            model_name = ModelRouter(config, file_manager).route(str(input_path))
         else:
-            logger.error(f"模型載入失敗: {e}")
-            raise e
+            model_name = config.get('transcriber', 'model_name', fallback='base')
+    
+    device = _default_device()
+    dtype = _default_dtype(device)
+    decode_options = _get_decode_options(config, dtype)
+
+    # 相同音訊、模型與解碼選項已轉錄過時直接回傳既有結果
+    cache = None
+    if config.getboolean('transcriber', 'transcript_cache', fallback=True):
+        cache = TranscriptCache(file_manager)
+        cached_path = cache.get(str(input_path), model_name, decode_options)
+        if cached_path:
+            return cached_path
+
+    # 取得快取模型 (同一行程內只載入一次)
+    model = get_model(model_name, device, dtype)
 
     # 轉錄音訊
     logger.info(f"開始音訊轉錄: {input_path}")
-    result = model.transcribe(str(input_path))
+    audio = audio_utils.load_audio(str(input_path), file_manager)
+    split_enabled = config.getboolean('transcriber', 'split_long_audio', fallback=False)
+    if (split_enabled and not _IN_POOL_WORKER
+            and audio_utils.audio_duration(audio) >= config.getfloat('transcriber', 'split_min_seconds', fallback=1800)):
+        output_path = transcribe_long_audio(str(input_path), file_manager, model_name, audio=audio)
+    else:
+        # VAD：只將語音區段送入模型，輸出時再換算回原始時間軸
+        timeline = None
+        checkpoint_base = None
+        if 'vad' in decode_options:
+            regions = detect_speech_regions(audio, **decode_options['vad'])
+            total = len(audio)
+            audio, timeline = _apply_vad(audio, regions)
+            skipped = 1 - len(audio) / total if total else 0.0
+            logger.info(f"VAD 略過 {skipped:.1%} 的音訊 ({len(regions)} 個語音區段): {input_path.name}")
+
+        if len(audio) == 0:
+            result = {"text": "", "segments": [], "language": None}
+        elif config.getboolean('transcriber', 'incremental', fallback=False):
+            # 逐段寫入部分結果，中斷後下次執行可從檢查點續跑
+            checkpoint_key = TranscriptCache(file_manager).make_key(str(input_path), model_name, decode_options)
+            checkpoint_base = file_manager.get_path('data_temp_processing') / checkpoint_key[:32]
+            block_seconds = config.getfloat('transcriber', 'incremental_block_seconds', fallback=120)
+            result = _transcribe_with_checkpoint(model, audio, checkpoint_base, decode_options, block_seconds)
+        else:
+            result = model.transcribe(audio, **_whisper_kwargs(decode_options))
+
+        if timeline is not None:
+            result = _remap_timestamps(result, timeline)
+        _log_decode_stats(result, decode_options, input_path.name)
+        output_path = _write_transcript(result, input_path, file_manager)
+        if checkpoint_base is not None:
+            _clear_checkpoint(checkpoint_base)
+        logger.info(f"轉錄完成: {output_path}")
+
+    if cache is not None and output_path:
+        cache.put(str(input_path), model_name, decode_options, str(output_path))
+    return str(output_path) if output_path else None
+
+
+# ------------------------------
+# 依音訊長度選擇模型
+# ------------------------------
+def _parse_pairs(value: str) -> List[Tuple[str, str]]:
+    """解析 'a:b, c:d' 形式的設定值"""
+    pairs = []
+    for item in value.split(','):
+        if ':' in item:
+            key, _, val = item.strip().rpartition(':')
+            pairs.append((key.strip(), val.strip()))
+    return pairs
+
+
+def probe_duration(input_path: str, file_manager: Optional[FileManager] = None) -> float:
+    """取得音訊長度 (秒)，優先使用 ffprobe，失敗時解碼後計算"""
+    try:
+        output = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", str(input_path)],
+            capture_output=True, text=True, check=True, timeout=30,
+        ).stdout.strip()
+        return float(output)
+    except (OSError, subprocess.SubprocessError, ValueError):
+        audio = audio_utils.load_audio(str(input_path), file_manager)
+        return audio_utils.audio_duration(audio)
+
+
+class ModelRouter:
+    """依音訊長度 (及可選的語言偵測) 為每個檔案選擇 Whisper 模型
+
+    routing_rules 以 '長度上限秒數:模型' 依序比對，例如
+    '120:small, 3600:base, inf:tiny' 表示 2 分鐘內用 small、1 小時內用 base。
+    沒有符合的規則時使用 model_name；預設規則只將 2 分鐘內的短音訊升級為
+    small，長音訊維持 model_name，不會默默換成較小的模型。
+    設定 routing_time_budget 時，會依 routing_model_rtf 估算整批耗時，
+    超出預算則優先將可省下最多時間的檔案降級為較小的模型。
+    """
+
+    DEFAULT_RULES = "120:small"
+    DEFAULT_RTF = "tiny:0.05, base:0.1, small:0.3, medium:0.8, large:1.6"
+
+    def __init__(self, config: Optional[configparser.ConfigParser] = None,
+                 file_manager: Optional[FileManager] = None):
+        """初始化模型路由
+
+        Args:
+            config: 設定；None 時讀取 config.ini
+            file_manager: 檔案管理器
+        """
+        config = config or _read_config()
+        self.file_manager = file_manager or FileManager()
+        self.logger = logging.getLogger("transcriber")
+
+        self.default_model = config.get('transcriber', 'model_name', fallback='base')
+        self.rules = [
+            (float(limit), model)
+            for limit, model in _parse_pairs(config.get('transcriber', 'routing_rules', fallback=self.DEFAULT_RULES))
+        ]
+        self.language_rules = dict(_parse_pairs(config.get('transcriber', 'routing_language_rules', fallback='')))
+        self.detect_language = config.getboolean('transcriber', 'routing_detect_language', fallback=False)
+        self.time_budget = config.getfloat('transcriber', 'routing_time_budget', fallback=0)
+        self.model_rtf = {
+            model: float(rtf)
+            for model, rtf in _parse_pairs(config.get('transcriber', 'routing_model_rtf', fallback=self.DEFAULT_RTF))
+        }
+        self.parallelism = get_pool_settings(config)[0]
+
+    def probe_duration(self, input_path: str) -> float:
+        """取得音訊長度 (秒)"""
+        return probe_duration(input_path, self.file_manager)
+
+    def detect_audio_language(self, input_path: str) -> Optional[str]:
+        """以 tiny 模型偵測前 30 秒的語言"""
+        model = get_model("tiny")
+        audio = audio_utils.load_audio(str(input_path), self.file_manager)
+        audio = whisper.pad_or_trim(np.asarray(audio[:whisper.audio.N_SAMPLES], dtype=np.float32))
+        mel = whisper.log_mel_spectrogram(audio, model.dims.n_mels).to(model.device)
+        _, probs = model.detect_language(mel)
+        return max(probs, key=probs.get) if probs else None
+
+    def route(self, input_path: str, duration: Optional[float] = None) -> str:
+        """為單一檔案選擇模型"""
+        if duration is None:
+            duration = self.probe_duration(input_path)
+
+        model_name = self.default_model
+        for limit, candidate in self.rules:
+            if duration <= limit:
+                model_name = candidate
+                break
+
+        if self.detect_language and self.language_rules:
+            language = self.detect_audio_language(input_path)
+            if language in self.language_rules:
+                model_name = self.language_rules[language]
+
+        self.logger.info(f"模型路由: {Path(input_path).name} ({duration / 60:.1f} 分鐘) -> {model_name}")
+        return model_name
+
+    def estimate_seconds(self, duration: float, model_name: str) -> float:
+        """以設定的 RTF 估算轉錄耗時；未設定的模型視為 RTF 1.0"""
+        return duration * self.model_rtf.get(model_name, 1.0)
+
+    def plan(self, audio_files: Iterable[str]) -> Dict[str, str]:
+        """為整批檔案選擇模型，並在有時間預算時降級以符合預算
+
+        Returns:
+            {音訊路徑: 模型名稱}
+        """
+        durations = {str(f): self.probe_duration(str(f)) for f in audio_files}
+        plan = {path: self.route(path, duration) for path, duration in durations.items()}
+
+        if self.time_budget <= 0:
+            return plan
+
+        # 由慢到快排列的模型階梯
+        ladder = sorted(self.model_rtf, key=self.model_rtf.get, reverse=True)
+
+        def total_estimate() -> float:
+            return sum(self.estimate_seconds(durations[p], m) for p, m in plan.items()) / self.parallelism
+
+        while total_estimate() > self.time_budget:
+            best_path, best_saving = None, 0.0
+            for path, model_name in plan.items():
+                if model_name not in ladder or ladder.index(model_name) == len(ladder) - 1:
+                    continue
+                smaller = ladder[ladder.index(model_name) + 1]
+                saving = self.estimate_seconds(durations[path], model_name) - self.estimate_seconds(durations[path], smaller)
+                if saving > best_saving:
+                    best_path, best_saving = path, saving
+            if best_path is None:
+                self.logger.warning(
+                    f"無法在時間預算內完成: 預估 {total_estimate():.0f} 秒 > 預算 {self.time_budget:.0f} 秒"
+                )
+                break
+            smaller = ladder[ladder.index(plan[best_path]) + 1]
+            self.logger.info(f"時間預算降級: {Path(best_path).name} {plan[best_path]} -> {smaller}")
+            plan[best_path] = smaller
+
+        self.logger.info(f"整批預估轉錄時間: {total_estimate():.0f} 秒")
+        return plan
+
+
+def is_routing_enabled(config: Optional[configparser.ConfigParser] = None) -> bool:
+    """是否啟用 [transcriber] routing"""
+    config = config or _read_config()
+    return config.getboolean('transcriber', 'routing', fallback=False)
+
+
+# ------------------------------
+# 短音訊批次解碼
+# ------------------------------
+def is_batching_enabled(config: Optional[configparser.ConfigParser] = None) -> bool:
+    """是否啟用 [transcriber] batch_short_clips"""
+    config = config or _read_config()
+    return config.getboolean('transcriber', 'batch_short_clips', fallback=False)
+
+
+def partition_short_clips(audio_files: Iterable[str], file_manager: Optional[FileManager] = None,
+                          max_seconds: float = whisper.audio.CHUNK_LENGTH) -> Tuple[List[str], List[str]]:
+    """將音訊分為可放入單一 30 秒視窗的短音訊與其餘檔案
+
+    Returns:
+        (短音訊列表, 其餘檔案列表)
+    """
+    short_files, other_files = [], []
+    for audio_file in audio_files:
+        try:
+            is_short = probe_duration(str(audio_file), file_manager) <= max_seconds
+        except Exception:
+            is_short = False
+        (short_files if is_short else other_files).append(audio_file)
+    return short_files, other_files
+
+
+def transcribe_batch(audio_files: Iterable[str], file_manager=None, model_name: str = None,
+                     batch_size: Optional[int] = None,
+                     model_plan: Optional[Dict[str, str]] = None) -> List[Optional[str]]:
+    """將多個短音訊補齊為 30 秒視窗後批次解碼
+
+    每批的 mel 頻譜堆疊成單一張量，encoder/decoder 一次前向處理整批，
+    省去逐檔呼叫 model.transcribe 的固定開銷。批次解碼使用 temperature=0
+    的貪婪解碼且不含時間戳記，每個檔案輸出單一 segment。
+    超過 30 秒的檔案改以 transcribe_audio 處理。
+
+    Args:
+        audio_files: 音訊檔案路徑
+        file_manager: 檔案管理器
+        model_name: 模型名稱；None 時讀取 config.ini
+        batch_size: 每批檔案數；None 時讀取 batch_size 設定
+        model_plan: {音訊路徑: 模型名稱}；同模型的檔案才會併入同一批
+
+    Returns:
+        與輸入順序一致的轉錄檔路徑列表；失敗的檔案為 None
+    """
+    logger = logging.getLogger("transcriber")
+
+    if file_manager is None:
+        file_manager = FileManager()
+
+    config = _read_config()
+    if model_name is None:
+        model_name = config.get('transcriber', 'model_name', fallback='base')
+    if batch_size is None:
+        batch_size = config.getint('transcriber', 'batch_size', fallback=8)
+    model_plan = model_plan or {}
+
+    device = _default_device()
+    dtype = _default_dtype(device)
+    decode_options = dict(_get_decode_options(config, dtype), batched=True)
+    decode_options.pop('vad', None)
+    cache = TranscriptCache(file_manager) if config.getboolean('transcriber', 'transcript_cache', fallback=True) else None
+
+    audio_files = [str(f) for f in audio_files]
+    results: Dict[str, Optional[str]] = {}
+    # 依模型分組的待解碼項目: model -> [(路徑, 波形)]
+    pending: Dict[str, List[Tuple[str, np.ndarray]]] = {}
+
+    for audio_file in audio_files:
+        file_model = model_plan.get(audio_file, model_name)
+        if not Path(audio_file).exists():
+            logger.error(f"輸入檔案不存在: {audio_file}")
+            results[audio_file] = None
+            continue
+        if cache is not None:
+            cached_path = cache.get(audio_file, file_model, decode_options)
+            if cached_path:
+                results[audio_file] = cached_path
+                continue
+
+        audio = audio_utils.load_audio(audio_file, file_manager)
+        if len(audio) > whisper.audio.N_SAMPLES:
+            results[audio_file] = transcribe_audio(audio_file, file_manager, file_model)
+            continue
+        pending.setdefault(file_model, []).append((audio_file, audio))
+
+    for file_model, items in pending.items():
+        model = get_model(file_model, device, dtype)
+        options = whisper.DecodingOptions(
+            temperature=0.0, without_timestamps=True, fp16=decode_options['fp16'],
+            language=decode_options.get('language'), beam_size=decode_options.get('beam_size'),
+        )
+
+        for i in range(0, len(items), batch_size):
+            batch = items[i:i + batch_size]
+            logger.info(f"批次解碼 {len(batch)} 個短音訊 (model={file_model})")
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(
+                    whisper.pad_or_trim(np.asarray(audio, dtype=np.float32)), model.dims.n_mels
+                )
+                for _, audio in batch
+            ]).to(model.device)
+
+            try:
+                decoded = whisper.decode(model, mel, options)
+            except Exception as e:
+                logger.error(f"批次解碼失敗: {e}")
+                for audio_file, _ in batch:
+                    results[audio_file] = None
+                continue
+
+            for (audio_file, audio), output in zip(batch, decoded):
+                text = output.text
+                # 與 model.transcribe 相同的靜音判斷
+                if output.no_speech_prob > 0.6 and output.avg_logprob < -1.0:
+                    text = ""
+                segments = [{
+                    "id": 0, "start": 0.0, "end": round(audio_utils.audio_duration(audio), 3),
+                    "text": text, "temperature": 0.0,
+                    "avg_logprob": output.avg_logprob, "no_speech_prob": output.no_speech_prob,
+                }] if text else []
+                result = {"text": text, "segments": segments, "language": output.language}
+
+                output_path = _write_transcript(result, Path(audio_file), file_manager)
+                if cache is not None:
+                    cache.put(audio_file, file_model, decode_options, str(output_path))
+                results[audio_file] = str(output_path)
+
+    logger.info(f"批次轉錄完成: {sum(1 for p in results.values() if p)}/{len(audio_files)} 個檔案")
+    return [results.get(audio_file) for audio_file in audio_files]
+
+
+# ------------------------------
+# 多行程轉錄工作池
+# ------------------------------
+def get_pool_settings(config: Optional[configparser.ConfigParser] = None) -> Tuple[int, int]:
+    """讀取 [transcriber] 的 workers 與 threads_per_worker 設定
+
+    threads_per_worker 為 0 時，依 CPU 核心數平均分配給各 worker。
+
+    Returns:
+        (worker 數量, 每個 worker 的 torch 執行緒數)
+    """
+    if config is None:
+        config = _read_config()
+    workers = max(1, config.getint('transcriber', 'workers', fallback=1))
+    threads = config.getint('transcriber', 'threads_per_worker', fallback=0)
+    if threads <= 0:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+    return workers, threads
+
+
+def _pool_worker_init(model_name: str, device: str, dtype: str, threads: int):
+    """worker 行程初始化：設定 torch 執行緒數並預熱模型"""
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+    global _IN_POOL_WORKER
+    _IN_POOL_WORKER = True
+    torch.set_num_threads(threads)
+    get_model(model_name, device, dtype)
+
+
+def _pool_worker_transcribe(input_path: str, base_dir: str, model_name: str) -> Tuple[Optional[str], dict]:
+    """worker 內轉錄單一檔案，連同轉錄快取統計一併回傳給主行程"""
+    transcript_cache.reset_cache_stats()
+    output_path = transcribe_audio(input_path, FileManager(base_dir), model_name)
+    return output_path, transcript_cache.get_cache_stats()
+
+
+def _pool_worker_decode(chunk_path: str, model_name: str, start: Optional[int] = None,
+                        end: Optional[int] = None) -> dict:
+    """轉錄 .npy 音訊中 [start, end) 的樣本，回傳 whisper 原始結果"""
+    device = _default_device()
+    dtype = _default_dtype(device)
+    audio = np.load(chunk_path, mmap_mode='r')[start:end]
+    return get_model(model_name, device, dtype).transcribe(audio, **get_transcribe_kwargs(dtype))
+
+
+class TranscriberPool:
+    """常駐的多行程轉錄工作池
+
+    每個 worker 行程持有一份已預熱的 Whisper 模型，音訊檔案依序派送，
+    結果依提交順序回傳。
+    """
+
+    def __init__(self, workers: Optional[int] = None, threads_per_worker: Optional[int] = None,
+                 model_name: Optional[str] = None, file_manager: Optional[FileManager] = None,
+                 device: Optional[str] = None, dtype: Optional[str] = None):
+        """初始化工作池
+
+        Args:
+            workers: worker 行程數量；None 時讀取 config.ini
+            threads_per_worker: 每個 worker 的 torch 執行緒數；None 時讀取 config.ini
+            model_name: 模型名稱；None 時讀取 config.ini
+            file_manager: 檔案管理器
+            device: 運算裝置；None 時自動選擇
+            dtype: 推論精度；None 時依裝置決定
+        """
+        config = _read_config()
+        default_workers, default_threads = get_pool_settings(config)
+
+        self.workers = workers or default_workers
+        self.threads_per_worker = threads_per_worker or default_threads
+        self.model_name = model_name or config.get('transcriber', 'model_name', fallback='base')
+        self.file_manager = file_manager or FileManager()
+        self.device = device or _default_device()
+        self.dtype = dtype or _default_dtype(self.device)
+        self.logger = logging.getLogger("transcriber")
+
+        # 使用 spawn 避免 fork 後 torch/CUDA 狀態不一致
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_pool_worker_init,
+            initargs=(self.model_name, self.device, self.dtype, self.threads_per_worker),
+        )
+        self.logger.info(
+            f"轉錄工作池已啟動: {self.workers} 個 worker，每個 {self.threads_per_worker} 執行緒 "
+            f"(model={self.model_name})"
+        )
+
+    def submit(self, input_path: str, model_name: Optional[str] = None) -> Future:
+        """提交單一音訊檔案，回傳結果為轉錄檔路徑的 Future
+
+        Args:
+            input_path: 音訊檔案路徑
+            model_name: 此檔案使用的模型；None 時使用工作池預設模型
+        """
+        outer: Future = Future()
+        inner = self._executor.submit(
+            _pool_worker_transcribe, str(input_path), str(self.file_manager.base_dir),
+            model_name or self.model_name
+        )
+
+        def _on_done(future: Future):
+            try:
+                output_path, stats = future.result()
+            except Exception as e:
+                outer.set_exception(e)
+                return
+            transcript_cache.merge_cache_stats(stats)
+            outer.set_result(output_path)
+
+        inner.add_done_callback(_on_done)
+        return outer
+
+    def transcribe_many(self, audio_files: Iterable[str],
+                        model_plan: Optional[Dict[str, str]] = None) -> List[Optional[str]]:
+        """批次轉錄多個音訊檔案
+
+        Args:
+            audio_files: 音訊檔案路徑
+            model_plan: {音訊路徑: 模型名稱}，例如 ModelRouter.plan 的結果
+
+        Returns:
+            與輸入順序一致的轉錄檔路徑列表；失敗的檔案為 None
+        """
+        audio_files = [str(f) for f in audio_files]
+        model_plan = model_plan or {}
+        futures = [self.submit(f, model_plan.get(f)) for f in audio_files]
+
+        results: List[Optional[str]] = []
+        for audio_file, future in zip(audio_files, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                self.logger.error(f"轉錄失敗 {audio_file}: {e}")
+                results.append(None)
+        return results
+
+    def decode_chunks(self, chunks: Iterable[Tuple[str, Optional[int], Optional[int]]]) -> List[dict]:
+        """平行轉錄多個 .npy 音訊片段
+
+        Args:
+            chunks: (npy 路徑, 起始樣本, 結束樣本) 列表；起訖為 None 時使用整個檔案
+
+        Returns:
+            與輸入順序一致的 whisper 結果列表
+        """
+        futures = [
+            self._executor.submit(_pool_worker_decode, str(path), self.model_name, start, end)
+            for path, start, end in chunks
+        ]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """關閉工作池並等待 worker 結束"""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# ------------------------------
+# 長音訊切段平行轉錄
+# ------------------------------
+def _normalize_text(text: str) -> str:
+    return "".join(ch for ch in text.lower() if ch.isalnum())
+
+
+def stitch_segments(chunk_results: List[dict], spans: List[Tuple[int, int, int, int]]) -> dict:
+    """將各片段的轉錄結果縫合為單一結果
+
+    片段時間戳記會加上片段在原音訊的起點；每段只保留中點落在
+    自身擁有區間內的 segment，重疊區內重複的文字再以內容比對去除。
+
+    Args:
+        chunk_results: 各片段的 whisper 結果
+        spans: audio_utils.split_audio 回傳的區間
+
+    Returns:
+        與 model.transcribe 相同格式的結果
+    """
+    sr = audio_utils.SAMPLE_RATE
+    segments: List[dict] = []
+
+    for result, (own_start, own_end, real_start, _) in zip(chunk_results, spans):
+        offset = real_start / sr
+        for seg in result.get("segments", []):
+            seg = dict(seg)
+            seg["start"] = round(seg["start"] + offset, 3)
+            seg["end"] = round(seg["end"] + offset, 3)
+            if "words" in seg:
+                seg["words"] = [
+                    dict(w, start=w["start"] + offset, end=w["end"] + offset) for w in seg["words"]
+                ]
+
+            midpoint = (seg["start"] + seg["end"]) / 2
+            if not (own_start / sr <= midpoint < own_end / sr):
+                continue
+
+            # 與上一段在重疊區內內容相同時視為重複
+            if segments:
+                prev = segments[-1]
+                if (seg["start"] < prev["end"] + 1.0
+                        and _normalize_text(seg["text"]) == _normalize_text(prev["text"])):
+                    continue
+
+            segments.append(seg)
+
+    for i, seg in enumerate(segments):
+        seg["id"] = i
+
+    language = next((r.get("language") for r in chunk_results if r.get("language")), None)
+    return {
+        "text": "".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "language": language,
+    }
+
+
+def transcribe_long_audio(input_path: str, file_manager=None, model_name: str = None,
+                          workers: Optional[int] = None, audio=None) -> Optional[str]:
+    """將長音訊在靜音處切段，多行程平行轉錄後縫合
+
+    輸出與 transcribe_audio 相同的 _transcript.txt。
+
+    Args:
+        input_path: 音訊檔案路徑
+        file_manager: 檔案管理器
+        model_name: 模型名稱；None 時讀取 config.ini
+        workers: 平行行程數；None 時讀取 split_workers，0 為依 CPU 核心數決定
+        audio: 已解碼的 16 kHz 波形 (可選，避免重複解碼)
+
+    Returns:
+        轉錄檔路徑字串，若失敗則回傳 None
+    """
+    logger = logging.getLogger("transcriber")
+
+    if file_manager is None:
+        file_manager = FileManager()
+
+    config = _read_config()
+    if model_name is None:
+        model_name = config.get('transcriber', 'model_name', fallback='base')
+
+    input_path = Path(input_path)
+    if audio is None:
+        if not input_path.exists():
+            logger.error(f"輸入檔案不存在: {input_path}")
+            return None
+        audio = audio_utils.load_audio(str(input_path), file_manager)
+
+    chunk_seconds = config.getfloat('transcriber', 'split_chunk_seconds', fallback=600)
+    overlap_seconds = config.getfloat('transcriber', 'split_overlap_seconds', fallback=1.0)
+    spans = audio_utils.split_audio(audio, chunk_seconds, overlap_seconds)
+
+    if workers is None:
+        workers = config.getint('transcriber', 'split_workers', fallback=0)
+    if workers <= 0:
+        workers = max(1, (os.cpu_count() or 1) // 2)
+    workers = min(workers, len(spans))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    logger.info(
+        f"長音訊切段轉錄: {input_path.name} "
+        f"({audio_utils.audio_duration(audio) / 60:.1f} 分鐘, {len(spans)} 段, {workers} 個 worker)"
+    )
+
+    # worker 直接 mmap 讀取 .npy 而非經由 pickle 傳遞波形；
+    # 已在解碼快取中時共用快取檔，否則 (或快取檔已被淘汰) 將片段寫入暫存目錄
+    chunk_paths: List[Path] = []
+    cached_path = getattr(audio, 'filename', None)
+    if cached_path and Path(cached_path).exists():
+        chunks = [(cached_path, real_start, real_end) for _, _, real_start, real_end in spans]
+    else:
+        processing_dir = file_manager.get_path('data_temp_processing')
+        for i, (_, _, real_start, real_end) in enumerate(spans):
+            chunk_path = processing_dir / f"{input_path.stem}_chunk{i:03d}.npy"
+            chunk_paths.append(audio_utils.save_chunk(audio[real_start:real_end], chunk_path))
+        chunks = [(str(path), None, None) for path in chunk_paths]
+
+    try:
+        with TranscriberPool(workers=workers, threads_per_worker=threads,
+                             model_name=model_name, file_manager=file_manager) as pool:
+            chunk_results = pool.decode_chunks(chunks)
+    finally:
+        for chunk_path in chunk_paths:
+            chunk_path.unlink(missing_ok=True)
+
+    result = stitch_segments(chunk_results, spans)
+    _log_decode_stats(result, _get_decode_options(config, _default_dtype(_default_device())), input_path.name)
+    output_path = _write_transcript(result, input_path, file_manager)
 
-    # 產生輸出檔案名稱
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    base_name = input_path.stem
-    # 限制文件名長度，只保留前面15個字
-    base_name = base_name[:15] if len(base_name) > 15 else base_name
-    txt_filename = f"{timestamp}_{base_name}_transcript.txt"
-    
-    # 保存結果到新的檔案結構
-    output_path = file_manager.get_output_transcript_path(txt_filename, cleaned=False)
-    
-    # 使用 whisper 的 writer 保存
-    output_dir = output_path.parent
-    txt_writer = get_writer("txt", str(output_dir))
-    txt_writer(result, str(input_path))
-    
-    # 重新命名檔案以符合我們的命名規範
-    original_name = output_dir / f"{input_path.stem}.txt"
-    if original_name.exists():
-        original_name.rename(output_path)
-    
     logger.info(f"轉錄完成: {output_path}")
     return str(output_path)
 
+
+# ------------------------------
+# 量化精度/速度比較
+# ------------------------------
+def _error_rate(reference: str, hypothesis: str) -> float:
+    """計算編輯距離錯誤率；含空白的文字以詞為單位 (WER)，否則以字元為單位 (CER)"""
+    ref = reference.split() if len(reference.split()) > 1 else list(reference.strip())
+    hyp = hypothesis.split() if len(hypothesis.split()) > 1 else list(hypothesis.strip())
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def _model_size_bytes(model) -> int:
+    """以序列化後的 state_dict 大小估算模型佔用的記憶體"""
+    import io
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def compare_quantization(input_path: str, model_name: str = None, file_manager=None) -> dict:
+    """比較 fp32 與 int8 模型在同一音訊上的速度與轉錄差異
+
+    兩者皆以 temperature=0 貪婪解碼，確保差異來自量化而非取樣。
+
+    Returns:
+        {'duration', 'float32': {...}, 'int8': {...}, 'error_rate'}；
+        各精度包含 load_seconds、transcribe_seconds、rtf、model_mb、text
+    """
+    import time
+
+    logger = logging.getLogger("transcriber")
+    if file_manager is None:
+        file_manager = FileManager()
+    if model_name is None:
+        model_name = _read_config().get('transcriber', 'model_name', fallback='base')
+
+    audio = audio_utils.load_audio(str(input_path), file_manager)
+    duration = audio_utils.audio_duration(audio)
+    report = {'audio': str(input_path), 'model': model_name, 'duration': duration}
+
+    for dtype in ("float32", "int8"):
+        start = time.perf_counter()
+        model = get_model(model_name, "cpu", dtype)
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = model.transcribe(audio, fp16=False, temperature=0.0)
+        transcribe_seconds = time.perf_counter() - start
+
+        report[dtype] = {
+            'load_seconds': round(load_seconds, 3),
+            'transcribe_seconds': round(transcribe_seconds, 3),
+            'rtf': round(transcribe_seconds / duration, 4) if duration else None,
+            'model_mb': round(_model_size_bytes(model) / 1024 / 1024, 1),
+            'text': result["text"],
+        }
+
+    report['error_rate'] = round(_error_rate(report['float32']['text'], report['int8']['text']), 4)
+    speedup = report['float32']['transcribe_seconds'] / max(report['int8']['transcribe_seconds'], 1e-9)
+    logger.info(
+        f"量化比較 ({model_name}): fp32 RTF={report['float32']['rtf']} / int8 RTF={report['int8']['rtf']} "
+        f"(加速 {speedup:.2f}x)，模型 {report['float32']['model_mb']}MB -> {report['int8']['model_mb']}MB，"
+        f"相對 fp32 錯誤率 {report['error_rate']:.2%}"
+    )
+    return report
+
+
 if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "--compare-int8":
+        # python -m src.transcriber --compare-int8 <audio_file> [model_name]
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        report = compare_quantization(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        sys.exit(0)
+
     if len(sys.argv) < 2:
         print("Usage: python transcriber.py <audio_file> [output_dir] [model_name]")
         print("Available models: tiny, base, small, medium, large")
@@ -94,7 +1316,7 @@ if __name__ == "__main__":
         if os.path.isdir(arg):
             output_dir = arg
         # Otherwise, if not an audio file, treat as model name
-        elif not arg.endswith(('.mp3', '.wav', '.flac', '.m4a')):
+        elif not arg.lower().endswith(AUDIO_EXTENSIONS):
             model_name = arg
     
     transcribe_audio(audio_file, output_dir, model_name)
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+轉錄結果快取 - 以 (音訊 SHA-256, 模型, 解碼選項) 為 key，避免重複執行 Whisper
+"""
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from .file_manager import FileManager
+
+logger = logging.getLogger("transcript_cache")
+
+# 本次執行的命中統計 (供 generate_summary_report 使用)
+_STATS: Dict[str, int] = {'hits': 0, 'misses': 0}
+_STATS_LOCK = threading.Lock()
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """取得本次執行的命中/未命中次數"""
+    with _STATS_LOCK:
+        return dict(_STATS)
+
+
+def reset_cache_stats():
+    """重設命中統計"""
+    with _STATS_LOCK:
+        _STATS['hits'] = 0
+        _STATS['misses'] = 0
+
+
+def merge_cache_stats(stats: Dict[str, int]):
+    """合併其他行程 (工作池 worker) 回傳的統計"""
+    with _STATS_LOCK:
+        for key in _STATS:
+            _STATS[key] += stats.get(key, 0)
+
+
+def _record(key: str):
+    with _STATS_LOCK:
+        _STATS[key] += 1
+
+
+class TranscriptCache:
+    """內容定址的轉錄結果快取
+
+    每筆記錄以單一 JSON 檔存放於 data/cache/transcripts/，
+    多個 worker 行程同時寫入不同記錄時不會互相衝突。
+    """
+
+    def __init__(self, file_manager: Optional[FileManager] = None):
+        """初始化轉錄快取
+
+        Args:
+            file_manager: 檔案管理器
+        """
+        self.file_manager = file_manager or FileManager()
+        self.cache_dir = self.file_manager.get_path('data_cache') / 'transcripts'
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def make_key(self, audio_path: str, model_name: str, decode_options: Dict) -> str:
+        """產生快取 key
+
+        Args:
+            audio_path: 音訊檔案路徑
+            model_name: 模型名稱
+            decode_options: 影響轉錄結果的解碼選項
+
+        Returns:
+            十六進位 key 字串
+        """
+        payload = json.dumps(
+            {
+                'audio': self.file_manager.get_file_hash(Path(audio_path)),
+                'model': model_name,
+                'options': decode_options,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, audio_path: str, model_name: str, decode_options: Dict) -> Optional[str]:
+        """查詢快取，命中且轉錄檔仍存在時回傳其路徑
+
+        Returns:
+            轉錄檔路徑字串；未命中時回傳 None
+        """
+        entry_path = self.cache_dir / f"{self.make_key(audio_path, model_name, decode_options)}.json"
+
+        if entry_path.exists():
+            try:
+                entry = json.loads(entry_path.read_text(encoding='utf-8'))
+                transcript_path = Path(entry['transcript_path'])
+                if transcript_path.exists():
+                    _record('hits')
+                    logger.info(f"轉錄快取命中: {Path(audio_path).name} -> {transcript_path.name}")
+                    return str(transcript_path)
+                # 轉錄檔已被清除，記錄失效
+                entry_path.unlink(missing_ok=True)
+            except (ValueError, KeyError, OSError) as e:
+                logger.warning(f"轉錄快取記錄損毀 {entry_path}: {e}")
+                entry_path.unlink(missing_ok=True)
+
+        _record('misses')
+        return None
+
+    def put(self, audio_path: str, model_name: str, decode_options: Dict, transcript_path: str) -> Path:
+        """寫入快取記錄
+
+        Returns:
+            記錄檔路徑
+        """
+        key = self.make_key(audio_path, model_name, decode_options)
+        entry = {
+            'audio_path': str(audio_path),
+            'model': model_name,
+            'options': decode_options,
+            'transcript_path': str(Path(transcript_path).resolve()),
+            'created': datetime.now().isoformat(),
+        }
+        entry_path = self.cache_dir / f"{key}.json"
+        tmp_path = entry_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=False, indent=2, default=str), encoding='utf-8')
+        tmp_path.replace(entry_path)
+        return entry_path
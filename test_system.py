@@ -5,6 +5,7 @@
 import sys
 import os
 import logging
+import tempfile
 from pathlib import Path
 
 # 添加 src 到路徑
@@ -16,6 +17,7 @@ try:
     from src.transcriber import transcribe_audio
     from src.rewriter import rewrite_text
     from src.cleaner import clean_temp_files
+    from src.mock_openrouter import MockOpenRouter
 except ImportError as e:
     print(f"❌ 導入模組失敗: {e}")
     print("請確保所有必要的模組都已正確安裝")
@@ -114,6 +116,7 @@ def test_directory_structure():
         "data/temp/downloads",
         "data/temp/processing",
         "data/temp/cache",
+        "data/cache",
         "config/prompts",
         "config/models",
         "logs"
@@ -178,6 +181,30 @@ def test_urls_file():
         logger.error(f"❌ URLs 檔案測試失敗: {e}")
         return False
 
+def test_rewriter_offline():
+    """以本機模擬伺服器測試重寫流程 (不需網路與 API 額度)"""
+    logger = logging.getLogger("test_rewriter")
+    logger.info("🧪 測試重寫流程 (模擬 OpenRouter)...")
+
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp, MockOpenRouter(latency_median=0.05, latency_sigma=0) as mock:
+        try:
+            # rewrite_text 讀取工作目錄的 config.ini，於暫存目錄執行避免影響正式資料
+            os.chdir(tmp)
+            Path("config.ini").write_text(
+                f"[OPENROUTER]\nAPI_KEY = test\n\n[REWRITER]\nENDPOINT = {mock.url}\nREWRITE_CACHE = false\n",
+                encoding="utf-8",
+            )
+            fm = FileManager(tmp)
+            transcript = fm.save_file("今天談談市場與投資。", 'data_output_transcripts_raw', 'offline_transcript.txt')
+            article = rewrite_text(str(transcript), fm, 'general')
+        finally:
+            os.chdir(original_dir)
+
+        assert article, f"重寫失敗，伺服器統計 {mock.stats}"
+        assert mock.stats['ok'] == 1, f"預期 1 次成功請求，伺服器統計 {mock.stats}"
+        logger.info(f"✅ 重寫完成: {Path(article).name}")
+
 def run_all_tests():
     """執行所有測試"""
     logger = setup_logging()
@@ -188,7 +215,8 @@ def run_all_tests():
         ("配置檔案", test_config_files),
         ("URLs 檔案", test_urls_file),
         ("檔案管理器", test_file_manager),
-        ("內容分類", test_content_categorization)
+        ("內容分類", test_content_categorization),
+        ("離線重寫", test_rewriter_offline)
     ]
     
     passed = 0
@@ -200,7 +228,8 @@ def run_all_tests():
         logger.info('='*50)
         
         try:
-            if test_func():
+            # 以 assert 檢查的測試不回傳值，失敗時拋出 AssertionError
+            if test_func() is not False:
                 logger.info(f"✅ {test_name} 測試通過")
                 passed += 1
             else:
@@ -0,0 +1,7 @@
+"""
+pytest 共用設定 - 讓 tests/ 內的測試可直接匯入 src 套件
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
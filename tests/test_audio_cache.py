@@ -0,0 +1,85 @@
+"""
+解碼音訊快取測試 (AudioCache 與暫存清理)
+"""
+import os
+import time
+
+import numpy as np
+
+from src.audio_cache import AudioCache
+from src.file_manager import FileManager
+
+
+def _age(path, hours: float):
+    past = time.time() - hours * 3600
+    os.utime(path, (past, past))
+
+
+def test_clean_temp_files_leaves_audio_cache_to_lru(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fm = FileManager(str(tmp_path))
+    cache = AudioCache.from_config(fm)
+
+    cached = cache.cache_dir / "abc.npy"
+    np.save(cached, np.zeros(16, dtype=np.float32))
+    stale_tmp = cache.cache_dir / "abc.123.tmp"
+    stale_tmp.write_bytes(b"partial")
+    other = fm.get_path('data_temp_cache', 'old.bin')
+    other.write_bytes(b"x")
+    for path in (cached, stale_tmp, other):
+        _age(path, 48)
+
+    fm.clean_temp_files(older_than_hours=24)
+
+    assert cached.exists()
+    assert not stale_tmp.exists()
+    assert not other.exists()
+
+
+def test_evict_removes_least_recently_used_first(tmp_path):
+    fm = FileManager(str(tmp_path))
+    entry_bytes = np.zeros(1000, dtype=np.float32).nbytes + 128
+    cache = AudioCache(tmp_path / "cache", max_bytes=2 * entry_bytes + 64, file_manager=fm)
+
+    for index, name in enumerate(["old", "mid", "new"]):
+        path = cache.cache_dir / f"{name}.npy"
+        np.save(path, np.zeros(1000, dtype=np.float32))
+        _age(path, 3 - index)
+
+    assert cache.evict() == 1
+    assert sorted(p.stem for p in cache.cache_dir.glob("*.npy")) == ["mid", "new"]
+
+
+def test_load_hits_cache_without_decoding_again(tmp_path):
+    fm = FileManager(str(tmp_path))
+    source = tmp_path / "a.wav"
+    source.write_bytes(b"fake audio")
+    cache = AudioCache(tmp_path / "cache", max_bytes=0, file_manager=fm)
+    calls = []
+
+    def decoder(path):
+        calls.append(path)
+        return np.arange(8, dtype=np.float32)
+
+    first = cache.load(str(source), decoder)
+    second = cache.load(str(source), decoder)
+    assert len(calls) == 1
+    assert np.array_equal(first, second)
+
+
+def test_oversized_entry_survives_its_own_load(tmp_path):
+    fm = FileManager(str(tmp_path))
+    cache = AudioCache(tmp_path / "cache", max_bytes=1000, file_manager=fm)
+    sources = []
+    for name in ("a.wav", "b.wav"):
+        source = tmp_path / name
+        source.write_bytes(name.encode())
+        sources.append(source)
+
+    first = cache.load(str(sources[0]), lambda path: np.zeros(10000, dtype=np.float32))
+    # 切段轉錄的 worker 以檔名重新開啟快取檔
+    assert os.path.exists(first.filename)
+
+    second = cache.load(str(sources[1]), lambda path: np.ones(10000, dtype=np.float32))
+    assert os.path.exists(second.filename)
+    assert not os.path.exists(first.filename)
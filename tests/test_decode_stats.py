@@ -0,0 +1,34 @@
+"""
+解碼回退統計測試 (transcriber._log_decode_stats)
+"""
+from src.transcriber import _log_decode_stats
+
+
+def _result(*windows):
+    """windows: (seek, temperature)；同一視窗可有多個 segment"""
+    return {"segments": [{"seek": seek, "temperature": temperature} for seek, temperature in windows]}
+
+
+def test_default_ladder_counts_redecodes(caplog):
+    result = _result((0, 0.0), (3000, 0.4), (3000, 0.4), (6000, 1.0))
+    with caplog.at_level("INFO", logger="transcriber"):
+        _log_decode_stats(result, {'fp16': False}, "a.mp3")
+    assert result["fallbacks"] == 2
+    # 0.4 需再解碼 2 次 (0.2、0.4)，1.0 需 5 次
+    assert "共 7 次額外解碼" in caplog.text
+
+
+def test_profile_ladder_is_used(caplog):
+    result = _result((0, 0.8))
+    with caplog.at_level("INFO", logger="transcriber"):
+        _log_decode_stats(result, {'temperature': (0.0, 0.4, 0.8)}, "a.mp3")
+    assert result["fallbacks"] == 1
+    assert "共 2 次額外解碼" in caplog.text
+
+
+def test_no_fallback(caplog):
+    result = _result((0, 0.0), (3000, 0.0))
+    with caplog.at_level("INFO", logger="transcriber"):
+        _log_decode_stats(result, {'temperature': (0.0,)}, "a.mp3")
+    assert result["fallbacks"] == 0
+    assert "共 0 次額外解碼" in caplog.text
@@ -0,0 +1,77 @@
+"""
+下載狀態儲存測試 (download_state.normalize_video_id / DownloadStateStore)
+"""
+import pytest
+
+from src.download_state import (
+    STATUS_DOWNLOADED, STATUS_FAILED, STATUS_FAILED_PERMANENT, DownloadStateStore, normalize_video_id
+)
+from src.file_manager import FileManager
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=abc123XYZ_-",
+    "https://youtube.com/watch?v=abc123XYZ_-&t=42s",
+    "https://m.youtube.com/watch?feature=share&v=abc123XYZ_-",
+    "https://music.youtube.com/watch?v=abc123XYZ_-&list=PL1",
+    "https://youtu.be/abc123XYZ_-?si=tracking",
+    "https://www.youtube.com/shorts/abc123XYZ_-",
+    "https://www.youtube.com/embed/abc123XYZ_-",
+    "https://www.youtube.com/live/abc123XYZ_-?feature=share",
+    "  https://www.youtube.com/watch?v=abc123XYZ_-  ",
+])
+def test_youtube_variants_share_one_id(url):
+    assert normalize_video_id(url) == "youtube:abc123XYZ_-"
+
+
+def test_other_urls_drop_fragment_and_trailing_slash():
+    assert normalize_video_id("HTTPS://Example.com/talk/1/#t=5") == "https://example.com/talk/1"
+    assert normalize_video_id("https://example.com:8080/a?b=1") == "https://example.com:8080/a?b=1"
+    assert normalize_video_id("https://example.com/a?b=1") != normalize_video_id("https://example.com/a?b=2")
+
+
+def test_store_tracks_status_and_survives_reopen(tmp_path):
+    fm = FileManager(str(tmp_path))
+    url = "https://www.youtube.com/watch?v=abc"
+    with DownloadStateStore(fm) as state:
+        assert state.mark_started(url) == 1
+        state.mark_failed(url, "HTTP Error 503")
+        assert state.mark_started(url) == 2
+        state.mark_downloaded(url, "/tmp/a.mp3")
+        # 同一影片的其他網址形式視為已下載
+        assert state.is_downloaded("https://youtu.be/abc")
+        assert state.get(url)["attempts"] == 2
+
+    with DownloadStateStore(fm) as state:
+        assert state.is_downloaded(url)
+        assert state.status_counts() == {STATUS_DOWNLOADED: 1}
+
+
+def test_permanent_failures_are_remembered_until_success(tmp_path):
+    fm = FileManager(str(tmp_path))
+    url = "https://youtu.be/gone"
+    with DownloadStateStore(fm) as state:
+        state.mark_failed(url, "Video unavailable", permanent=True)
+        state.mark_failed("https://youtu.be/flaky", "timed out")
+        assert state.is_permanently_failed("https://www.youtube.com/watch?v=gone")
+        assert [r["status"] for r in state.failed_records()] == [STATUS_FAILED_PERMANENT, STATUS_FAILED]
+        state.mark_downloaded(url, "/tmp/gone.mp3")
+        assert not state.is_permanently_failed(url)
+
+
+def test_legacy_text_records_are_imported_once(tmp_path):
+    fm = FileManager(str(tmp_path))
+    urls_dir = fm.get_path('data_input_urls')
+    (urls_dir / 'downloaded_urls.txt').write_text("https://youtu.be/a\n\nhttps://youtu.be/b\n", encoding='utf-8')
+    (urls_dir / 'failed_urls.txt').write_text("# 註解\nhttps://youtu.be/b\nhttps://youtu.be/c\n", encoding='utf-8')
+
+    with DownloadStateStore(fm) as state:
+        assert state.is_downloaded("https://youtu.be/a")
+        # 同時出現在兩份記錄時以已下載為準
+        assert state.get("https://youtu.be/b")["status"] == STATUS_DOWNLOADED
+        assert state.get("https://youtu.be/c")["status"] == STATUS_FAILED
+        assert state.get("# 註解") is None
+
+    (urls_dir / 'downloaded_urls.txt').write_text("https://youtu.be/new\n", encoding='utf-8')
+    with DownloadStateStore(fm) as state:
+        assert not state.is_downloaded("https://youtu.be/new")
@@ -0,0 +1,174 @@
+"""
+下載器測試 (錯誤分類與重試、後處理設定、批次下載背壓)
+"""
+import threading
+
+import pytest
+import yt_dlp
+from yt_dlp.postprocessor import FFmpegExtractAudioPP
+
+from src import downloader
+from src.download_state import STATUS_DOWNLOADED, STATUS_FAILED, STATUS_FAILED_PERMANENT, DownloadStateStore
+from src.downloader import _postprocessor_options, backoff_delay, classify_error
+from src.file_manager import FileManager
+
+URL = "https://www.youtube.com/watch?v=abc123XYZ_-"
+
+
+def _download_error(message, original=None):
+    exc_info = (type(original), original, None) if original is not None else None
+    return yt_dlp.utils.DownloadError(f"ERROR: {message}", exc_info)
+
+
+@pytest.mark.parametrize("message", [
+    "[youtube] abc123XYZ_-: Video unavailable",
+    "[youtube] abc123XYZ_-: Private video. Sign in if you've been granted access",
+    "Unable to download webpage: HTTP Error 404: Not Found",
+    "[youtube] abc123XYZ_-: Join this channel to get access to members-only content",
+])
+def test_permanent_errors(message):
+    assert classify_error(_download_error(message)) == 'permanent'
+
+
+@pytest.mark.parametrize("message", [
+    "unable to download video data: HTTP Error 403: Forbidden",
+    "Unable to download webpage: HTTP Error 429: Too Many Requests",
+    "unable to download video data: HTTP Error 503: Service Unavailable",
+    "Unable to download webpage: <urlopen error [Errno 104] Connection reset by peer>",
+    "The read operation timed out",
+])
+def test_transient_errors(message):
+    assert classify_error(_download_error(message)) == 'transient'
+
+
+def test_wrapped_unsupported_url_is_permanent():
+    error = _download_error("boom", yt_dlp.utils.UnsupportedError("https://example.com/x"))
+    assert classify_error(error) == 'permanent'
+
+
+def test_backoff_delay_grows_with_jitter_and_cap():
+    for attempt, full in [(1, 2.0), (2, 4.0), (3, 8.0), (10, 60.0)]:
+        delays = [backoff_delay(attempt, 2.0, 60.0) for _ in range(50)]
+        assert all(full / 2 <= d <= full for d in delays)
+        assert len(set(delays)) > 1
+
+
+def _download_with_errors(tmp_path, monkeypatch, errors):
+    """依序拋出 errors 中的例外，之後下載成功"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(downloader, 'backoff_delay', lambda *args: 0)
+    remaining = list(errors)
+    calls = []
+
+    def fake_download_once(url, file_manager, state, audio_format=None):
+        calls.append(url)
+        if remaining:
+            raise remaining.pop(0)
+        return str(tmp_path / "audio.mp3")
+
+    monkeypatch.setattr(downloader, '_download_once', fake_download_once)
+    file_manager = FileManager(str(tmp_path))
+    with DownloadStateStore(file_manager) as state:
+        result = downloader.download_audio(URL, file_manager, state, 'mp3')
+        return result, len(calls), state.get(URL)
+
+
+def test_transient_error_is_retried(tmp_path, monkeypatch):
+    result, calls, record = _download_with_errors(tmp_path, monkeypatch, [
+        _download_error("unable to download video data: HTTP Error 403: Forbidden")])
+    assert result == str(tmp_path / "audio.mp3")
+    assert calls == 2
+    assert record['status'] == STATUS_DOWNLOADED
+
+
+def test_permanent_error_is_not_retried(tmp_path, monkeypatch):
+    result, calls, record = _download_with_errors(tmp_path, monkeypatch, [
+        _download_error("[youtube] abc123XYZ_-: Video unavailable")])
+    assert result is None
+    assert calls == 1
+    assert record['status'] == STATUS_FAILED_PERMANENT
+
+
+def test_transient_error_gives_up_after_max_attempts(tmp_path, monkeypatch):
+    error = _download_error("HTTP Error 503: Service Unavailable")
+    result, calls, record = _download_with_errors(tmp_path, monkeypatch, [error] * 10)
+    assert result is None
+    assert calls == 4
+    assert record['status'] == STATUS_FAILED
+
+
+def _resolved_output_args(options):
+    """以 yt-dlp 實際的解析方式取得 ExtractAudio 輸出檔的 ffmpeg 參數"""
+    ydl = yt_dlp.YoutubeDL({'quiet': True, **options})
+    pp_options = {k: v for k, v in options['postprocessors'][0].items() if k != 'key'}
+    pp = FFmpegExtractAudioPP(ydl, **pp_options)
+    # 與 FFmpegPostProcessor.real_run_ffmpeg 第一個輸出檔使用的 key 相同
+    return pp._configuration_args('ffmpeg', ['_o1', '_o', ''])
+
+
+@pytest.mark.parametrize("audio_format", ["wav", "flac"])
+def test_pcm_formats_pass_resample_args_to_ffmpeg(audio_format):
+    options = _postprocessor_options(audio_format)
+    assert options['postprocessors'][0]['key'] == 'FFmpegExtractAudio'
+    assert options['postprocessors'][0]['preferredcodec'] == audio_format
+    assert _resolved_output_args(options) == ['-ar', '16000', '-ac', '1', '-sample_fmt', 's16']
+
+
+def test_mp3_keeps_source_rate_and_quality():
+    options = _postprocessor_options("mp3")
+    assert options['postprocessors'][0]['preferredquality'] == '192'
+    assert _resolved_output_args(options) == []
+
+
+def test_native_has_no_postprocessing():
+    assert _postprocessor_options("native") == {}
+
+
+def _run_batch(tmp_path, monkeypatch, on_downloaded, backpressure, fail_urls=()):
+    file_manager = FileManager(str(tmp_path))
+    urls = [f"https://www.youtube.com/watch?v=video{i:05d}" for i in range(4)]
+    url_file = file_manager.get_path('data_input_urls', 'urls.txt')
+    url_file.parent.mkdir(parents=True, exist_ok=True)
+    url_file.write_text('\n'.join(urls) + '\n', encoding='utf-8')
+
+    def fake_download(url, file_manager, state, audio_format):
+        if url in fail_urls:
+            return None
+        path = tmp_path / f"{url[-10:]}.mp3"
+        path.write_bytes(b"audio")
+        return str(path)
+
+    monkeypatch.setattr(downloader, 'download_audio', fake_download)
+    downloader.download_from_urls(str(url_file), file_manager, max_workers=2, per_domain_limit=1,
+                                  on_downloaded=on_downloaded, backpressure=backpressure)
+    return urls
+
+
+def _available(semaphore, limit):
+    acquired = 0
+    while acquired < limit + 1 and semaphore.acquire(blocking=False):
+        acquired += 1
+    for _ in range(acquired):
+        semaphore.release()
+    return acquired
+
+
+def test_backpressure_released_when_handoff_raises(tmp_path, monkeypatch):
+    # 名額足夠整批使用，洩漏時測試失敗而不是卡住
+    backpressure = threading.BoundedSemaphore(4)
+
+    def on_downloaded(path):
+        raise RuntimeError("下游佇列已關閉")
+
+    _run_batch(tmp_path, monkeypatch, on_downloaded, backpressure)
+    assert _available(backpressure, 4) == 4
+
+
+def test_backpressure_kept_for_handed_off_files(tmp_path, monkeypatch):
+    backpressure = threading.BoundedSemaphore(4)
+    received = []
+    urls = _run_batch(tmp_path, monkeypatch, received.append, backpressure, fail_urls={
+        "https://www.youtube.com/watch?v=video00001"})
+    # 失敗的下載釋放名額，交出的 3 個檔案仍由接收端持有
+    assert len(received) == len(urls) - 1
+    assert _available(backpressure, 4) == 1
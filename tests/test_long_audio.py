@@ -0,0 +1,92 @@
+"""
+長音訊切段與縫合測試 (audio_utils.split_audio / transcriber.stitch_segments)
+"""
+import numpy as np
+
+from src import audio_utils
+from src.transcriber import stitch_segments
+
+SR = audio_utils.SAMPLE_RATE
+
+
+def _tone(seconds: float, amplitude: float = 0.3) -> np.ndarray:
+    t = np.arange(int(seconds * SR)) / SR
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def test_frame_stats_cover_partial_last_frame():
+    frame_length = int(0.03 * SR)
+    audio = np.ones(frame_length * 3 + 10, dtype=np.float32)
+    rms = audio_utils.frame_rms(audio)
+    assert len(rms) == 4
+    assert np.allclose(rms[:3], 1.0)
+    # 最後一框只有 10 個樣本，其餘補零
+    assert np.isclose(rms[3], np.sqrt(10 / frame_length))
+    assert len(audio_utils.frame_zcr(audio)) == 4
+    assert len(audio_utils.frame_rms(np.zeros(0, dtype=np.float32))) == 0
+
+
+def test_frame_stats_match_across_block_boundaries():
+    rng = np.random.default_rng(0)
+    audio = rng.standard_normal(int(0.03 * SR) * 8192 + 1234).astype(np.float32)
+    frame_length = int(0.03 * SR)
+    n_frames = -(-len(audio) // frame_length)
+    padded = np.zeros(n_frames * frame_length, dtype=np.float32)
+    padded[:len(audio)] = audio
+    expected = np.sqrt(np.mean(padded.reshape(n_frames, frame_length) ** 2, axis=1))
+    assert np.allclose(audio_utils.frame_rms(audio), expected)
+
+
+def test_split_points_land_in_silence():
+    # 10 秒聲音 + 2 秒靜音 + 10 秒聲音，目標切點在 10 秒附近
+    audio = np.concatenate([_tone(10), np.zeros(2 * SR, dtype=np.float32), _tone(10)])
+    points = audio_utils.find_split_points(audio, chunk_seconds=10.5, search_seconds=2)
+    assert len(points) == 1
+    assert 10 * SR <= points[0] <= 12 * SR
+
+
+def test_split_audio_spans_overlap_and_cover_audio():
+    audio = np.concatenate([_tone(10), np.zeros(2 * SR, dtype=np.float32), _tone(10)])
+    spans = audio_utils.split_audio(audio, chunk_seconds=10.5, overlap_seconds=1.0)
+    assert spans[0][0] == 0 and spans[-1][1] == len(audio)
+    for (_, own_end, _, real_end), (own_start, _, real_start, _) in zip(spans, spans[1:]):
+        assert own_end == own_start
+        assert real_end == own_end + SR
+        assert real_start == own_start - SR
+
+
+def test_stitch_offsets_and_drops_overlap_duplicates():
+    # 片段二的實際起點在 9 秒 (擁有區間自 10 秒開始)
+    spans = [(0, 10 * SR, 0, 11 * SR), (10 * SR, 20 * SR, 9 * SR, 20 * SR)]
+    chunk_results = [
+        {"language": "zh", "segments": [
+            {"start": 0.0, "end": 4.0, "text": "第一句"},
+            {"start": 8.5, "end": 9.8, "text": "重疊句"},
+            # 中點 10.5 秒落在片段二的擁有區間，由片段二保留
+            {"start": 10.2, "end": 10.8, "text": "屬於下一段"},
+        ]},
+        {"language": "zh", "segments": [
+            # 中點 9.15 秒不在片段二的擁有區間
+            {"start": 0.0, "end": 0.3, "text": "重疊句"},
+            {"start": 1.2, "end": 1.8, "text": "屬於下一段"},
+            {"start": 3.0, "end": 5.0, "text": "第三句"},
+        ]},
+    ]
+    result = stitch_segments(chunk_results, spans)
+    texts = [seg["text"] for seg in result["segments"]]
+    assert texts == ["第一句", "重疊句", "屬於下一段", "第三句"]
+    assert result["segments"][2]["start"] == 10.2
+    assert result["segments"][3]["start"] == 12.0
+    assert [seg["id"] for seg in result["segments"]] == [0, 1, 2, 3]
+    assert result["language"] == "zh"
+
+
+def test_stitch_dedups_identical_text_repeated_at_boundary():
+    spans = [(0, 10 * SR, 0, 11 * SR), (10 * SR, 20 * SR, 9 * SR, 20 * SR)]
+    chunk_results = [
+        {"segments": [{"start": 9.0, "end": 9.9, "text": " Hello, world."}]},
+        # 同一句在片段二的擁有區間開頭再次出現 (標點/大小寫不同)
+        {"segments": [{"start": 1.0, "end": 1.5, "text": "hello world"}]},
+    ]
+    result = stitch_segments(chunk_results, spans)
+    assert [seg["text"] for seg in result["segments"]] == [" Hello, world."]
@@ -0,0 +1,55 @@
+"""
+模擬 OpenRouter 伺服器測試 (mock_openrouter.MockOpenRouter)
+"""
+import http.client
+import json
+import socket
+import time
+
+from src.mock_openrouter import MockOpenRouter
+
+
+def _post(conn, stream=False):
+    body = json.dumps({'model': 'm', 'stream': stream, 'messages': []})
+    conn.request('POST', '/api/v1/chat/completions', body, {'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def test_keep_alive_connection_is_reused_then_closed_on_stop():
+    mock = MockOpenRouter(latency_median=0.01, latency_sigma=0).start()
+    host, port = mock._server.server_address[:2]
+    conn = http.client.HTTPConnection(host, port, timeout=5)
+    try:
+        assert _post(conn)[0] == 200
+        sock = conn.sock
+        status, body = _post(conn, stream=True)
+        assert status == 200 and b'[DONE]' in body
+        # 同一條 keep-alive 連線處理兩個請求
+        assert conn.sock is sock
+        assert mock.stats['ok'] == 2
+
+        start = time.monotonic()
+        mock.stop()
+        assert time.monotonic() - start < 2
+        # 伺服器主動關閉閒置連線，客戶端讀到 EOF 而不是等到逾時
+        sock.settimeout(2)
+        assert sock.recv(1) == b''
+    finally:
+        conn.close()
+
+    deadline = time.monotonic() + 2
+    while mock._connections and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not mock._connections
+
+
+def test_stop_refuses_new_connections():
+    with MockOpenRouter(latency_median=0.01, latency_sigma=0) as mock:
+        host, port = mock._server.server_address[:2]
+    try:
+        socket.create_connection((host, port), timeout=1).close()
+        refused = False
+    except OSError:
+        refused = True
+    assert refused
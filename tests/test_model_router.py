@@ -0,0 +1,43 @@
+"""
+依音訊長度選擇模型測試 (transcriber.ModelRouter)
+"""
+import configparser
+
+from src.file_manager import FileManager
+from src.transcriber import ModelRouter
+
+
+def _router(tmp_path, **options) -> ModelRouter:
+    config = configparser.ConfigParser()
+    config['transcriber'] = {'model_name': 'medium', **options}
+    return ModelRouter(config, FileManager(str(tmp_path)))
+
+
+def test_default_rules_never_downgrade_long_files(tmp_path):
+    router = _router(tmp_path)
+    assert router.route("short.mp3", duration=60) == "small"
+    assert router.route("talk.mp3", duration=1800) == "medium"
+    assert router.route("podcast.mp3", duration=4 * 3600) == "medium"
+
+
+def test_custom_rules_match_in_order(tmp_path):
+    router = _router(tmp_path, routing_rules="120:small, 3600:base, inf:tiny")
+    assert router.route("a.mp3", duration=120) == "small"
+    assert router.route("b.mp3", duration=121) == "base"
+    assert router.route("c.mp3", duration=7200) == "tiny"
+
+
+def test_time_budget_downgrades_largest_saving_first(tmp_path, monkeypatch):
+    router = _router(tmp_path, routing_rules="inf:small", routing_time_budget="100",
+                     routing_model_rtf="tiny:0.05, base:0.1, small:0.3")
+    durations = {"long.mp3": 300.0, "short.mp3": 30.0}
+    monkeypatch.setattr(router, "probe_duration", lambda path: durations[path])
+
+    plan = router.plan(list(durations))
+    # small 的預估 99 秒 (90 + 9)；只要不超出預算就不降級
+    assert plan == {"long.mp3": "small", "short.mp3": "small"}
+
+    router.time_budget = 40
+    plan = router.plan(list(durations))
+    assert plan["long.mp3"] == "base"
+    assert plan["short.mp3"] == "small"
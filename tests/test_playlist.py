@@ -0,0 +1,64 @@
+"""
+播放清單/頻道展開測試 (網址判斷與展開結果快取)
+"""
+import os
+import time
+
+import pytest
+
+from src.file_manager import FileManager
+from src.playlist import PlaylistExpander, is_collection_url
+
+CHANNEL = "https://www.youtube.com/@example/videos"
+
+
+@pytest.mark.parametrize("url,expected", [
+    ("https://www.youtube.com/@example", True),
+    ("https://www.youtube.com/@example/videos", True),
+    ("https://www.youtube.com/channel/UC1234567890", True),
+    ("https://www.youtube.com/playlist?list=PL123", True),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123", False),
+    ("https://youtu.be/dQw4w9WgXcQ", False),
+    ("https://example.com/@example", False),
+])
+def test_is_collection_url(url, expected):
+    assert is_collection_url(url) is expected
+
+
+def _expander(tmp_path, monkeypatch, ttl_hours=None):
+    monkeypatch.chdir(tmp_path)
+    expander = PlaylistExpander(FileManager(str(tmp_path)), ttl_hours=ttl_hours)
+    calls = []
+
+    def fake_extract(url, depth=0):
+        calls.append(url)
+        return [{'url': f"https://www.youtube.com/watch?v=video{len(calls):05d}", 'id': None,
+                 'title': None, 'duration': None}]
+
+    monkeypatch.setattr(expander, '_extract_flat', fake_extract)
+    return expander, calls
+
+
+def test_default_ttl_is_one_hour(tmp_path, monkeypatch):
+    expander, _ = _expander(tmp_path, monkeypatch)
+    assert expander.ttl_seconds == 3600
+
+
+def test_cache_hit_within_ttl_and_refetch_after_expiry(tmp_path, monkeypatch):
+    expander, calls = _expander(tmp_path, monkeypatch)
+    first = expander.expand(CHANNEL)
+    assert expander.expand(CHANNEL) == first
+    assert len(calls) == 1
+
+    cache_path = expander._cache_path(CHANNEL)
+    stale = time.time() - 3601
+    os.utime(cache_path, (stale, stale))
+    assert expander.expand(CHANNEL) != first
+    assert len(calls) == 2
+
+
+def test_zero_ttl_always_refetches(tmp_path, monkeypatch):
+    expander, calls = _expander(tmp_path, monkeypatch, ttl_hours=0)
+    expander.expand(CHANNEL)
+    expander.expand(CHANNEL)
+    assert len(calls) == 2
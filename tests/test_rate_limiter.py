@@ -0,0 +1,123 @@
+"""
+速率限制測試 (rate_limiter.TokenBucket 與標頭解析)，以假時鐘驗證補充時間
+"""
+import time
+import types
+from email.utils import formatdate
+
+import pytest
+
+from src import rate_limiter
+from src.rate_limiter import TokenBucket, parse_rate_limits, parse_reset, parse_retry_after
+
+
+class FakeClock:
+    """取代 time.monotonic；Condition.wait 直接推進時間"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.waits = []
+
+    def monotonic(self):
+        return self.now
+
+    def wait(self, timeout=None):
+        self.waits.append(timeout)
+        self.now += timeout
+
+
+class FakeCondition:
+    def __init__(self, clock):
+        self.clock = clock
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def wait(self, timeout=None):
+        self.clock.wait(timeout)
+
+    def notify_all(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'time', types.SimpleNamespace(monotonic=clock.monotonic, time=time.time))
+    return clock
+
+
+def _bucket(clock, rpm, capacity=None):
+    bucket = TokenBucket(rpm, capacity, name="test")
+    bucket._cond = FakeCondition(clock)
+    return bucket
+
+
+def test_burst_up_to_capacity_then_refill_rate(clock):
+    bucket = _bucket(clock, rpm=60, capacity=2)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    # 每分鐘 60 次 = 每秒補充 1 個
+    assert bucket.acquire() == pytest.approx(1.0)
+    assert bucket.acquire() == pytest.approx(1.0)
+
+
+def test_idle_refill_is_capped_at_capacity(clock):
+    bucket = _bucket(clock, rpm=60, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 3600
+    assert [bucket.acquire() for _ in range(2)] == [0, 0]
+    assert bucket.acquire() == pytest.approx(1.0)
+
+
+def test_pause_blocks_until_resume_then_one_interval(clock):
+    bucket = _bucket(clock, rpm=60, capacity=2)
+    bucket.pause_until(clock.now + 10)
+    # 暫停期間不累積 token，恢復後依速率補充第一個
+    assert bucket.acquire() == pytest.approx(11.0)
+    assert bucket.acquire() == pytest.approx(1.0)
+
+
+def test_update_from_headers_pauses_only_when_exhausted(clock):
+    bucket = _bucket(clock, rpm=60, capacity=1)
+    bucket.update_from_headers({"X-RateLimit-Remaining": "3", "X-RateLimit-Reset": "30"})
+    assert bucket.acquire() == 0
+    clock.now += 1
+    bucket.update_from_headers({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "30"})
+    assert bucket.acquire() == pytest.approx(31.0)
+
+
+def test_parse_reset_units():
+    now = time.time()
+    assert parse_reset("12") == 12
+    assert parse_reset(str(now + 30)) == pytest.approx(30, abs=1)
+    assert parse_reset(str((now + 30) * 1000)) == pytest.approx(30, abs=1)
+    assert parse_reset(str(now - 30)) == 0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7
+    assert parse_retry_after(formatdate(time.time() + 60, usegmt=True)) == pytest.approx(60, abs=2)
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_parse_rate_limits_keeps_colons_in_model_names():
+    limits = parse_rate_limits("deepseek/deepseek-chat-v3-0324:free=20, default = 60,, broken")
+    assert limits == {"deepseek/deepseek-chat-v3-0324:free": 20.0, "default": 60.0}
+
+
+def test_release_returns_unused_token(clock):
+    bucket = _bucket(clock, rpm=60, capacity=1)
+    assert bucket.acquire() == 0
+    bucket.release()
+    assert bucket.acquire() == 0
+    bucket.release()
+    bucket.release()
+    # 歸還不會超過容量
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(1.0)
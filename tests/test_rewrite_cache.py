@@ -0,0 +1,64 @@
+"""
+重寫結果快取測試 (rewrite_cache.RewriteCache)
+"""
+from src.file_manager import FileManager
+from src.rewrite_cache import RewriteCache, get_cache_stats
+
+ENDPOINT = "https://openrouter.ai/api/v1/chat/completions"
+MODEL = "deepseek/deepseek-chat-v3-0324:free"
+PROMPT = "將逐字稿整理為文章"
+TRANSCRIPT = "今天我們來談談效能。"
+
+
+def test_key_is_sensitive_to_every_input():
+    base = RewriteCache.make_key(ENDPOINT, MODEL, PROMPT, TRANSCRIPT)
+    assert RewriteCache.make_key(ENDPOINT, MODEL, PROMPT, TRANSCRIPT) == base
+    variants = [
+        RewriteCache.make_key("http://127.0.0.1:8000/v1/chat/completions", MODEL, PROMPT, TRANSCRIPT),
+        RewriteCache.make_key(ENDPOINT, "google/gemini-2.0-flash-exp:free", PROMPT, TRANSCRIPT),
+        RewriteCache.make_key(ENDPOINT, MODEL, PROMPT + " ", TRANSCRIPT),
+        RewriteCache.make_key(ENDPOINT, MODEL, PROMPT, TRANSCRIPT + "。"),
+    ]
+    assert len(set(variants + [base])) == 5
+
+
+def _put(cache, tmp_path, prompt=PROMPT, prompt_type="default", model=MODEL):
+    return cache.put(ENDPOINT, model, prompt, TRANSCRIPT, content="# 效能", prompt_type=prompt_type,
+                     category="tech", article_path=str(tmp_path / "article.md"))
+
+
+def test_get_hits_only_for_same_prompt_and_model(tmp_path):
+    cache = RewriteCache(FileManager(str(tmp_path)))
+    before = get_cache_stats()
+    assert cache.get(ENDPOINT, MODEL, PROMPT, TRANSCRIPT) is None
+    _put(cache, tmp_path)
+
+    entry = cache.get(ENDPOINT, MODEL, PROMPT, TRANSCRIPT)
+    assert entry['content'] == "# 效能"
+    assert entry['category'] == "tech"
+    assert cache.get(ENDPOINT, MODEL, "另一個提示", TRANSCRIPT) is None
+    assert cache.get(ENDPOINT, "other/model", PROMPT, TRANSCRIPT) is None
+
+    after = get_cache_stats()
+    assert after['hits'] - before['hits'] == 1
+    assert after['misses'] - before['misses'] == 3
+
+
+def test_corrupt_entry_is_dropped(tmp_path):
+    cache = RewriteCache(FileManager(str(tmp_path)))
+    entry_path = _put(cache, tmp_path)
+    entry_path.write_text("{not json", encoding='utf-8')
+    assert cache.get(ENDPOINT, MODEL, PROMPT, TRANSCRIPT) is None
+    assert not entry_path.exists()
+
+
+def test_invalidate_by_prompt_type(tmp_path):
+    cache = RewriteCache(FileManager(str(tmp_path)))
+    _put(cache, tmp_path, prompt="A", prompt_type="default")
+    _put(cache, tmp_path, prompt="B", prompt_type="summary")
+    _put(cache, tmp_path, prompt="C", prompt_type="summary")
+
+    assert cache.invalidate("summary") == 2
+    assert cache.get(ENDPOINT, MODEL, "A", TRANSCRIPT) is not None
+    assert cache.invalidate() == 1
+    assert cache.get(ENDPOINT, MODEL, "A", TRANSCRIPT) is None
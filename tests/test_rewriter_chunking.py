@@ -0,0 +1,181 @@
+"""
+分段重寫測試 (rewriter.split_transcript、_rewrite_chunked 合併與同時請求上限)
+"""
+import threading
+import time
+
+import pytest
+
+from src import rewriter
+from src.rewriter import estimate_tokens, split_transcript
+
+
+def _compact(text):
+    return "".join(text.split())
+
+
+def test_short_transcript_is_one_chunk():
+    text = "第一行。\n第二行。\n"
+    assert split_transcript(text, 100) == ["第一行。\n第二行。"]
+
+
+def test_splits_on_line_boundaries_within_budget():
+    lines = [f"這是第{i:02d}行的內容。" for i in range(30)]
+    chunks = split_transcript("\n".join(lines), 40)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        # 每行完整保留在同一段，並加上換行的 1 token
+        assert all(line in lines for line in chunk.split("\n"))
+        assert sum(estimate_tokens(line) + 1 for line in chunk.split("\n")) <= 40
+    assert "\n".join(chunks).split("\n") == lines
+
+
+def test_long_line_splits_at_sentence_end():
+    line = "".join(f"句子{i:02d}有一些內容。" for i in range(10))
+    chunks = split_transcript(line, 20)
+    pieces = [piece for chunk in chunks for piece in chunk.split("\n")]
+    assert all(piece.endswith("。") for piece in pieces)
+    assert _compact("".join(chunks)) == _compact(line)
+
+
+def test_unpunctuated_text_is_cut_by_budget():
+    line = "字" * 95
+    chunks = split_transcript(line, 10)
+    assert all(estimate_tokens(chunk) <= 10 for chunk in chunks)
+    assert "".join(chunks) == line
+
+
+def test_english_text_uses_word_estimate():
+    line = " ".join(["word"] * 200)
+    chunks = split_transcript(line + ".", 30)
+    assert all(estimate_tokens(chunk) <= 30 for chunk in chunks)
+    assert _compact("".join(chunks)) == _compact(line + ".")
+
+
+class FakeComplete:
+    """取代 _complete：記錄呼叫並回傳固定長度的筆記"""
+
+    def __init__(self, note_chars):
+        self.note_chars = note_chars
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, api_key, endpoint, models, system_prompt, user_content, instruction="", stream_to=None):
+        with self.lock:
+            self.calls.append({'system_prompt': system_prompt, 'content': user_content,
+                               'instruction': instruction, 'stream_to': stream_to})
+        if instruction == rewriter._MERGE_INSTRUCTION:
+            return "ARTICLE"
+        if instruction.startswith(rewriter._CONDENSE_INSTRUCTION[:10]):
+            return user_content.split("\n")[0][:8] + "濃"
+        # 以片段第一行作為筆記開頭，方便檢查順序
+        return user_content.split("\n")[0][:8] + "記" * self.note_chars
+
+
+@pytest.fixture
+def fake_complete(monkeypatch):
+    def install(note_chars):
+        fake = FakeComplete(note_chars)
+        monkeypatch.setattr(rewriter, '_complete', fake)
+        return fake
+    return install
+
+
+def _transcript(lines=40):
+    return "\n".join(f"第{i:03d}段落的逐字稿內容在這裡。" for i in range(lines))
+
+
+def test_chunk_budget_excludes_prompt_tokens(fake_complete, monkeypatch):
+    monkeypatch.setattr(rewriter, 'get_max_in_flight', lambda config=None: 2)
+    fake = fake_complete(note_chars=1)
+    chunk_tokens = 200
+    rewriter._rewrite_chunked("k", "url", ["m"], "系統提示", _transcript(), chunk_tokens)
+
+    chunk_calls = [c for c in fake.calls if c['instruction'] != rewriter._MERGE_INSTRUCTION]
+    assert len(chunk_calls) > 1
+    for call in chunk_calls:
+        request = call['system_prompt'] + call['instruction'] + call['content']
+        assert estimate_tokens(request) <= chunk_tokens + 1
+
+
+def test_merge_receives_notes_in_order_with_original_prompt(fake_complete, monkeypatch, tmp_path):
+    monkeypatch.setattr(rewriter, 'get_max_in_flight', lambda config=None: 4)
+    fake = fake_complete(note_chars=1)
+    partial = tmp_path / "article.md.partial"
+    result = rewriter._rewrite_chunked("k", "url", ["m"], "系統提示", _transcript(), 200, stream_to=partial)
+
+    assert result == "ARTICLE"
+    merge = fake.calls[-1]
+    assert merge['instruction'] == rewriter._MERGE_INSTRUCTION
+    assert merge['system_prompt'] == "系統提示"
+    assert merge['stream_to'] == partial
+    # 只有合併請求串流；筆記依原本順序以分隔線串接
+    assert all(c['stream_to'] is None for c in fake.calls[:-1])
+    notes = merge['content'].split("\n\n---\n\n")
+    assert len(notes) == len(fake.calls) - 1
+    assert [note[:5] for note in notes] == sorted(note[:5] for note in notes)
+
+
+def test_long_notes_are_condensed_before_merge(fake_complete, monkeypatch):
+    monkeypatch.setattr(rewriter, 'get_max_in_flight', lambda config=None: 4)
+    fake = fake_complete(note_chars=60)
+    rewriter._rewrite_chunked("k", "url", ["m"], "系統提示", _transcript(80), 250)
+
+    instructions = [c['instruction'] for c in fake.calls]
+    condense = [i for i in instructions if i.startswith(rewriter._CONDENSE_INSTRUCTION[:10])]
+    assert condense
+    assert instructions[-1] == rewriter._MERGE_INSTRUCTION
+    merge_request = fake.calls[-1]['system_prompt'] + rewriter._MERGE_INSTRUCTION + fake.calls[-1]['content']
+    assert estimate_tokens(merge_request) <= 250 + 1
+
+
+def test_chunking_is_off_by_default(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert rewriter.get_chunk_tokens() == 0
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def iter_content(self, chunk_size=None):
+        yield b'{"choices": [{"message": {"content": "ok"}}]}'
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_in_flight_limit_is_shared_across_callers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "config.ini").write_text(
+        "[REWRITER]\nMAX_IN_FLIGHT = 2\nRATE_LIMITS = default=100000\n", encoding="utf-8")
+    monkeypatch.setattr(rewriter, '_IN_FLIGHT', None)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    class FakeSession:
+        def post(self, *args, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return FakeResponse()
+
+    monkeypatch.setattr(rewriter, '_get_session', lambda: FakeSession())
+    results = []
+
+    def call(model):
+        results.append(rewriter._call_openrouter("k", "url", model, "s", "u"))
+
+    threads = [threading.Thread(target=call, args=(f"in-flight-test-{i % 3}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["ok"] * 8
+    assert peak[0] == 2
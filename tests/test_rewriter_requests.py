@@ -0,0 +1,174 @@
+"""
+重寫請求測試 (rewriter._call_openrouter 整體逾時、_complete 重試次數與 hedging 取消)
+"""
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from src import rate_limiter, rewriter
+from src.file_manager import FileManager
+from src.model_stats import ModelStatsStore
+
+CONTENT_BODY = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode("utf-8")
+
+
+class FakeRaw:
+    def __init__(self):
+        self.shut = threading.Event()
+
+    def shutdown(self):
+        self.shut.set()
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, chunks=(CONTENT_BODY,), lines=(), delay=0.0, block=False):
+        self.status_code = status_code
+        self.headers = {}
+        self.raw = FakeRaw()
+        self.chunks = chunks
+        self.lines = lines
+        self.delay = delay
+        self.block = block
+        self.encoding = None
+
+    def _wait(self):
+        if self.block:
+            # 直到 raw.shutdown() 才中斷，與 urllib3 關閉讀取端的行為相同
+            self.raw.shut.wait(5)
+            raise requests.exceptions.ChunkedEncodingError("connection closed")
+        time.sleep(self.delay)
+
+    def iter_content(self, chunk_size=None):
+        for chunk in self.chunks:
+            self._wait()
+            yield chunk
+
+    def iter_lines(self, chunk_size=None, decode_unicode=False, delimiter=None):
+        for line in self.lines:
+            self._wait()
+            yield line
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error")
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """依模型名稱回傳預先設定的回應，並記錄每次請求"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.posts = []
+        self.lock = threading.Lock()
+
+    def post(self, endpoint, json=None, headers=None, timeout=None, stream=False):
+        with self.lock:
+            self.posts.append({'model': json['model'], 'timeout': timeout, 'stream': stream})
+        return self.handler(json['model'])
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "config.ini").write_text(
+        "[REWRITER]\nMAX_IN_FLIGHT = 4\nMAX_RETRIES = 3\nRATE_LIMITS = default=100000\n", encoding="utf-8")
+    monkeypatch.setattr(rewriter, '_IN_FLIGHT', None)
+    monkeypatch.setattr(rate_limiter, '_LIMITERS', {})
+    monkeypatch.setattr(rewriter, '_backoff_delay', lambda attempt: 0.0)
+    stats = ModelStatsStore(FileManager(str(tmp_path)), min_samples=1)
+    monkeypatch.setattr(rewriter, 'get_model_stats', lambda: stats)
+
+    def install(handler):
+        session = FakeSession(handler)
+        monkeypatch.setattr(rewriter, '_get_session', lambda: session)
+        return session
+
+    install.stats = stats
+    return install
+
+
+def test_deadline_covers_slow_body(env):
+    env(lambda model: FakeResponse(chunks=[b"{"] * 100, delay=0.05))
+    start = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        rewriter._call_openrouter("k", "url", "m", "s", "u", timeout=0.3)
+    assert time.monotonic() - start < 1.5
+
+
+def test_stream_deadline_is_total_not_idle(env, tmp_path):
+    # 伺服器持續送出保活註解，閒置逾時永遠不會觸發
+    session = env(lambda model: FakeResponse(lines=[": keepalive"] * 100, delay=0.05))
+    start = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        rewriter._call_openrouter("k", "url", "m", "s", "u", timeout=0.3, stream_to=tmp_path / "a.partial")
+    assert time.monotonic() - start < 1.5
+    connect, read = session.posts[0]['timeout']
+    assert read <= 0.3
+
+
+def test_stream_completes_within_deadline(env, tmp_path):
+    lines = ['data: {"choices": [{"delta": {"content": "你好"}}]}', "", "data: [DONE]"]
+    env(lambda model: FakeResponse(lines=lines))
+    partial = tmp_path / "a.partial"
+    assert rewriter._call_openrouter("k", "url", "m", "s", "u", timeout=5, stream_to=partial) == "你好"
+    assert partial.read_text(encoding="utf-8") == "你好"
+
+
+def test_one_retry_per_hop_when_chain_has_fallback(env):
+    session = env(lambda model: FakeResponse(status_code=503))
+    with pytest.raises(RuntimeError):
+        rewriter._complete("k", "url", ["a", "b"], "s", "u")
+    models = [post['model'] for post in session.posts]
+    assert models.count("a") == 2
+    assert models.count("b") == 2
+
+
+def test_single_model_uses_configured_retries(env):
+    session = env(lambda model: FakeResponse(status_code=503))
+    with pytest.raises(RuntimeError):
+        rewriter._complete("k", "url", ["a"], "s", "u")
+    assert len(session.posts) == 4
+
+
+def test_losing_hedge_is_cancelled(env):
+    slow_responses = []
+
+    def handler(model):
+        if model == "slow":
+            response = FakeResponse(block=True)
+            slow_responses.append(response)
+            return response
+        return FakeResponse()
+
+    env(handler)
+    # slow 的 p90 延遲為 0.05 秒，超過後同時送給 fast
+    env.stats.record("slow", 0.05, ok=True)
+    start = time.monotonic()
+    assert rewriter._complete("k", "url", ["slow", "fast"], "s", "u") == "ok"
+    assert time.monotonic() - start < 2
+
+    assert slow_responses and slow_responses[0].raw.shut.wait(2)
+    # 被取消的請求釋放同時請求名額，也不計為失敗
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline and rewriter._IN_FLIGHT._value < 4:
+        time.sleep(0.01)
+    assert rewriter._IN_FLIGHT._value == 4
+    assert env.stats.success_rate("slow") == 1.0
+
+
+def test_cancelled_before_send_returns_token(env):
+    session = env(lambda model: FakeResponse())
+    cancel = rewriter._Cancellation()
+    cancel.cancel()
+    limiter = rate_limiter.get_limiter("m")
+    tokens = limiter._tokens
+    with pytest.raises(rewriter._Cancelled):
+        rewriter._call_openrouter("k", "url", "m", "s", "u", cancel=cancel)
+    assert session.posts == []
+    assert limiter._tokens == pytest.approx(tokens, abs=0.01)
@@ -0,0 +1,45 @@
+"""
+串流重寫測試 (rewriter.rewrite_many 以 STREAM=true 同時重寫，經由本機模擬伺服器)
+"""
+import pytest
+
+from src import rate_limiter, rewriter
+from src.file_manager import FileManager
+from src.mock_openrouter import MockOpenRouter
+from src.model_stats import ModelStatsStore
+
+
+@pytest.fixture
+def mock_env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(rewriter, '_IN_FLIGHT', None)
+    monkeypatch.setattr(rate_limiter, '_LIMITERS', {})
+    file_manager = FileManager(str(tmp_path))
+    stats = ModelStatsStore(file_manager)
+    monkeypatch.setattr(rewriter, 'get_model_stats', lambda: stats)
+    responses = ["A" * 300, "B" * 300]
+    with MockOpenRouter(latency_median=0.01, latency_sigma=0, tokens_per_sec=500, responses=responses) as mock:
+        (tmp_path / "config.ini").write_text(
+            f"[OPENROUTER]\nAPI_KEY = test\n\n[REWRITER]\nENDPOINT = {mock.url}\nREWRITE_CACHE = false\n"
+            "STREAM = true\nMAX_IN_FLIGHT = 2\nRATE_LIMITS = default=100000\n",
+            encoding="utf-8",
+        )
+        yield file_manager, mock
+
+
+def test_concurrent_streams_with_same_name_prefix_do_not_collide(mock_env):
+    file_manager, mock = mock_env
+    # 檔名前 15 字元相同，輸出檔名的基底也相同
+    transcripts = [
+        file_manager.save_file("第一份逐字稿。", 'data_output_transcripts_raw', f"20260101_120000_{name}_transcript.txt")
+        for name in ("alpha_talk", "beta_talk")
+    ]
+    articles = rewriter.rewrite_many([str(t) for t in transcripts], file_manager, 'general', 'general')
+
+    assert all(articles)
+    assert len(set(articles)) == 2
+    contents = sorted(open(article, encoding="utf-8").read() for article in articles)
+    assert contents == ["A" * 300, "B" * 300]
+    assert mock.stats['streamed'] == 2
+    article_dir = file_manager.get_path('data_output_articles_general')
+    assert not list(article_dir.glob("*.partial"))
@@ -0,0 +1,89 @@
+"""
+逐段轉錄檢查點測試 (transcriber._transcribe_with_checkpoint)
+"""
+import json
+
+import numpy as np
+import pytest
+
+from src import audio_utils
+from src.transcriber import _clear_checkpoint, _transcribe_with_checkpoint
+
+SR = audio_utils.SAMPLE_RATE
+
+
+class Interrupted(Exception):
+    pass
+
+
+class FakeModel:
+    """以樣本值記錄區塊位置的假模型：波形內容即為樣本索引"""
+
+    def __init__(self, fail_on_call=None):
+        self.fail_on_call = fail_on_call
+        self.calls = []
+
+    def transcribe(self, audio, initial_prompt=None, **kwargs):
+        self.calls.append((int(audio[0]), len(audio), initial_prompt))
+        if self.fail_on_call is not None and len(self.calls) == self.fail_on_call:
+            raise Interrupted()
+        return {
+            "language": "zh",
+            "segments": [{"id": 0, "start": 0.0, "end": len(audio) / SR, "text": f"[{int(audio[0])}]"}],
+        }
+
+
+def _paths(base):
+    return (base.with_name(base.name + ".partial.jsonl"), base.with_name(base.name + ".checkpoint.json"))
+
+
+def test_interrupted_transcription_resumes_from_checkpoint(tmp_path):
+    audio = np.arange(10 * SR, dtype=np.float32)
+    base = tmp_path / "ckpt"
+    partial_path, checkpoint_path = _paths(base)
+
+    first = FakeModel(fail_on_call=2)
+    with pytest.raises(Interrupted):
+        _transcribe_with_checkpoint(first, audio, base, {}, block_seconds=3)
+
+    checkpoint = json.loads(checkpoint_path.read_text(encoding="utf-8"))
+    first_block_start, first_block_len, _ = first.calls[0]
+    assert first_block_start == 0
+    assert checkpoint == {"offset": first_block_len, "segments": 1, "language": "zh"}
+    assert len(partial_path.read_text(encoding="utf-8").splitlines()) == 1
+
+    # 寫入檢查點前中斷留下的多餘行必須被忽略
+    with open(partial_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"id": 99, "start": 0, "end": 0, "text": "未確認"}) + "\n")
+
+    second = FakeModel()
+    result = _transcribe_with_checkpoint(second, audio, base, {}, block_seconds=3)
+
+    # 已完成的區塊不再轉錄，續跑時以先前的文字作為 prompt
+    assert second.calls[0][0] == first_block_len
+    assert second.calls[0][2] == "[0]"
+    segments = result["segments"]
+    assert "未確認" not in result["text"]
+    assert [seg["id"] for seg in segments] == list(range(len(segments)))
+    starts = [0] + [start for start, _, _ in second.calls]
+    assert [seg["start"] for seg in segments] == [round(s / SR, 3) for s in starts]
+    assert segments[-1]["end"] == round(len(audio) / SR, 3)
+    for prev, seg in zip(segments, segments[1:]):
+        assert prev["end"] == seg["start"]
+
+    assert len(partial_path.read_text(encoding="utf-8").splitlines()) == len(segments)
+    _clear_checkpoint(base)
+    assert not partial_path.exists() and not checkpoint_path.exists()
+
+
+def test_corrupt_checkpoint_restarts_from_beginning(tmp_path):
+    audio = np.arange(4 * SR, dtype=np.float32)
+    base = tmp_path / "ckpt"
+    partial_path, checkpoint_path = _paths(base)
+    checkpoint_path.write_text("{not json", encoding="utf-8")
+    partial_path.write_text("garbage\n", encoding="utf-8")
+
+    model = FakeModel()
+    result = _transcribe_with_checkpoint(model, audio, base, {}, block_seconds=10)
+    assert model.calls[0][0] == 0
+    assert result["segments"][0]["start"] == 0.0
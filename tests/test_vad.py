@@ -0,0 +1,89 @@
+"""
+語音活動偵測與時間軸換算測試 (transcriber.detect_speech_regions / _apply_vad / _remap_timestamps)
+"""
+import numpy as np
+
+from src import audio_utils
+from src.transcriber import _apply_vad, _remap_timestamps, detect_speech_regions
+
+SR = audio_utils.SAMPLE_RATE
+
+
+def _voice(seconds: float) -> np.ndarray:
+    # 低頻諧波近似濁音：能量高、過零率低
+    t = np.arange(int(seconds * SR)) / SR
+    return (0.3 * np.sin(2 * np.pi * 150 * t) + 0.1 * np.sin(2 * np.pi * 300 * t)).astype(np.float32)
+
+
+def _silence(seconds: float) -> np.ndarray:
+    rng = np.random.default_rng(1)
+    return (0.0005 * rng.standard_normal(int(seconds * SR))).astype(np.float32)
+
+
+def test_detects_speech_between_silences():
+    audio = np.concatenate([_silence(2), _voice(1.5), _silence(3), _voice(1.0), _silence(2)])
+    regions = detect_speech_regions(audio, pad_seconds=0.0)
+    assert len(regions) == 2
+    (s1, e1), (s2, e2) = regions
+    assert abs(s1 / SR - 2.0) < 0.05 and abs(e1 / SR - 3.5) < 0.05
+    assert abs(s2 / SR - 6.5) < 0.05 and abs(e2 / SR - 7.5) < 0.05
+
+
+def test_short_gaps_are_merged_and_short_bursts_dropped():
+    audio = np.concatenate([
+        _silence(1), _voice(1.0), _silence(0.3), _voice(1.0),  # 0.3 秒停頓併為同一段
+        _silence(2), _voice(0.1), _silence(2),                  # 0.1 秒的聲音過短
+    ])
+    regions = detect_speech_regions(audio, pad_seconds=0.0, min_silence_seconds=0.8, min_speech_seconds=0.3)
+    assert len(regions) == 1
+    start, end = regions[0]
+    assert abs(start / SR - 1.0) < 0.05 and abs(end / SR - 3.3) < 0.05
+
+
+def test_silent_audio_has_no_regions():
+    assert detect_speech_regions(np.zeros(SR, dtype=np.float32)) == []
+    assert detect_speech_regions(np.zeros(0, dtype=np.float32)) == []
+
+
+def test_apply_vad_concatenates_regions_with_timeline():
+    audio = np.arange(10 * SR, dtype=np.float32)
+    regions = [(1 * SR, 2 * SR), (5 * SR, 7 * SR)]
+    kept, timeline = _apply_vad(audio, regions)
+    assert len(kept) == 3 * SR
+    assert kept[0] == SR and kept[SR] == 5 * SR
+    assert timeline == [(0.0, 1.0), (1.0, 5.0)]
+
+
+def test_remap_timestamps_across_gaps():
+    timeline = [(0.0, 1.0), (1.0, 5.0), (3.0, 20.0)]
+    result = {"segments": [
+        {"start": 0.2, "end": 0.9, "text": "a", "words": [{"start": 0.2, "end": 0.5}]},
+        {"start": 1.0, "end": 2.5, "text": "b"},
+        {"start": 3.5, "end": 4.0, "text": "c", "words": [{"start": 3.5, "end": 4.0}]},
+    ]}
+    remapped = _remap_timestamps(result, timeline)["segments"]
+    assert (remapped[0]["start"], remapped[0]["end"]) == (1.2, 1.9)
+    assert remapped[0]["words"][0] == {"start": 1.2, "end": 1.5}
+    # 剛好落在區段起點時歸入該區段
+    assert (remapped[1]["start"], remapped[1]["end"]) == (5.0, 6.5)
+    assert (remapped[2]["start"], remapped[2]["end"]) == (20.5, 21.0)
+    assert remapped[2]["words"][0] == {"start": 20.5, "end": 21.0}
+
+
+def test_remap_end_on_region_boundary_stays_in_closing_region():
+    # 串接波形的 1.0 秒處：第一區段 (原始 1.0~2.0) 結束、第二區段 (原始 5.0 起) 開始
+    timeline = [(0.0, 1.0), (1.0, 5.0)]
+    result = {"segments": [
+        {"start": 0.5, "end": 1.0, "text": "a", "words": [{"start": 0.5, "end": 1.0}]},
+        {"start": 1.0, "end": 1.5, "text": "b", "words": [{"start": 1.0, "end": 1.5}]},
+    ]}
+    remapped = _remap_timestamps(result, timeline)["segments"]
+    assert (remapped[0]["start"], remapped[0]["end"]) == (1.5, 2.0)
+    assert remapped[0]["words"][0] == {"start": 1.5, "end": 2.0}
+    assert (remapped[1]["start"], remapped[1]["end"]) == (5.0, 5.5)
+    assert remapped[1]["words"][0] == {"start": 5.0, "end": 5.5}
+
+
+def test_remap_without_timeline_is_identity():
+    result = {"segments": [{"start": 1.0, "end": 2.0, "text": "x"}]}
+    assert _remap_timestamps(result, [])["segments"][0]["start"] == 1.0